@@ -39,6 +39,15 @@ from models.payment import Payment
 from models.stock_alert import StockAlert
 from models.notification import Notification
 from models.otp import OTP
+from models.bill_number_counter import BillNumberCounter
+from models.bill_daily_stat import BillDailyStat
+from models.idempotency_key import IdempotencyKey
+from models.client_balance import ClientBalance
+from models.client_balance_day import ClientBalanceDay
+from models.stock_movement import StockMovement
+from models.stock_snapshot import StockSnapshot
+from models.stock_reservation import StockReservation
+from models.catalog_version import CatalogVersion
 
 # Set target metadata for autogenerate support
 target_metadata = Base.metadata
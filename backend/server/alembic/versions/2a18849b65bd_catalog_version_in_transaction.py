@@ -0,0 +1,119 @@
+"""catalog version in transaction
+
+Revision ID: 2a18849b65bd
+Revises: e7738650ca2c
+Create Date: 2026-10-18 16:48:37.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2a18849b65bd'
+down_revision: Union[str, None] = 'e7738650ca2c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ("products", "categories")
+
+NOTIFY_CATALOG_CHANGE = """
+    CREATE OR REPLACE FUNCTION notify_catalog_change() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    DECLARE
+        ids text;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            SELECT string_agg(DISTINCT id::text, ',') INTO ids FROM old_rows;
+        ELSIF TG_OP = 'INSERT' OR TG_TABLE_NAME <> 'products' THEN
+            SELECT string_agg(DISTINCT id::text, ',') INTO ids FROM new_rows;
+        ELSE
+            -- quantity_reserved seule (panier): ni notifiée ni versionnée, elle n'est
+            -- pas servie ; le stock (ventes, inventaires) fait partie des réponses
+            SELECT string_agg(n.id::text, ',') INTO ids
+            FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE to_jsonb(n) - 'quantity_reserved' IS DISTINCT FROM to_jsonb(o) - 'quantity_reserved';
+        END IF;
+
+        IF ids IS NOT NULL THEN
+            UPDATE catalog_version SET version = version + 1;
+            IF length(ids) > 7000 THEN
+                ids := '*';
+            END IF;
+            PERFORM pg_notify('catalog_changes', TG_TABLE_NAME || ':' || ids);
+        END IF;
+
+        RETURN NULL;
+    END $$
+"""
+
+# Version précédente (f886dfe161c4), pour downgrade
+NOTIFY_CATALOG_CHANGE_PREVIOUS = """
+    CREATE OR REPLACE FUNCTION notify_catalog_change() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    DECLARE
+        ids text;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            SELECT string_agg(DISTINCT id::text, ',') INTO ids FROM old_rows;
+        ELSE
+            SELECT string_agg(DISTINCT id::text, ',') INTO ids FROM new_rows;
+        END IF;
+
+        IF ids IS NOT NULL THEN
+            IF length(ids) > 7000 THEN
+                ids := '*';
+            END IF;
+            PERFORM pg_notify('catalog_changes', TG_TABLE_NAME || ':' || ids);
+        END IF;
+
+        RETURN NULL;
+    END $$
+"""
+
+
+def _update_triggers(transition: str):
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER {table}_notify_update ON {table}")
+        op.execute(f"""
+            CREATE TRIGGER {table}_notify_update
+            AFTER UPDATE ON {table}
+            REFERENCING {transition}
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_change()
+        """)
+
+
+def upgrade() -> None:
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('catalog_version',
+    sa.Column('id', sa.SmallInteger(), autoincrement=False, nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.CheckConstraint('id = 1', name='ck_catalog_version_single_row'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.drop_index('ix_products_updated_at', table_name='products')
+    # ### end Alembic commands ###
+
+    # Reprendre après la dernière valeur de la séquence: aucun ETag déjà servi n'est réutilisé
+    # (max(updated_at) ne fait plus partie de l'ETag: index ix_products_updated_at supprimé)
+    op.execute("INSERT INTO catalog_version (id, version) SELECT 1, nextval('catalog_version_seq')")
+    op.execute(sa.schema.DropSequence(sa.Sequence('catalog_version_seq')))
+
+    op.execute(NOTIFY_CATALOG_CHANGE)
+    _update_triggers("OLD TABLE AS old_rows NEW TABLE AS new_rows")
+
+
+def downgrade() -> None:
+    _update_triggers("NEW TABLE AS new_rows")
+    op.execute(NOTIFY_CATALOG_CHANGE_PREVIOUS)
+
+    op.execute(sa.schema.CreateSequence(sa.Sequence('catalog_version_seq')))
+    op.execute("SELECT setval('catalog_version_seq', version + 1) FROM catalog_version")
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_index('ix_products_updated_at', 'products', ['updated_at'], unique=False)
+    op.drop_table('catalog_version')
+    # ### end Alembic commands ###
@@ -0,0 +1,61 @@
+"""hot path indexes
+
+Revision ID: 6a2885f05138
+Revises: be894eaf4ce5
+Create Date: 2026-10-18 13:37:16.832968
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a2885f05138'
+down_revision: Union[str, None] = 'be894eaf4ce5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY: pas de verrou d'écriture sur les tables existantes
+    # (impossible dans une transaction, d'où le bloc autocommit)
+    with op.get_context().autocommit_block():
+        op.create_index('ix_bill_items_bill_id', 'bill_items', ['bill_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_bills_client_id_created_at_id', 'bills', ['client_id', 'created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_bills_client_id_unpaid', 'bills', ['client_id'], unique=False, postgresql_where=sa.text("status = 'not paid'"), postgresql_concurrently=True)
+        op.create_index('ix_bills_created_at_id', 'bills', ['created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_bills_status_created_at_id', 'bills', ['status', 'created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_clients_created_at_id', 'clients', ['created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_notifications_created_at_id', 'notifications', ['created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_notifications_pending', 'notifications', ['id'], unique=False, postgresql_where=sa.text('is_sent = false'), postgresql_concurrently=True)
+        op.create_index('ix_otps_email_otp_type_is_used', 'otps', ['email', 'otp_type', 'is_used'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_payments_bill_id', 'payments', ['bill_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_payments_created_at_id', 'payments', ['created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_products_category_id', 'products', ['category_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_products_created_at_id', 'products', ['created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_products_low_stock', 'products', ['quantity_in_stock'], unique=False, postgresql_where=sa.text('quantity_in_stock <= minimum_stock_level'), postgresql_concurrently=True)
+        op.create_index('ix_stock_alerts_created_at_id', 'stock_alerts', ['created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_stock_alerts_product_id_is_resolved', 'stock_alerts', ['product_id', 'is_resolved'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_stock_alerts_unresolved_created_at_id', 'stock_alerts', ['created_at', 'id'], unique=False, postgresql_where=sa.text('is_resolved = false'), postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_stock_alerts_unresolved_created_at_id', table_name='stock_alerts', postgresql_where=sa.text('is_resolved = false'))
+    op.drop_index('ix_stock_alerts_product_id_is_resolved', table_name='stock_alerts')
+    op.drop_index('ix_stock_alerts_created_at_id', table_name='stock_alerts')
+    op.drop_index('ix_products_low_stock', table_name='products', postgresql_where=sa.text('quantity_in_stock <= minimum_stock_level'))
+    op.drop_index('ix_products_created_at_id', table_name='products')
+    op.drop_index('ix_products_category_id', table_name='products')
+    op.drop_index('ix_payments_created_at_id', table_name='payments')
+    op.drop_index('ix_payments_bill_id', table_name='payments')
+    op.drop_index('ix_otps_email_otp_type_is_used', table_name='otps')
+    op.drop_index('ix_notifications_pending', table_name='notifications', postgresql_where=sa.text('is_sent = false'))
+    op.drop_index('ix_notifications_created_at_id', table_name='notifications')
+    op.drop_index('ix_clients_created_at_id', table_name='clients')
+    op.drop_index('ix_bills_status_created_at_id', table_name='bills')
+    op.drop_index('ix_bills_created_at_id', table_name='bills')
+    op.drop_index('ix_bills_client_id_unpaid', table_name='bills', postgresql_where=sa.text("status = 'not paid'"))
+    op.drop_index('ix_bills_client_id_created_at_id', table_name='bills')
+    op.drop_index('ix_bill_items_bill_id', table_name='bill_items')
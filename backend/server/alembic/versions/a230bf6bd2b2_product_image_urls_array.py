@@ -0,0 +1,67 @@
+"""product image urls array
+
+Revision ID: a230bf6bd2b2
+Revises: f886dfe161c4
+Create Date: 2026-10-18 14:08:56.445794
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a230bf6bd2b2'
+down_revision: Union[str, None] = 'f886dfe161c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BACKFILL_BATCH_SIZE = 5000
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+# Chaîne JSON (json.dumps d'une liste) -> text[] ; NULL, '' et tout JSON qui
+# n'est pas un tableau (« null » écrit par json.dumps(None)) -> '{}'
+TO_ARRAY = (
+    "CASE WHEN jsonb_typeof(NULLIF(image_urls, '')::jsonb) = 'array' "
+    "THEN ARRAY(SELECT jsonb_array_elements_text(image_urls::jsonb)) "
+    "ELSE '{}' END"
+)
+
+
+def upgrade() -> None:
+    op.add_column('products', sa.Column('image_urls_array', postgresql.ARRAY(sa.Text()), nullable=True))
+
+    # Backfill par lots, chacun dans sa propre transaction: verrous courts sur
+    # les lignes, la table reste lisible et modifiable pendant la conversion
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        low, high = bind.execute(sa.text("SELECT min(id), max(id) FROM products")).one()
+        if low is not None:
+            for start in range(low, high + 1, BACKFILL_BATCH_SIZE):
+                bind.execute(sa.text(
+                    f"UPDATE products SET image_urls_array = {TO_ARRAY} "
+                    "WHERE id >= :start AND id < :end"
+                ), {"start": start, "end": start + BACKFILL_BATCH_SIZE})
+                logger.info("image_urls: ids %s-%s/%s",
+                            start, min(start + BACKFILL_BATCH_SIZE, high + 1) - 1, high)
+
+    # Rattrapage des lignes écrites pendant le backfill, puis bascule (transaction courte)
+    op.execute(
+        f"UPDATE products SET image_urls_array = {TO_ARRAY} "
+        f"WHERE image_urls_array IS DISTINCT FROM {TO_ARRAY}"
+    )
+    op.drop_column('products', 'image_urls')
+    op.alter_column('products', 'image_urls_array', new_column_name='image_urls',
+                    nullable=False, server_default='{}')
+
+
+def downgrade() -> None:
+    op.add_column('products', sa.Column('image_urls_json', sa.String(length=2500), nullable=True))
+    op.execute("UPDATE products SET image_urls_json = array_to_json(image_urls)::text")
+    op.drop_column('products', 'image_urls')
+    op.alter_column('products', 'image_urls_json', new_column_name='image_urls')
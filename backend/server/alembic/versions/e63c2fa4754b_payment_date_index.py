@@ -0,0 +1,27 @@
+"""payment date index
+
+Revision ID: e63c2fa4754b
+Revises: 6a2885f05138
+Create Date: 2026-10-18 13:41:09.155058
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e63c2fa4754b'
+down_revision: Union[str, None] = '6a2885f05138'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_payments_payment_date_id', 'payments', ['payment_date', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payments_payment_date_id', table_name='payments')
@@ -0,0 +1,63 @@
+"""principal change notifications
+
+Revision ID: e7738650ca2c
+Revises: adf9550b4724
+Create Date: 2026-10-18 16:12:05.418230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7738650ca2c'
+down_revision: Union[str, None] = 'adf9550b4724'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TRIGGERS = [
+    (table, operation)
+    for table in ("admins", "clients")
+    for operation in ("UPDATE", "DELETE")
+]
+
+
+def upgrade() -> None:
+    # Ids modifiés par instruction, envoyés au commit sur le canal principal_changes
+    # (cache des utilisateurs authentifiés, utils/auth.py); « * » au-delà d'un NOTIFY
+    op.execute("""
+        CREATE FUNCTION notify_principal_change() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            ids text;
+        BEGIN
+            SELECT string_agg(DISTINCT id::text, ',') INTO ids FROM old_rows;
+
+            IF ids IS NOT NULL THEN
+                IF length(ids) > 7000 THEN
+                    ids := '*';
+                END IF;
+                PERFORM pg_notify('principal_changes', TG_TABLE_NAME || ':' || ids);
+            END IF;
+
+            RETURN NULL;
+        END $$
+    """)
+
+    for table, operation in TRIGGERS:
+        op.execute(f"""
+            CREATE TRIGGER {table}_notify_{operation.lower()}
+            AFTER {operation} ON {table}
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_principal_change()
+        """)
+
+
+def downgrade() -> None:
+    for table, operation in TRIGGERS:
+        op.execute(f"DROP TRIGGER {table}_notify_{operation.lower()} ON {table}")
+
+    op.execute("DROP FUNCTION notify_principal_change()")
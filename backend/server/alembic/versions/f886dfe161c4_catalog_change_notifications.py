@@ -0,0 +1,68 @@
+"""catalog change notifications
+
+Revision ID: f886dfe161c4
+Revises: 1b2044c07c47
+Create Date: 2026-10-18 14:06:41.568712
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f886dfe161c4'
+down_revision: Union[str, None] = '1b2044c07c47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TRIGGERS = [
+    (table, operation)
+    for table in ("products", "categories")
+    for operation in ("INSERT", "UPDATE", "DELETE")
+]
+
+
+def upgrade() -> None:
+    # Ids modifiés par instruction, envoyés au commit sur le canal catalog_changes
+    # (utils/catalog_snapshot.py); « * » si la liste dépasse la taille d'un NOTIFY
+    op.execute("""
+        CREATE FUNCTION notify_catalog_change() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            ids text;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                SELECT string_agg(DISTINCT id::text, ',') INTO ids FROM old_rows;
+            ELSE
+                SELECT string_agg(DISTINCT id::text, ',') INTO ids FROM new_rows;
+            END IF;
+
+            IF ids IS NOT NULL THEN
+                IF length(ids) > 7000 THEN
+                    ids := '*';
+                END IF;
+                PERFORM pg_notify('catalog_changes', TG_TABLE_NAME || ':' || ids);
+            END IF;
+
+            RETURN NULL;
+        END $$
+    """)
+
+    for table, operation in TRIGGERS:
+        transition = "OLD TABLE AS old_rows" if operation == "DELETE" else "NEW TABLE AS new_rows"
+        op.execute(f"""
+            CREATE TRIGGER {table}_notify_{operation.lower()}
+            AFTER {operation} ON {table}
+            REFERENCING {transition}
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_change()
+        """)
+
+
+def downgrade() -> None:
+    for table, operation in TRIGGERS:
+        op.execute(f"DROP TRIGGER {table}_notify_{operation.lower()} ON {table}")
+
+    op.execute("DROP FUNCTION notify_catalog_change()")
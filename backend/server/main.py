@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
@@ -10,6 +10,7 @@ from routers import (
     category_router,
     product_router,
     bill_router,
+    cart_router,
     payment_router,
     stock_alert_router,
     notification_router,
@@ -20,6 +21,13 @@ from routers import (
 
 # Import de l'initialisation de la base de données
 from utils.db import create_sample_data, init_db, test_connection
+from utils.password_pool import password_pool
+from utils.smtp_pool import close_smtp_pools
+from utils.responses import FastJSONResponse
+from utils.notification_dispatcher import NOTIFICATION_DISPATCHER_ENABLED, start_dispatcher_thread
+from utils.catalog_snapshot import CATALOG_SNAPSHOT_ENABLED, start_snapshot_thread
+from utils.stock_reservations import CART_RESERVATION_SWEEPER_ENABLED, start_sweeper_thread
+from utils.auth import AUTH_CACHE_ENABLED, start_principal_listener_thread
 from dotenv import load_dotenv
 import os
 load_dotenv()
@@ -52,11 +60,52 @@ async def lifespan(app: FastAPI):
     else:
         print("⚠️  Database connection failed, but continuing...")
 
+    # Notification outbox dispatcher
+    dispatcher = None
+    if NOTIFICATION_DISPATCHER_ENABLED:
+        dispatcher = start_dispatcher_thread()
+        print("📨 Notification dispatcher started")
+
+    # Catalog snapshot (LISTEN/NOTIFY)
+    snapshot = None
+    if CATALOG_SNAPSHOT_ENABLED:
+        snapshot = start_snapshot_thread()
+        print("🗂️  Catalog snapshot listener started")
+
+    # Cart reservation sweeper (expired holds)
+    sweeper = None
+    if CART_RESERVATION_SWEEPER_ENABLED:
+        sweeper = start_sweeper_thread()
+        print("🛒 Cart reservation sweeper started")
+
+    # Authenticated principal cache (LISTEN/NOTIFY invalidation)
+    principals = None
+    if AUTH_CACHE_ENABLED:
+        principals = start_principal_listener_thread()
+        print("🔐 Principal cache listener started")
+
     print("=" * 60)
     yield
 
     # Shutdown
     print("=" * 60)
+    if dispatcher:
+        thread, stop_event = dispatcher
+        stop_event.set()
+        thread.join(timeout=30)
+    if snapshot:
+        thread, stop_event = snapshot
+        stop_event.set()
+        thread.join(timeout=5)
+    if sweeper:
+        thread, stop_event = sweeper
+        stop_event.set()
+        thread.join(timeout=30)
+    if principals:
+        thread, stop_event = principals
+        stop_event.set()
+        thread.join(timeout=5)
+    close_smtp_pools()
     print("👋 Shutting down E-Commerce API...")
     print("=" * 60)
 
@@ -72,6 +121,7 @@ app = FastAPI(
     * **Gestion des catégories** - CRUD complet des catégories de produits
     * **Gestion des produits** - CRUD, gestion de stock, alertes automatiques
     * **Gestion des factures** - Création, consultation, suivi des paiements
+    * **Panier** - Réservation du stock pendant la constitution de la commande
     * **Gestion des paiements** - Paiements multiples, historique, mise à jour
     * **Alertes de stock** - Notifications automatiques pour stock faible
     * **Système de notifications** - Email et WhatsApp pour admins et clients
@@ -84,6 +134,7 @@ app = FastAPI(
     """,
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,  # Encodage orjson (utils/responses.py)
     docs_url="/docs",
     redoc_url="/redoc"
 )
@@ -95,6 +146,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],  # Curseur de pagination, version du catalogue
 )
 
 # Route de base
@@ -128,7 +180,8 @@ async def health_check():
     """Vérifier l'état de santé de l'API"""
     return {
         "status": "healthy",
-        "message": "L'API fonctionne correctement"
+        "message": "L'API fonctionne correctement",
+        "password_hashing": password_pool.stats()
     }
 
 
@@ -145,13 +198,18 @@ def initila_data():
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
+    # 304 Not Modified (requêtes conditionnelles du catalogue): sans corps, avec l'ETag
+    if exc.status_code == status.HTTP_304_NOT_MODIFIED:
+        return Response(status_code=exc.status_code, headers=exc.headers)
+
     return JSONResponse(
         status_code=exc.status_code,
         content={
             "error": True,
             "message": exc.detail,
             "status_code": exc.status_code
-        }
+        },
+        headers=exc.headers
     )
 
 
@@ -172,6 +230,7 @@ app.include_router(client_router)
 app.include_router(category_router)
 app.include_router(product_router)
 app.include_router(bill_router)
+app.include_router(cart_router)
 app.include_router(payment_router)
 app.include_router(stock_alert_router)
 app.include_router(notification_router)
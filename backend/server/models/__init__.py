@@ -16,6 +16,15 @@ from models.bill_item import BillItem
 from models.payment import Payment
 from models.stock_alert import StockAlert
 from models.notification import Notification
+from models.bill_number_counter import BillNumberCounter
+from models.bill_daily_stat import BillDailyStat
+from models.idempotency_key import IdempotencyKey
+from models.client_balance import ClientBalance
+from models.client_balance_day import ClientBalanceDay
+from models.stock_movement import StockMovement
+from models.stock_snapshot import StockSnapshot
+from models.stock_reservation import StockReservation
+from models.catalog_version import CatalogVersion
 
 # Define what's exported when using "from models import *"
 __all__ = [
@@ -35,4 +44,13 @@ __all__ = [
     "Payment",
     "StockAlert",
     "Notification",
+    "BillNumberCounter",
+    "BillDailyStat",
+    "IdempotencyKey",
+    "ClientBalance",
+    "ClientBalanceDay",
+    "StockMovement",
+    "StockSnapshot",
+    "StockReservation",
+    "CatalogVersion",
 ]
\ No newline at end of file
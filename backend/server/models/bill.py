@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Numeric, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Numeric, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -7,6 +7,15 @@ from utils.db import Base
 
 class Bill(Base):
     __tablename__ = "bills"
+    __table_args__ = (
+        # Pagination (created_at, id) : toutes les factures, par client, par statut
+        Index("ix_bills_created_at_id", "created_at", "id"),
+        Index("ix_bills_client_id_created_at_id", "client_id", "created_at", "id"),
+        Index("ix_bills_status_created_at_id", "status", "created_at", "id"),
+        # Factures non payées d'un client
+        Index("ix_bills_client_id_unpaid", "client_id",
+              postgresql_where=text("status = 'not paid'")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     client_id = Column(Integer, ForeignKey("clients.id"), nullable=False)
@@ -19,6 +28,8 @@ class Bill(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     notification_sent = Column(Boolean, default=False)
+    # Verrouillage optimiste: incrémenté à chaque mise à jour (voir utils/bill_payments.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     # Relationships
     client = relationship("Client", back_populates="bills")
@@ -28,5 +39,7 @@ class Bill(Base):
         "Payment", back_populates="bill", cascade="all, delete-orphan")
     notifications = relationship("Notification", back_populates="bill")
 
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         return f"<Bill(id={self.id}, bill_number='{self.bill_number}', status='{self.status}')>"
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, Date, Numeric
+
+from utils.db import Base
+
+class BillDailyStat(Base):
+    __tablename__ = "bill_daily_stats"
+
+    day = Column(Date, primary_key=True)  # Jour de création des factures
+    total_bills = Column(Integer, nullable=False, default=0)
+    total_revenue = Column(Numeric(14, 2), nullable=False, default=0.00)
+    total_paid = Column(Numeric(14, 2), nullable=False, default=0.00)
+    total_pending = Column(Numeric(14, 2), nullable=False, default=0.00)
+    paid_bills = Column(Integer, nullable=False, default=0)
+    unpaid_bills = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<BillDailyStat(day={self.day}, total_bills={self.total_bills})>"
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, Date
+
+from utils.db import Base
+
+class BillNumberCounter(Base):
+    __tablename__ = "bill_number_counters"
+
+    day = Column(Date, primary_key=True)  # Jour du préfixe BILL-YYYYMMDD
+    last_value = Column(Integer, nullable=False, default=0)  # Dernier numéro attribué ce jour
+
+    def __repr__(self):
+        return f"<BillNumberCounter(day={self.day}, last_value={self.last_value})>"
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, SmallInteger, BigInteger, CheckConstraint
+
+from utils.db import Base
+
+# Version du catalogue (produits, catégories): ETag des routes publiques, incrémentée
+# dans la transaction qui modifie le catalogue par le trigger notify_catalog_change
+# (utils/catalog_version.py)
+class CatalogVersion(Base):
+    __tablename__ = "catalog_version"
+    __table_args__ = (
+        CheckConstraint("id = 1", name="ck_catalog_version_single_row"),
+    )
+
+    id = Column(SmallInteger, primary_key=True, autoincrement=False, default=1)  # Ligne unique
+    version = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CatalogVersion(version={self.version})>"
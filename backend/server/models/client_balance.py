@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, DateTime, Numeric, ForeignKey, Index, text
+from sqlalchemy.sql import func
+
+from utils.db import Base
+
+class ClientBalance(Base):
+    __tablename__ = "client_balances"
+    __table_args__ = (
+        # Balance âgée triée par dette (clients débiteurs seulement)
+        Index("ix_client_balances_total_debt", "total_debt", "client_id",
+              postgresql_where=text("total_debt > 0")),
+    )
+
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True)
+    total_bills = Column(Integer, nullable=False, default=0)
+    total_debt = Column(Numeric(14, 2), nullable=False, default=0.00)  # Somme des total_remaining
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<ClientBalance(client_id={self.client_id}, total_debt={self.total_debt})>"
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, Date, Numeric, ForeignKey
+
+from utils.db import Base
+
+class ClientBalanceDay(Base):
+    __tablename__ = "client_balance_days"
+
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)  # Jour de création des factures
+    debt = Column(Numeric(14, 2), nullable=False, default=0.00)  # Reste à payer de ces factures
+
+    def __repr__(self):
+        return f"<ClientBalanceDay(client_id={self.client_id}, day={self.day}, debt={self.debt})>"
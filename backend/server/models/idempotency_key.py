@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+from utils.db import Base
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("owner_type", "owner_id", "key", name="uq_idempotency_keys_owner_key"),
+        # Purge des clés expirées
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    owner_type = Column(String(20), nullable=False)  # "admin" ou "client"
+    owner_id = Column(Integer, nullable=False)
+    key = Column(String(255), nullable=False)  # En-tête Idempotency-Key
+    endpoint = Column(String(100), nullable=False)  # ex: "POST /bill/"
+    request_hash = Column(String(64), nullable=False)  # SHA-256 du corps de la requête
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(JSONB, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<IdempotencyKey(key={self.key}, endpoint={self.endpoint})>"
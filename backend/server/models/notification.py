@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -6,6 +6,12 @@ from utils.db import Base
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_created_at_id", "created_at", "id"),
+        # File d'envoi: uniquement les notifications non envoyées
+        Index("ix_notifications_pending", "id",
+              postgresql_where=text("is_sent = false")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     admin_id = Column(Integer, ForeignKey("admins.id"), nullable=True)
@@ -17,6 +23,10 @@ class Notification(Base):
     message = Column(String(1000), nullable=False)
     is_sent = Column(Boolean, default=False)
     sent_at = Column(DateTime(timezone=True), nullable=True)
+    # Boîte d'envoi: tentatives échouées et prochaine tentative (voir utils/notification_dispatcher.py)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(String(500), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
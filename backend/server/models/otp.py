@@ -1,11 +1,14 @@
 # models/otp.py
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index
 from sqlalchemy.sql import func
 
 from utils.db import Base
 
 class OTP(Base):
     __tablename__ = "otps"
+    __table_args__ = (
+        Index("ix_otps_email_otp_type_is_used", "email", "otp_type", "is_used"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(255), nullable=False, index=True)
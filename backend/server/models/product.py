@@ -1,26 +1,51 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Numeric, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Numeric, ForeignKey, Index, Computed, text
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from utils.db import Base
 
+# Vecteur de recherche: nom (poids A) puis description (poids B), configuration
+# 'simple' (sans racinisation ni mots vides: noms de produits en français et en arabe)
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('simple'::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(description, '')), 'B')"
+)
+
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_category_id", "category_id"),
+        Index("ix_products_created_at_id", "created_at", "id"),
+        # Référence fournisseur: clé de l'import (POST /product/import, ON CONFLICT)
+        Index("ix_products_sku", "sku", unique=True),
+        # Produits en stock faible (quantity_in_stock <= minimum_stock_level)
+        Index("ix_products_low_stock", "quantity_in_stock",
+              postgresql_where=text("quantity_in_stock <= minimum_stock_level")),
+        # Recherche plein texte (/product/search) et recherche approchée sur le nom (pg_trgm)
+        Index("ix_products_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_products_name_trgm", "name", postgresql_using="gin",
+              postgresql_ops={"name": "gin_trgm_ops"}),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
     admin_id = Column(Integer, ForeignKey("admins.id"), nullable=False)
+    sku = Column(String(64), nullable=True)
     name = Column(String(200), nullable=False, index=True)
     description = Column(String(1000), nullable=True)
     price = Column(Numeric(10, 2), nullable=False)
     quantity_in_stock = Column(Integer, nullable=False, default=0)
     minimum_stock_level = Column(Integer, nullable=False, default=10)
+    # Somme des réservations de panier actives (stock_reservations): disponible = stock - réservé
+    quantity_reserved = Column(Integer, nullable=False, default=0, server_default="0")
     
-    # Store images as JSON array
-    image_urls = Column(String(2500), nullable=True)  # JSON string of URLs
+    # URLs des images (text[] décodé par le driver, sans json.loads)
+    image_urls = Column(ARRAY(Text), nullable=False, default=list, server_default="{}")
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     is_active = Column(Boolean, default=True)
+    search_vector = Column(TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True))
 
     # Relationships
     category = relationship("Category", back_populates="products")
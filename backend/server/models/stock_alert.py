@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -6,6 +6,13 @@ from utils.db import Base
 
 class StockAlert(Base):
     __tablename__ = "stock_alerts"
+    __table_args__ = (
+        Index("ix_stock_alerts_created_at_id", "created_at", "id"),
+        Index("ix_stock_alerts_product_id_is_resolved", "product_id", "is_resolved"),
+        # Alertes non résolues (liste /unresolved)
+        Index("ix_stock_alerts_unresolved_created_at_id", "created_at", "id",
+              postgresql_where=text("is_resolved = false")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
@@ -0,0 +1,25 @@
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+
+from utils.db import Base
+
+# Journal des mouvements de stock (ajout seulement), écrit par le trigger
+# record_stock_movements sur products : une insertion groupée par instruction.
+# products.quantity_in_stock reste le solde courant.
+class StockMovement(Base):
+    __tablename__ = "stock_movements"
+    __table_args__ = (
+        Index("ix_stock_movements_product_id_created_at_id", "product_id", "created_at", "id"),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    quantity = Column(Integer, nullable=False)  # Variation signée du stock
+    reason = Column(String(30), nullable=False)  # e.g., "sale", "restock", "adjustment", "import", "initial"
+    bill_id = Column(Integer, ForeignKey("bills.id", ondelete="SET NULL"), nullable=True)
+    admin_id = Column(Integer, ForeignKey("admins.id", ondelete="SET NULL"), nullable=True)
+    # Heure réelle de l'écriture (clock_timestamp) : croissante avec id pour un même produit
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.clock_timestamp())
+
+    def __repr__(self):
+        return f"<StockMovement(id={self.id}, product_id={self.product_id}, quantity={self.quantity}, reason={self.reason})>"
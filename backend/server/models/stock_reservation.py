@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+
+from utils.db import Base
+
+# Réservation de stock d'une ligne du panier d'un client, jusqu'à expires_at.
+# products.quantity_reserved (somme des réservations) est tenu à jour par le
+# trigger maintain_quantity_reserved.
+class StockReservation(Base):
+    __tablename__ = "stock_reservations"
+    __table_args__ = (
+        # Une réservation par produit dans le panier d'un client
+        Index("ix_stock_reservations_client_id_product_id", "client_id", "product_id", unique=True),
+        Index("ix_stock_reservations_product_id", "product_id"),
+        # Réservations expirées (balayage par lots)
+        Index("ix_stock_reservations_expires_at", "expires_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<StockReservation(client_id={self.client_id}, product_id={self.product_id}, quantity={self.quantity})>"
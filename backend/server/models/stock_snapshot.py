@@ -0,0 +1,17 @@
+from sqlalchemy import BigInteger, Column, Integer, DateTime, ForeignKey
+
+from utils.db import Base
+
+# Instantané du stock d'un produit (compaction de stock_movements) : le stock
+# à une date T est l'instantané le plus récent avant T plus les mouvements
+# postérieurs jusqu'à T.
+class StockSnapshot(Base):
+    __tablename__ = "stock_snapshots"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    taken_at = Column(DateTime(timezone=True), primary_key=True)
+    quantity = Column(Integer, nullable=False)
+    movement_id = Column(BigInteger, nullable=False, default=0)  # Dernier mouvement inclus (0 : état initial du journal)
+
+    def __repr__(self):
+        return f"<StockSnapshot(product_id={self.product_id}, taken_at={self.taken_at}, quantity={self.quantity})>"
@@ -5,6 +5,7 @@ from .client import router as client_router
 from .category import router as category_router
 from .product import router as product_router
 from .bill import router as bill_router
+from .cart import router as cart_router
 from .payment import router as payment_router
 from .stock_alert import router as stock_alert_router
 from .notification import router as notification_router
@@ -17,6 +18,7 @@ __all__ = [
     "category_router",
     "product_router",
     "bill_router",
+    "cart_router",
     "payment_router",
     "stock_alert_router",
     "notification_router",
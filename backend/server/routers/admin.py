@@ -1,20 +1,23 @@
 from pydoc import cli
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List
 from models.admin import Admin
 from schemas.admin import AdminCreate, AdminUpdate, AdminLogin, AdminResponse, AdminWithToken
 from models.client import Client
 from utils.db import get_db
-from utils.auth import hash_password, verify_password, create_access_token, get_current_admin
+from utils.auth import (
+    hash_password, hash_password_async, verify_password_async, password_needs_rehash,
+    create_access_token, get_current_admin, invalidate_principal
+)
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
 
 
-@router.post("/register", response_model=AdminWithToken, status_code=status.HTTP_201_CREATED)
-def register_admin(admin_data: AdminCreate, db: Session = Depends(get_db)):
-    """Inscription d'un nouvel administrateur"""
+def _check_admin_registration(db: Session, admin_data: AdminCreate):
+    """Vérifier l'unicité de l'email et du nom d'utilisateur"""
     
     # Vérifier si l'email existe déjà
     existing_admin = db.query(Admin).filter(Admin.email == admin_data.email).first()
@@ -31,18 +34,34 @@ def register_admin(admin_data: AdminCreate, db: Session = Depends(get_db)):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Ce nom d'utilisateur est déjà utilisé"
         )
+
+    # Rendre la connexion au pool pendant le hachage bcrypt
+    db.close()
+
+
+def _save_admin(db: Session, admin: Admin) -> Admin:
+    db.add(admin)
+    db.commit()
+    db.refresh(admin)
+    return admin
+
+
+@router.post("/register", response_model=AdminWithToken, status_code=status.HTTP_201_CREATED)
+async def register_admin(admin_data: AdminCreate, db: Session = Depends(get_db)):
+    """Inscription d'un nouvel administrateur"""
+    
+    # Requêtes SQL dans le threadpool, bcrypt dans son pool dédié
+    await run_in_threadpool(_check_admin_registration, db, admin_data)
     
     # Créer le nouvel administrateur
     new_admin = Admin(
         username=admin_data.username,
         email=admin_data.email,
-        password_hash=hash_password(admin_data.password),
+        password_hash=await hash_password_async(admin_data.password),
         phone_number=admin_data.phone_number
     )
     
-    db.add(new_admin)
-    db.commit()
-    db.refresh(new_admin)
+    new_admin = await run_in_threadpool(_save_admin, db, new_admin)
     
     # Créer un token d'accès pour l'administrateur nouvellement enregistré
     access_token = create_access_token(
@@ -56,19 +75,31 @@ def register_admin(admin_data: AdminCreate, db: Session = Depends(get_db)):
     }
 
 
+def _find_admin_by_email(db: Session, email: str):
+    admin = db.query(Admin).filter(Admin.email == email).first()
+    # Rendre la connexion au pool pendant la vérification bcrypt
+    db.close()
+    return admin
+
 
 @router.post("/login", response_model=AdminWithToken)
-def login_admin(login_data: AdminLogin, db: Session = Depends(get_db)):
+async def login_admin(login_data: AdminLogin, db: Session = Depends(get_db)):
     """Connexion administrateur"""
 
-    admin = db.query(Admin).filter(Admin.email == login_data.email).first()
+    admin = await run_in_threadpool(_find_admin_by_email, db, login_data.email)
 
-    if not admin or not verify_password(login_data.password, admin.password_hash):
+    if not admin or not await verify_password_async(login_data.password, admin.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou mot de passe incorrect"
         )
 
+    # Mettre à jour le hachage si le coût bcrypt configuré a changé
+    if password_needs_rehash(admin.password_hash):
+        admin.password_hash = await hash_password_async(login_data.password)
+        await run_in_threadpool(_save_admin, db, admin)
+        invalidate_principal("admin", admin.id)
+
     access_token = create_access_token(
         data={"sub": str(admin.id), "type": "admin"})
 
@@ -79,13 +110,13 @@ def login_admin(login_data: AdminLogin, db: Session = Depends(get_db)):
     }
 
 
-@router.get("/me", response_model=AdminResponse, dependencies=[Depends(get_current_admin)])
+@router.get("/me", response_model=AdminResponse)
 def get_current_admin_info(current_admin: Admin = Depends(get_current_admin)):
     """Obtenir les informations de l'administrateur connecté"""
     return current_admin
 
 
-@router.put("/me", response_model=AdminResponse, dependencies=[Depends(get_current_admin)])
+@router.put("/me", response_model=AdminResponse)
 def update_admin_profile(
     admin_data: AdminUpdate,
     current_admin: Admin = Depends(get_current_admin),
@@ -123,12 +154,13 @@ def update_admin_profile(
         current_admin.password_hash = hash_password(admin_data.password)
 
     db.commit()
+    invalidate_principal("admin", current_admin.id)
     db.refresh(current_admin)
 
     return current_admin
 
 
-@router.get("/", response_model=List[AdminResponse], dependencies=[Depends(get_current_admin)])
+@router.get("/", response_model=List[AdminResponse])
 def get_all_admins(
     skip: int = 0,
     limit: int = 100,
@@ -140,7 +172,7 @@ def get_all_admins(
     return admins
 
 
-@router.delete("/{admin_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(get_current_admin)])
+@router.delete("/{admin_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_admin(
     admin_id: int,
     current_admin: Admin = Depends(get_current_admin),
@@ -163,6 +195,7 @@ def delete_admin(
 
     db.delete(admin)
     db.commit()
+    invalidate_principal("admin", admin_id)
 
     return None
 
@@ -1,23 +1,119 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from sqlalchemy import Float, func, select
 from typing import List, Optional
-from datetime import datetime, date
+from datetime import date
 from decimal import Decimal
 from models.bill import Bill
 from models.bill_item import BillItem
-from models.product import Product
 from models.client import Client
+from models.bill_daily_stat import BillDailyStat
 from schemas.bill import BillCreate, BillResponse, BillWithItems, BillWithClient, BillSummary
 from utils.db import get_db
 from utils.auth import get_current_client, get_current_admin
-from utils.stock_manager import check_and_create_stock_alert
-from utils.notification_manager import create_bill_notification
-from sqlalchemy import func, extract, and_, cast, Date
+from utils.bill_manager import create_bill_with_items
+from utils.queries import bill_query
+from utils.pagination import CursorPage
+from utils.sales_stats import bill_stats_snapshot, record_bill_stats
+from utils.cache import summary_cache
+from utils.export import date_range_filters, export_response
+from utils.idempotency import begin_idempotent
+from utils.bill_payments import apply_bill_payment, retry_on_bill_conflict
+from utils.responses import FastJSONResponse, rows_as_dicts
 
 router = APIRouter(prefix="/bill", tags=["Bill"])
 
 
+def _rollup_rows(db: Session, date_format: str, *filters, as_float: bool = False) -> list:
+    """Agréger bill_daily_stats par période (format to_char PostgreSQL)"""
+
+    period = func.to_char(BillDailyStat.day, date_format).label("period")
+
+    def money(column):
+        # as_float: conversion faite par PostgreSQL plutôt qu'en Python ligne par ligne
+        total = func.sum(column)
+        return func.coalesce(total, 0).cast(Float) if as_float else total
+
+    return db.query(
+        period,
+        func.sum(BillDailyStat.total_bills).label("total_bills"),
+        money(BillDailyStat.total_revenue).label("total_revenue"),
+        money(BillDailyStat.total_paid).label("total_paid"),
+        money(BillDailyStat.total_pending).label("total_pending"),
+        func.sum(BillDailyStat.paid_bills).label("paid_bills"),
+        func.sum(BillDailyStat.unpaid_bills).label("unpaid_bills")
+    ).filter(
+        BillDailyStat.total_bills > 0,
+        *filters
+    ).group_by(period).order_by(period).all()
+
+
+def _rollup_summary(db: Session, date_format: str, *filters) -> FastJSONResponse:
+    """Résumé par période au format des routes /statistics/*"""
+
+    return FastJSONResponse(rows_as_dicts(
+        _rollup_rows(db, date_format, *filters, as_float=True)))
+
+
+BILL_LIST_COLUMNS = (
+    Bill.bill_number,
+    Bill.total_amount,
+    Bill.total_paid,
+    Bill.total_remaining,
+    Bill.status,
+    Bill.id,
+    Bill.client_id,
+    Bill.created_at,
+    Bill.updated_at,
+    Bill.notification_sent,
+)
+
+BILL_CLIENT_COLUMNS = (
+    Client.username.label("client_name"),
+    Client.email.label("client_email"),
+    Client.phone_number.label("client_phone"),
+)
+
+
+def _bill_list(db: Session, query, page: CursorPage) -> FastJSONResponse:
+    """
+    Page de factures avec leurs articles, lue en tuples de colonnes
+
+    Args:
+        db: Session de base de données
+        query: Requête sur BILL_LIST_COLUMNS (et BILL_CLIENT_COLUMNS)
+        page: Pagination
+
+    Returns:
+        FastJSONResponse au format BillWithItems / BillWithClient
+    """
+
+    bills = rows_as_dicts(page.paginate(query, Bill, row_key=lambda row: row))
+    if not bills:
+        return page.json_response([])
+
+    items_by_bill = {bill["id"]: [] for bill in bills}
+    item_rows = db.query(
+        BillItem.bill_id,
+        BillItem.id,
+        BillItem.product_id,
+        BillItem.product_name,
+        BillItem.unit_price,
+        BillItem.quantity,
+        BillItem.subtotal,
+        BillItem.created_at
+    ).filter(BillItem.bill_id.in_(list(items_by_bill))).order_by(BillItem.bill_id, BillItem.id)
+
+    for row in item_rows:
+        item = row._asdict()
+        items_by_bill[item.pop("bill_id")].append(item)
+
+    for bill in bills:
+        bill["items"] = items_by_bill[bill["id"]]
+
+    return page.json_response(bills)
+
+
 @router.get("/statistics/daily", response_model=List[dict])
 def get_daily_bill_summary(
     year: int = Query(..., description="Year (e.g., 2024)"),
@@ -27,37 +123,20 @@ def get_daily_bill_summary(
 ):
     """Get daily bill summary for a specific month"""
 
-    # Query bills for the specific month and group by day
-    results = db.query(
-        func.to_char(Bill.created_at, 'YYYY-MM-DD').label("date"),
-        func.count(Bill.id).label("total_bills"),
-        func.sum(Bill.total_amount).label("total_revenue"),
-        func.sum(Bill.total_paid).label("total_paid"),
-        func.sum(Bill.total_remaining).label("total_pending"),
-        func.count(func.nullif(Bill.status == 'paid', False)
-                   ).label("paid_bills"),
-        func.count(func.nullif(Bill.status == 'not paid', False)
-                   ).label("unpaid_bills")
-    ).filter(
-        and_(
-            extract('year', Bill.created_at) == year,
-            extract('month', Bill.created_at) == month
+    if not 1 <= month <= 12:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="month must be between 1 and 12"
         )
-    ).group_by("date").order_by("date").all()
 
-    daily_summary = []
-    for row in results:
-        daily_summary.append({
-            "period": row.date,
-            "total_bills": row.total_bills or 0,
-            "total_revenue": float(row.total_revenue or Decimal('0.00')),
-            "total_paid": float(row.total_paid or Decimal('0.00')),
-            "total_pending": float(row.total_pending or Decimal('0.00')),
-            "paid_bills": row.paid_bills or 0,
-            "unpaid_bills": row.unpaid_bills or 0
-        })
+    first_day = date(year, month, 1)
+    next_month = date(year + month // 12, month % 12 + 1, 1)
 
-    return daily_summary
+    return _rollup_summary(
+        db, 'YYYY-MM-DD',
+        BillDailyStat.day >= first_day,
+        BillDailyStat.day < next_month
+    )
 
 
 @router.get("/statistics/monthly", response_model=List[dict])
@@ -69,36 +148,14 @@ def get_monthly_bill_summary(
 ):
     """Get monthly bill summary, optionally filtered by year"""
 
-    query = db.query(
-        func.to_char(Bill.created_at, 'YYYY-MM').label("month"),
-        func.count(Bill.id).label("total_bills"),
-        func.sum(Bill.total_amount).label("total_revenue"),
-        func.sum(Bill.total_paid).label("total_paid"),
-        func.sum(Bill.total_remaining).label("total_pending"),
-        func.count(func.nullif(Bill.status == 'paid', False)
-                   ).label("paid_bills"),
-        func.count(func.nullif(Bill.status == 'not paid', False)
-                   ).label("unpaid_bills")
-    )
-
+    filters = []
     if year:
-        query = query.filter(extract('year', Bill.created_at) == year)
+        filters = [
+            BillDailyStat.day >= date(year, 1, 1),
+            BillDailyStat.day < date(year + 1, 1, 1)
+        ]
 
-    results = query.group_by("month").order_by("month").all()
-
-    monthly_summary = []
-    for row in results:
-        monthly_summary.append({
-            "period": row.month,
-            "total_bills": row.total_bills or 0,
-            "total_revenue": float(row.total_revenue or Decimal('0.00')),
-            "total_paid": float(row.total_paid or Decimal('0.00')),
-            "total_pending": float(row.total_pending or Decimal('0.00')),
-            "paid_bills": row.paid_bills or 0,
-            "unpaid_bills": row.unpaid_bills or 0
-        })
-
-    return monthly_summary
+    return _rollup_summary(db, 'YYYY-MM', *filters)
 
 
 @router.get("/statistics/yearly", response_model=List[dict])
@@ -108,31 +165,7 @@ def get_yearly_bill_summary(
 ):
     """Get yearly bill summary"""
 
-    results = db.query(
-        func.to_char(Bill.created_at, 'YYYY').label("year"),
-        func.count(Bill.id).label("total_bills"),
-        func.sum(Bill.total_amount).label("total_revenue"),
-        func.sum(Bill.total_paid).label("total_paid"),
-        func.sum(Bill.total_remaining).label("total_pending"),
-        func.count(func.nullif(Bill.status == 'paid', False)
-                   ).label("paid_bills"),
-        func.count(func.nullif(Bill.status == 'not paid', False)
-                   ).label("unpaid_bills")
-    ).group_by("year").order_by("year").all()
-
-    yearly_summary = []
-    for row in results:
-        yearly_summary.append({
-            "period": row.year,
-            "total_bills": row.total_bills or 0,
-            "total_revenue": float(row.total_revenue or Decimal('0.00')),
-            "total_paid": float(row.total_paid or Decimal('0.00')),
-            "total_pending": float(row.total_pending or Decimal('0.00')),
-            "paid_bills": row.paid_bills or 0,
-            "unpaid_bills": row.unpaid_bills or 0
-        })
-
-    return yearly_summary
+    return _rollup_summary(db, 'YYYY')
 
 
 @router.get("/statistics/period-range", response_model=List[dict])
@@ -158,129 +191,31 @@ def get_period_range_summary(
             detail="group_by must be 'day', 'month', or 'year'"
         )
 
-    date_format = format_map[group_by]
-
-    results = db.query(
-        func.to_char(Bill.created_at, date_format).label("period"),
-        func.count(Bill.id).label("total_bills"),
-        func.sum(Bill.total_amount).label("total_revenue"),
-        func.sum(Bill.total_paid).label("total_paid"),
-        func.sum(Bill.total_remaining).label("total_pending"),
-        func.count(func.nullif(Bill.status == 'paid', False)
-                   ).label("paid_bills"),
-        func.count(func.nullif(Bill.status == 'not paid', False)
-                   ).label("unpaid_bills")
-    ).filter(
-        and_(
-            cast(Bill.created_at, Date) >= start_date,
-            cast(Bill.created_at, Date) <= end_date
-        )
-    ).group_by("period").order_by("period").all()
-
-    summary = []
-    for row in results:
-        summary.append({
-            "period": row.period,
-            "total_bills": row.total_bills or 0,
-            "total_revenue": float(row.total_revenue or Decimal('0.00')),
-            "total_paid": float(row.total_paid or Decimal('0.00')),
-            "total_pending": float(row.total_pending or Decimal('0.00')),
-            "paid_bills": row.paid_bills or 0,
-            "unpaid_bills": row.unpaid_bills or 0
-        })
-
-    return summary
+    return _rollup_summary(
+        db, format_map[group_by],
+        BillDailyStat.day >= start_date,
+        BillDailyStat.day <= end_date
+    )
 
 
 @router.post("/", response_model=BillWithItems, status_code=status.HTTP_201_CREATED)
 def create_bill(
     bill_data: BillCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_client=Depends(get_current_client),
     db: Session = Depends(get_db)
 ):
     """Créer une nouvelle facture (client seulement)"""
 
-    # Générer un numéro de facture unique
-    bill_count = db.query(Bill).count()
-    bill_number = f"BILL-{datetime.now().strftime('%Y%m%d')}-{bill_count + 1:04d}"
-
-    # Créer la facture
-    new_bill = Bill(
-        client_id=current_client.id,
-        bill_number=bill_number,
-        total_amount=Decimal('0.00'),
-        total_paid=Decimal('0.00'),
-        total_remaining=Decimal('0.00'),
-        status="not paid"
-    )
-
-    db.add(new_bill)
-    db.flush()
-
-    # Ajouter les articles de la facture
-    total_amount = Decimal('0.00')
-    bill_items = []
-
-    for item in bill_data.items:
-        # Vérifier si le produit existe
-        product = db.query(Product).filter(
-            Product.id == item.product_id).first()
-        if not product:
-            db.rollback()
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Produit avec ID {item.product_id} non trouvé"
-            )
-
-        # Vérifier si le produit est actif
-        if not product.is_active:
-            db.rollback()
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Le produit '{product.name}' n'est pas disponible"
-            )
-
-        # Vérifier le stock
-        if product.quantity_in_stock < item.quantity:
-            db.rollback()
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Stock insuffisant pour le produit '{product.name}'. Stock disponible: {product.quantity_in_stock}"
-            )
-
-        # Calculer le sous-total
-        subtotal = product.price * item.quantity
-        total_amount += subtotal
-
-        # Créer l'article de facture
-        bill_item = BillItem(
-            bill_id=new_bill.id,
-            product_id=product.id,
-            product_name=product.name,
-            unit_price=product.price,
-            quantity=item.quantity,
-            subtotal=subtotal
-        )
-        db.add(bill_item)
-        bill_items.append(bill_item)
-
-        # Décrémenter le stock
-        product.quantity_in_stock -= item.quantity
-
-        # Vérifier et créer une alerte de stock si nécessaire
-        check_and_create_stock_alert(db, product)
-
-    # Mettre à jour les totaux de la facture
-    new_bill.total_amount = total_amount
-    new_bill.total_remaining = total_amount
+    idem = begin_idempotent(db, idempotency_key, "client", current_client.id,
+                            "POST /bill/", bill_data)
+    if idem.replay:
+        return idem.replay
 
-    db.commit()
-    db.refresh(new_bill)
-
-    # Créer une notification pour l'admin
-    create_bill_notification(db, new_bill, current_client)
+    new_bill = create_bill_with_items(db, current_client, bill_data.items)
 
-    return BillWithItems(
+    # Construire la réponse avant le commit (aucun rechargement nécessaire)
+    response = BillWithItems(
         id=new_bill.id,
         bill_number=new_bill.bill_number,
         client_id=new_bill.client_id,
@@ -299,47 +234,25 @@ def create_bill(
             "quantity": item.quantity,
             "subtotal": item.subtotal,
             "created_at": item.created_at
-        } for item in bill_items]
+        } for item in new_bill.bill_items]
     )
 
+    idem.store(db, response, status.HTTP_201_CREATED)
+    db.commit()
+
+    return response
+
 
 @router.get("/my-bills", response_model=List[BillWithItems])
 def get_my_bills(
-    skip: int = 0,
-    limit: int = 100,
+    page: CursorPage = Depends(),
     current_client=Depends(get_current_client),
     db: Session = Depends(get_db)
 ):
     """Obtenir toutes les factures du client connecté"""
 
-    bills = db.query(Bill).filter(Bill.client_id ==
-                                  current_client.id).offset(skip).limit(limit).all()
-
-    result = []
-    for bill in bills:
-        result.append(BillWithItems(
-            id=bill.id,
-            bill_number=bill.bill_number,
-            client_id=bill.client_id,
-            total_amount=bill.total_amount,
-            total_paid=bill.total_paid,
-            total_remaining=bill.total_remaining,
-            status=bill.status,
-            created_at=bill.created_at,
-            updated_at=bill.updated_at,
-            notification_sent=bill.notification_sent,
-            items=[{
-                "id": item.id,
-                "product_id": item.product_id,
-                "product_name": item.product_name,
-                "unit_price": item.unit_price,
-                "quantity": item.quantity,
-                "subtotal": item.subtotal,
-                "created_at": item.created_at
-            } for item in bill.bill_items]
-        ))
-
-    return result
+    return _bill_list(
+        db, db.query(*BILL_LIST_COLUMNS).filter(Bill.client_id == current_client.id), page)
 
 # count all my bills
 
@@ -376,49 +289,20 @@ def count_my_bills(
 
 @router.get("/all", response_model=List[BillWithClient])
 def get_all_bills(
-    skip: int = 0,
-    limit: int = 100,
+    page: CursorPage = Depends(),
     status_filter: str = None,
     current_admin=Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Obtenir toutes les factures (admin seulement)"""
 
-    query = db.query(Bill)
+    query = db.query(*BILL_LIST_COLUMNS, *BILL_CLIENT_COLUMNS).join(
+        Client, Bill.client_id == Client.id)
 
     if status_filter:
         query = query.filter(Bill.status == status_filter)
 
-    bills = query.offset(skip).limit(limit).all()
-
-    result = []
-    for bill in bills:
-        result.append(BillWithClient(
-            id=bill.id,
-            bill_number=bill.bill_number,
-            client_id=bill.client_id,
-            total_amount=bill.total_amount,
-            total_paid=bill.total_paid,
-            total_remaining=bill.total_remaining,
-            status=bill.status,
-            created_at=bill.created_at,
-            updated_at=bill.updated_at,
-            notification_sent=bill.notification_sent,
-            client_name=bill.client.username,
-            client_email=bill.client.email,
-            client_phone=bill.client.phone_number,
-            items=[{
-                "id": item.id,
-                "product_id": item.product_id,
-                "product_name": item.product_name,
-                "unit_price": item.unit_price,
-                "quantity": item.quantity,
-                "subtotal": item.subtotal,
-                "created_at": item.created_at
-            } for item in bill.bill_items]
-        ))
-
-    return result
+    return _bill_list(db, query, page)
 
 
 @router.get("/summary", response_model=BillSummary)
@@ -428,23 +312,32 @@ def get_bill_summary(
 ):
     """Obtenir le résumé des factures (admin seulement)"""
 
-    total_bills = db.query(Bill).count()
-    total_revenue = db.query(func.sum(Bill.total_amount)
-                             ).scalar() or Decimal('0.00')
-    total_paid = db.query(func.sum(Bill.total_paid)
-                          ).scalar() or Decimal('0.00')
-    total_pending = db.query(
-        func.sum(Bill.total_remaining)).scalar() or Decimal('0.00')
-    paid_bills = db.query(Bill).filter(Bill.status == "paid").count()
-    unpaid_bills = db.query(Bill).filter(Bill.status == "not paid").count()
+    return summary_cache.get_or_set(
+        "bill_summary",
+        lambda: _bill_summary(db),
+        tables=("bills", "payments", "bill_daily_stats")
+    )
+
+
+def _bill_summary(db: Session) -> BillSummary:
+    """Totaux de toutes les factures, en une requête sur bill_daily_stats"""
+
+    row = db.query(
+        func.coalesce(func.sum(BillDailyStat.total_bills), 0).label("total_bills"),
+        func.sum(BillDailyStat.total_revenue).label("total_revenue"),
+        func.sum(BillDailyStat.total_paid).label("total_paid"),
+        func.sum(BillDailyStat.total_pending).label("total_pending"),
+        func.coalesce(func.sum(BillDailyStat.paid_bills), 0).label("paid_bills"),
+        func.coalesce(func.sum(BillDailyStat.unpaid_bills), 0).label("unpaid_bills")
+    ).one()
 
     return BillSummary(
-        total_bills=total_bills,
-        total_revenue=total_revenue,
-        total_paid=total_paid,
-        total_pending=total_pending,
-        paid_bills=paid_bills,
-        unpaid_bills=unpaid_bills
+        total_bills=row.total_bills,
+        total_revenue=row.total_revenue or Decimal('0.00'),
+        total_paid=row.total_paid or Decimal('0.00'),
+        total_pending=row.total_pending or Decimal('0.00'),
+        paid_bills=row.paid_bills,
+        unpaid_bills=row.unpaid_bills
     )
 
 # summary monthly bills - Fixed for PostgreSQL
@@ -459,16 +352,7 @@ def get_monthly_bill_summary(
 
     monthly_summary = []
 
-    # PostgreSQL uses TO_CHAR instead of strftime
-    results = db.query(
-        func.to_char(Bill.created_at, 'YYYY-MM').label("month"),
-        func.count(Bill.id).label("total_bills"),
-        func.sum(Bill.total_amount).label("total_revenue"),
-        func.sum(Bill.total_paid).label("total_paid"),
-        func.sum(Bill.total_remaining).label("total_pending")
-    ).group_by("month").order_by("month").all()
-
-    for row in results:
+    for row in _rollup_rows(db, 'YYYY-MM'):
         monthly_summary.append(BillSummary(
             total_bills=row.total_bills,
             total_revenue=row.total_revenue or Decimal('0.00'),
@@ -481,6 +365,56 @@ def get_monthly_bill_summary(
     return monthly_summary
 
 
+@router.get("/export")
+def export_bills(
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    scope: str = Query("bills", pattern="^(bills|items)$",
+                       description="bills: une ligne par facture, items: une ligne par article"),
+    start_date: Optional[date] = Query(None, description="Date de début (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="Date de fin incluse (YYYY-MM-DD)"),
+    status_filter: Optional[str] = None,
+    current_admin=Depends(get_current_admin)
+):
+    """Exporter les factures en CSV ou NDJSON, en flux (admin seulement)"""
+
+    filters = date_range_filters(Bill.created_at, start_date, end_date)
+    if status_filter:
+        filters.append(Bill.status == status_filter)
+
+    if scope == "items":
+        statement = select(
+            BillItem.bill_id,
+            Bill.bill_number,
+            Bill.client_id,
+            Bill.status,
+            Bill.created_at.label("bill_created_at"),
+            BillItem.id.label("item_id"),
+            BillItem.product_id,
+            BillItem.product_name,
+            BillItem.unit_price,
+            BillItem.quantity,
+            BillItem.subtotal
+        ).join(Bill, BillItem.bill_id == Bill.id).where(*filters).order_by(
+            Bill.created_at, Bill.id, BillItem.id)
+    else:
+        statement = select(
+            Bill.id,
+            Bill.bill_number,
+            Bill.client_id,
+            Client.username.label("client_name"),
+            Client.email.label("client_email"),
+            Bill.total_amount,
+            Bill.total_paid,
+            Bill.total_remaining,
+            Bill.status,
+            Bill.created_at,
+            Bill.updated_at
+        ).join(Client, Bill.client_id == Client.id).where(*filters).order_by(
+            Bill.created_at, Bill.id)
+
+    return export_response(statement, "bills" if scope == "bills" else "bill-items", export_format)
+
+
 @router.get("/{bill_id}", response_model=BillWithItems)
 def get_bill_by_id(
     bill_id: int,
@@ -489,7 +423,7 @@ def get_bill_by_id(
 ):
     """Obtenir une facture par son ID"""
 
-    bill = db.query(Bill).filter(Bill.id == bill_id).first()
+    bill = bill_query(db, "with_items").filter(Bill.id == bill_id).first()
     if not bill:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -529,15 +463,22 @@ def get_bill_by_id(
 
 
 @router.post("/{bill_id}/pay", response_model=BillResponse)
+@retry_on_bill_conflict
 def pay_bill(
     bill_id: int,
     amount: Decimal = Query(..., gt=0, description="Amount to pay"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_admin=Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Payer une facture (admin seulement)"""
 
-    bill = db.query(Bill).filter(Bill.id == bill_id).first()
+    idem = begin_idempotent(db, idempotency_key, "admin", current_admin.id,
+                            "POST /bill/{bill_id}/pay", {"bill_id": bill_id, "amount": amount})
+    if idem.replay:
+        return idem.replay
+
+    bill = bill_query(db).filter(Bill.id == bill_id).first()
     if not bill:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -556,17 +497,13 @@ def pay_bill(
             detail="Le montant payé dépasse le montant restant"
         )
 
-    # Mettre à jour les montants de la facture
-    bill.total_paid += amount
-    bill.total_remaining -= amount
+    # Mettre à jour les montants et le statut (UPDATE atomique, version vérifiée)
+    stats_before = bill_stats_snapshot(bill)
+    apply_bill_payment(db, bill, amount)
 
-    if bill.total_remaining == Decimal('0.00'):
-        bill.status = "paid"
-
-    db.commit()
-    db.refresh(bill)
+    record_bill_stats(db, bill, stats_before)
 
-    return BillResponse(
+    response = BillResponse(
         id=bill.id,
         bill_number=bill.bill_number,
         client_id=bill.client_id,
@@ -579,6 +516,11 @@ def pay_bill(
         notification_sent=bill.notification_sent
     )
 
+    idem.store(db, response)
+    db.commit()
+
+    return response
+
 
 @router.get("/admin/{bill_id}", response_model=BillWithClient)
 def get_bill_by_id_admin(
@@ -588,7 +530,7 @@ def get_bill_by_id_admin(
 ):
     """Obtenir une facture par son ID (admin seulement)"""
 
-    bill = db.query(Bill).filter(Bill.id == bill_id).first()
+    bill = bill_query(db, "with_client").filter(Bill.id == bill_id).first()
     if not bill:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
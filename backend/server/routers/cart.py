@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends, status
+from sqlalchemy.orm import Session
+from schemas.cart import CartItemUpdate, CartResponse
+from utils.db import get_db
+from utils.auth import get_current_client
+from utils.stock_reservations import get_cart, release_cart_items, reserve_cart_item
+
+router = APIRouter(prefix="/cart", tags=["Cart"])
+
+
+@router.get("/", response_model=CartResponse)
+def get_my_cart(
+    current_client=Depends(get_current_client),
+    db: Session = Depends(get_db)
+):
+    """Obtenir le panier du client connecté, avec ses réservations de stock"""
+
+    return get_cart(db, current_client.id)
+
+
+@router.put("/items/{product_id}", response_model=CartResponse)
+def set_cart_item(
+    product_id: int,
+    item: CartItemUpdate,
+    current_client=Depends(get_current_client),
+    db: Session = Depends(get_db)
+):
+    """
+    Fixer la quantité d'un produit dans le panier (client seulement)
+
+    La quantité est réservée sur le stock jusqu'à l'expiration du panier,
+    prolongée à chaque modification. Une quantité de 0 retire le produit.
+    """
+
+    reserve_cart_item(db, current_client.id, product_id, item.quantity)
+    db.commit()
+
+    return get_cart(db, current_client.id)
+
+
+@router.delete("/items/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
+def remove_cart_item(
+    product_id: int,
+    current_client=Depends(get_current_client),
+    db: Session = Depends(get_db)
+):
+    """Retirer un produit du panier et libérer sa réservation"""
+
+    release_cart_items(db, current_client.id, [product_id])
+    db.commit()
+    
+    return None
+
+
+@router.delete("/", status_code=status.HTTP_204_NO_CONTENT)
+def clear_cart(
+    current_client=Depends(get_current_client),
+    db: Session = Depends(get_db)
+):
+    """Vider le panier et libérer toutes ses réservations"""
+
+    release_cart_items(db, current_client.id)
+    db.commit()
+    
+    return None
@@ -7,6 +7,7 @@ from models.product import Product
 from schemas.category import CategoryCreate, CategoryUpdate, CategoryResponse, CategoryWithCount
 from utils.db import get_db
 from utils.auth import get_current_admin
+from utils.catalog_version import catalog_etag
 
 router = APIRouter(prefix="/category", tags=["Category"])
 
@@ -33,7 +34,7 @@ def create_category(
     
     return new_category
 
-@router.get("/", response_model=List[CategoryWithCount])
+@router.get("/", response_model=List[CategoryWithCount], dependencies=[Depends(catalog_etag)])
 def get_all_categories(
     skip: int = 0,
     limit: int = 100,
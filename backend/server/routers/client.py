@@ -1,21 +1,31 @@
 # routes/client.py (Updated version)
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import func
+from datetime import date
 from typing import List
 from models.client import Client
-from models.bill import Bill
+from models.client_balance import ClientBalance
 from models.otp import OTP
-from schemas.client import ClientCreate, ClientUpdate, ClientLogin, ClientResponse, ClientWithToken, ClientSummary
+from schemas.client import (
+    ClientCreate, ClientUpdate, ClientLogin, ClientResponse, ClientWithToken, ClientSummary,
+    ClientAgingReport
+)
 from utils.db import get_db
-from utils.auth import hash_password, verify_password, create_access_token, get_current_client, get_current_admin
+from utils.auth import (
+    hash_password, hash_password_async, verify_password_async, password_needs_rehash,
+    create_access_token, get_current_client, get_current_admin, invalidate_principal
+)
+from utils.pagination import CursorPage
+from utils.sales_stats import remove_client_bills_from_stats
+from utils.client_balances import aging_totals, client_aging
 
 router = APIRouter(prefix="/client", tags=["Client"])
 
 
-@router.post("/register", response_model=ClientResponse, status_code=status.HTTP_201_CREATED)
-def register_client(client_data: ClientCreate, db: Session = Depends(get_db)):
-    """Enregistrer un nouveau client (nécessite vérification OTP préalable)"""
+def _check_client_registration(db: Session, client_data: ClientCreate):
+    """Vérifier l'OTP et l'unicité de l'email, du nom d'utilisateur et du téléphone"""
 
     # Vérifier si l'OTP a été vérifié pour cet email
     verified_otp = db.query(OTP).filter(
@@ -59,31 +69,52 @@ def register_client(client_data: ClientCreate, db: Session = Depends(get_db)):
             detail="Ce numéro de téléphone est déjà utilisé"
         )
 
+    # Rendre la connexion au pool pendant le hachage bcrypt
+    db.close()
+
+
+def _save_client(db: Session, client: Client) -> Client:
+    db.add(client)
+    db.commit()
+    db.refresh(client)
+    return client
+
+
+@router.post("/register", response_model=ClientResponse, status_code=status.HTTP_201_CREATED)
+async def register_client(client_data: ClientCreate, db: Session = Depends(get_db)):
+    """Enregistrer un nouveau client (nécessite vérification OTP préalable)"""
+
+    # Requêtes SQL dans le threadpool, bcrypt dans son pool dédié
+    await run_in_threadpool(_check_client_registration, db, client_data)
+
     # Créer le nouveau client
     new_client = Client(
         username=client_data.username,
         email=client_data.email,
-        password_hash=hash_password(client_data.password),
+        password_hash=await hash_password_async(client_data.password),
         phone_number=client_data.phone_number,
         address=client_data.address,
         city=client_data.city,
         is_active=True  # Account is active after email verification
     )
 
-    db.add(new_client)
-    db.commit()
-    db.refresh(new_client)
+    return await run_in_threadpool(_save_client, db, new_client)
+
 
-    return new_client
+def _find_client_by_email(db: Session, email: str):
+    client = db.query(Client).filter(Client.email == email).first()
+    # Rendre la connexion au pool pendant la vérification bcrypt
+    db.close()
+    return client
 
 
 @router.post("/login", response_model=ClientWithToken)
-def login_client(login_data: ClientLogin, db: Session = Depends(get_db)):
+async def login_client(login_data: ClientLogin, db: Session = Depends(get_db)):
     """Connexion client"""
 
-    client = db.query(Client).filter(Client.email == login_data.email).first()
+    client = await run_in_threadpool(_find_client_by_email, db, login_data.email)
 
-    if not client or not verify_password(login_data.password, client.password_hash):
+    if not client or not await verify_password_async(login_data.password, client.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou mot de passe incorrect"
@@ -95,6 +126,12 @@ def login_client(login_data: ClientLogin, db: Session = Depends(get_db)):
             detail="Votre compte est désactivé"
         )
 
+    # Mettre à jour le hachage si le coût bcrypt configuré a changé
+    if password_needs_rehash(client.password_hash):
+        client.password_hash = await hash_password_async(login_data.password)
+        await run_in_threadpool(_save_client, db, client)
+        invalidate_principal("client", client.id)
+
     access_token = create_access_token(
         data={"sub": str(client.id), "type": "client"})
 
@@ -152,6 +189,7 @@ def update_client_profile(
         current_client.password_hash = hash_password(client_data.password)
 
     db.commit()
+    invalidate_principal("client", current_client.id)
     db.refresh(current_client)
 
     return current_client
@@ -159,18 +197,20 @@ def update_client_profile(
 
 @router.get("/", response_model=List[ClientSummary])
 def get_all_clients(
-    skip: int = 0,
-    limit: int = 100,
+    page: CursorPage = Depends(),
     current_admin=Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Obtenir la liste de tous les clients (admin seulement)"""
 
-    clients = db.query(
+    # Soldes tenus à jour à chaque écriture de facture (utils/client_balances.py)
+    query = db.query(
         Client,
-        func.count(Bill.id).label('total_bills'),
-        func.coalesce(func.sum(Bill.total_remaining), 0).label('total_debt')
-    ).outerjoin(Bill).group_by(Client.id).offset(skip).limit(limit).all()
+        func.coalesce(ClientBalance.total_bills, 0).label('total_bills'),
+        func.coalesce(ClientBalance.total_debt, 0).label('total_debt')
+    ).outerjoin(ClientBalance, ClientBalance.client_id == Client.id)
+
+    clients = page.paginate(query, Client, row_key=lambda row: row[0])
 
     result = []
     for client, total_bills, total_debt in clients:
@@ -188,6 +228,53 @@ def get_all_clients(
     return result
 
 
+@router.get("/aging", response_model=ClientAgingReport)
+def get_clients_aging(
+    sort: str = Query("debt_desc", pattern="^(debt_desc|debt_asc)$"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_admin=Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Balance âgée des créances clients: 0-30, 31-60, 61-90 et 90+ jours (admin seulement)"""
+
+    today = date.today()
+    # Même sens pour les deux colonnes: l'index (total_debt, client_id) fournit l'ordre complet
+    if sort == "debt_desc":
+        order = (ClientBalance.total_debt.desc(), ClientBalance.client_id.desc())
+    else:
+        order = (ClientBalance.total_debt.asc(), ClientBalance.client_id.asc())
+
+    # Page triée par dette (index partiel sur client_balances), puis tranches des seuls clients de la page
+    rows = db.query(
+        ClientBalance.client_id,
+        ClientBalance.total_bills,
+        ClientBalance.total_debt,
+        Client.username,
+        Client.email,
+        Client.phone_number
+    ).join(
+        Client, Client.id == ClientBalance.client_id
+    ).filter(
+        ClientBalance.total_debt > 0
+    ).order_by(*order).offset(skip).limit(limit).all()
+
+    buckets = client_aging(db, [row.client_id for row in rows], today)
+
+    totals = db.query(
+        func.count(ClientBalance.client_id),
+        func.coalesce(func.sum(ClientBalance.total_debt), 0)
+    ).filter(ClientBalance.total_debt > 0).one()
+
+    return ClientAgingReport(
+        as_of=today,
+        total_clients=totals[0],
+        total_debt=totals[1],
+        totals=aging_totals(db, today),
+        clients=[{**row._asdict(), **buckets.get(row.client_id, {})} for row in rows]
+    )
+
+
 @router.get("/{client_id}", response_model=ClientResponse)
 def get_client_by_id(
     client_id: int,
@@ -223,6 +310,7 @@ def toggle_client_active(
 
     client.is_active = not client.is_active
     db.commit()
+    invalidate_principal("client", client_id)
     db.refresh(client)
 
     return client
@@ -243,7 +331,11 @@ def delete_client(
             detail="Client non trouvé"
         )
 
+    # Retirer ses factures des statistiques journalières
+    remove_client_bills_from_stats(db, client.id)
+
     db.delete(client)
     db.commit()
+    invalidate_principal("client", client_id)
 
     return None
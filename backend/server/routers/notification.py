@@ -1,17 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from sqlalchemy import func
 from typing import List
 from models.notification import Notification
 from schemas.notification import NotificationResponse, NotificationSummary
 from utils.db import get_db
 from utils.auth import get_current_admin
+from utils.pagination import CursorPage
+from utils.cache import summary_cache
+from utils.notification_dispatcher import dispatch_pending
 
 router = APIRouter(prefix="/notification", tags=["Notification"])
 
 @router.get("/", response_model=List[NotificationResponse])
 def get_all_notifications(
-    skip: int = 0,
-    limit: int = 100,
+    page: CursorPage = Depends(),
     is_sent: bool = None,
     notification_type: str = None,
     current_admin = Depends(get_current_admin),
@@ -27,7 +30,7 @@ def get_all_notifications(
     if notification_type:
         query = query.filter(Notification.notification_type == notification_type)
     
-    notifications = query.order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
+    notifications = page.paginate(query, Notification)
     
     return notifications
 
@@ -51,18 +54,29 @@ def get_notification_summary(
 ):
     """Obtenir le résumé des notifications (admin seulement)"""
     
-    total_notifications = db.query(Notification).count()
-    sent_notifications = db.query(Notification).filter(Notification.is_sent == True).count()
-    pending_notifications = db.query(Notification).filter(Notification.is_sent == False).count()
-    email_notifications = db.query(Notification).filter(Notification.channel == "email").count()
-    whatsapp_notifications = db.query(Notification).filter(Notification.channel == "whatsapp").count()
+    return summary_cache.get_or_set(
+        "notification_summary",
+        lambda: _notification_summary(db),
+        tables=("notifications",)
+    )
+
+def _notification_summary(db: Session) -> NotificationSummary:
+    """Compteurs des notifications en une seule requête (agrégats conditionnels)"""
+    
+    row = db.query(
+        func.count(Notification.id).label("total_notifications"),
+        func.count(Notification.id).filter(Notification.is_sent == True).label("sent_notifications"),
+        func.count(Notification.id).filter(Notification.is_sent == False).label("pending_notifications"),
+        func.count(Notification.id).filter(Notification.channel == "email").label("email_notifications"),
+        func.count(Notification.id).filter(Notification.channel == "whatsapp").label("whatsapp_notifications")
+    ).one()
     
     return NotificationSummary(
-        total_notifications=total_notifications,
-        sent_notifications=sent_notifications,
-        pending_notifications=pending_notifications,
-        email_notifications=email_notifications,
-        whatsapp_notifications=whatsapp_notifications
+        total_notifications=row.total_notifications,
+        sent_notifications=row.sent_notifications,
+        pending_notifications=row.pending_notifications,
+        email_notifications=row.email_notifications,
+        whatsapp_notifications=row.whatsapp_notifications
     )
 
 @router.get("/{notification_id}", response_model=NotificationResponse)
@@ -140,23 +154,10 @@ def send_pending_notifications(
 ):
     """Envoyer toutes les notifications en attente (admin seulement)"""
     
-    from datetime import datetime
-    
-    pending_notifications = db.query(Notification).filter(
-        Notification.is_sent == False
-    ).all()
-    
-    sent_count = 0
-    for notification in pending_notifications:
-        # Ici, vous devrez implémenter la logique d'envoi réel (email/WhatsApp)
-        # Pour l'instant, nous marquons simplement comme envoyé
-        notification.is_sent = True
-        notification.sent_at = datetime.now()
-        sent_count += 1
-    
-    db.commit()
+    result = dispatch_pending(db)
     
     return {
-        "message": f"{sent_count} notification(s) envoyée(s) avec succès",
-        "count": sent_count
+        "message": f"{result['sent']} notification(s) envoyée(s) avec succès",
+        "count": result["sent"],
+        "failed": result["failed"]
     }
\ No newline at end of file
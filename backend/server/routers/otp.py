@@ -1,6 +1,7 @@
 
 # routes/otp.py
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from models.admin import Admin
 from models.client import Client
@@ -8,7 +9,7 @@ from schemas.otp import OTPRequest, OTPVerify, OTPResponse, PasswordReset
 from utils.db import get_db
 from utils.otp_service import OTPService
 from utils.email_service import EmailService
-from utils.auth import hash_password
+from utils.auth import hash_password_async, invalidate_principal
 
 router = APIRouter(prefix="/otp", tags=["OTP"])
 email_service = EmailService()
@@ -85,9 +86,8 @@ def verify_otp(otp_verify: OTPVerify, db: Session = Depends(get_db)):
     }
 
 
-@router.post("/reset-password", response_model=OTPResponse)
-def reset_password(reset_data: PasswordReset, db: Session = Depends(get_db)):
-    """Reset password using OTP"""
+def _find_reset_account(db: Session, reset_data: PasswordReset):
+    """Vérifier l'OTP puis trouver le compte (client ou admin) de l'email"""
 
     # Verify OTP first
     is_valid = OTPService.verify_otp(
@@ -103,7 +103,6 @@ def reset_password(reset_data: PasswordReset, db: Session = Depends(get_db)):
             detail="Code OTP invalide ou expiré"
         )
 
-    # Update password
     client = db.query(Client).filter(Client.email == reset_data.email).first()
     admin = db.query(Admin).filter(Admin.email == reset_data.email).first()
 
@@ -114,13 +113,36 @@ def reset_password(reset_data: PasswordReset, db: Session = Depends(get_db)):
             detail="Client non trouvé"
         )
 
-    if client :
-        client.password_hash = hash_password(reset_data.new_password)
-    elif admin :
-        admin.password_hash = hash_password(reset_data.new_password)
+    # Rendre la connexion au pool pendant le hachage bcrypt
+    db.close()
 
+    return client, admin
+
+
+def _save_password(db: Session, account, password_hash: str):
+    account.password_hash = password_hash
+    db.add(account)
     db.commit()
 
+
+@router.post("/reset-password", response_model=OTPResponse)
+async def reset_password(reset_data: PasswordReset, db: Session = Depends(get_db)):
+    """Reset password using OTP"""
+
+    client, admin = await run_in_threadpool(_find_reset_account, db, reset_data)
+
+    # Update password
+    password_hash = await hash_password_async(reset_data.new_password)
+
+    if client :
+        account_type, account = "client", client
+    else :
+        account_type, account = "admin", admin
+    account_id = account.id
+
+    await run_in_threadpool(_save_password, db, account, password_hash)
+    invalidate_principal(account_type, account_id)
+
     return {
         "message": "Mot de passe réinitialisé avec succès",
         "email": reset_data.email
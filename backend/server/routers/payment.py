@@ -1,25 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from typing import List
-from decimal import Decimal
+from sqlalchemy import func, select
+from typing import List, Optional
+from datetime import date
 from models.payment import Payment
 from models.bill import Bill
-from schemas.payment import PaymentCreate, PaymentUpdate, PaymentResponse, PaymentHistory
+from models.client import Client
+from schemas.payment import (
+    PaymentCreate, PaymentUpdate, PaymentResponse, PaymentHistory,
+    BulkPaymentCreate, BulkPaymentResponse
+)
 from utils.db import get_db
 from utils.auth import get_current_admin
+from utils.queries import bill_query, payment_query
+from utils.pagination import CursorPage
+from utils.sales_stats import bill_stats_snapshot, record_bill_stats
+from utils.export import date_range_filters, export_response
+from utils.idempotency import begin_idempotent
+from utils.bill_payments import apply_bill_payment, apply_bulk_payment, retry_on_bill_conflict
 
 router = APIRouter(prefix="/payment", tags=["Payment"])
 
 @router.post("/", response_model=PaymentResponse, status_code=status.HTTP_201_CREATED)
+@retry_on_bill_conflict
 def create_payment(
     payment_data: PaymentCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_admin = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Créer un nouveau paiement (admin seulement)"""
     
+    idem = begin_idempotent(db, idempotency_key, "admin", current_admin.id,
+                            "POST /payment/", payment_data)
+    if idem.replay:
+        return idem.replay
+    
     # Vérifier si la facture existe
-    bill = db.query(Bill).filter(Bill.id == payment_data.bill_id).first()
+    bill = bill_query(db).filter(Bill.id == payment_data.bill_id).first()
     if not bill:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -45,20 +63,75 @@ def create_payment(
     
     db.add(new_payment)
     
-    # Mettre à jour les totaux de la facture
-    bill.total_paid += payment_data.amount_paid
-    bill.total_remaining -= payment_data.amount_paid
+    # Mettre à jour les totaux et le statut de la facture (UPDATE atomique, version vérifiée)
+    stats_before = bill_stats_snapshot(bill)
+    apply_bill_payment(db, bill, payment_data.amount_paid)
     
-    # Mettre à jour le statut de la facture
-    if bill.total_remaining <= Decimal('0.00'):
-        bill.status = "paid"
-    else:
-        bill.status = "not paid"
+    record_bill_stats(db, bill, stats_before)
     
-    db.commit()
+    # Charger created_at avant le commit pour enregistrer la réponse avec la clé
+    db.flush()
     db.refresh(new_payment)
+    response = PaymentResponse.model_validate(new_payment)
+    
+    idem.store(db, response, status.HTTP_201_CREATED)
+    db.commit()
+    
+    return response
+
+@router.post("/bulk", response_model=BulkPaymentResponse, status_code=status.HTTP_201_CREATED)
+def create_bulk_payment(
+    payment_data: BulkPaymentCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_admin = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Répartir un virement sur plusieurs factures d'un client (admin seulement)"""
+    
+    idem = begin_idempotent(db, idempotency_key, "admin", current_admin.id,
+                            "POST /payment/bulk", payment_data)
+    if idem.replay:
+        return idem.replay
+    
+    if not db.query(Client.id).filter(Client.id == payment_data.client_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Client non trouvé"
+        )
     
-    return new_payment
+    allocations = None
+    if payment_data.allocations:
+        allocations = [(a.bill_id, a.amount_paid) for a in payment_data.allocations]
+    
+    result = apply_bulk_payment(
+        db,
+        admin_id=current_admin.id,
+        client_id=payment_data.client_id,
+        allocations=allocations,
+        payment_fields={
+            "payment_method": payment_data.payment_method,
+            "notes": payment_data.notes,
+            "payment_date": payment_data.payment_date
+        },
+        amount=payment_data.amount
+    )
+    
+    remaining_debt = db.query(
+        func.coalesce(func.sum(Bill.total_remaining), 0)
+    ).filter(Bill.client_id == payment_data.client_id).scalar()
+    
+    response = BulkPaymentResponse(
+        client_id=payment_data.client_id,
+        total_paid=result["total_paid"],
+        remaining_debt=remaining_debt,
+        payments=[PaymentResponse.model_validate(p) for p in result["payments"]],
+        bills=[bill._asdict() for bill in result["bills"]]
+    )
+    
+    idem.store(db, response, status.HTTP_201_CREATED)
+    db.commit()
+    
+    return response
 
 @router.get("/bill/{bill_id}", response_model=PaymentHistory)
 def get_bill_payment_history(
@@ -68,14 +141,14 @@ def get_bill_payment_history(
 ):
     """Obtenir l'historique des paiements d'une facture (admin seulement)"""
     
-    bill = db.query(Bill).filter(Bill.id == bill_id).first()
+    bill = bill_query(db, "with_payments").filter(Bill.id == bill_id).first()
     if not bill:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Facture non trouvée"
         )
     
-    payments = db.query(Payment).filter(Payment.bill_id == bill_id).all()
+    payments = bill.payments
     
     return PaymentHistory(
         bill_id=bill.id,
@@ -97,16 +170,46 @@ def get_bill_payment_history(
 
 @router.get("/", response_model=List[PaymentResponse])
 def get_all_payments(
-    skip: int = 0,
-    limit: int = 100,
+    page: CursorPage = Depends(),
     current_admin = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Obtenir tous les paiements (admin seulement)"""
     
-    payments = db.query(Payment).offset(skip).limit(limit).all()
+    payments = page.paginate(payment_query(db), Payment)
     return payments
 
+@router.get("/export")
+def export_payments(
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    start_date: Optional[date] = Query(None, description="Date de paiement de début (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="Date de paiement de fin incluse (YYYY-MM-DD)"),
+    status_filter: Optional[str] = Query(None, description="Statut de la facture"),
+    current_admin = Depends(get_current_admin)
+):
+    """Exporter les paiements en CSV ou NDJSON, en flux (admin seulement)"""
+    
+    filters = date_range_filters(Payment.payment_date, start_date, end_date)
+    if status_filter:
+        filters.append(Bill.status == status_filter)
+    
+    statement = select(
+        Payment.id,
+        Payment.bill_id,
+        Bill.bill_number,
+        Bill.client_id,
+        Bill.status.label("bill_status"),
+        Payment.admin_id,
+        Payment.amount_paid,
+        Payment.payment_method,
+        Payment.notes,
+        Payment.payment_date,
+        Payment.created_at
+    ).join(Bill, Payment.bill_id == Bill.id).where(*filters).order_by(
+        Payment.payment_date, Payment.id)
+    
+    return export_response(statement, "payments", export_format)
+
 @router.get("/{payment_id}", response_model=PaymentResponse)
 def get_payment_by_id(
     payment_id: int,
@@ -115,7 +218,7 @@ def get_payment_by_id(
 ):
     """Obtenir un paiement par son ID (admin seulement)"""
     
-    payment = db.query(Payment).filter(Payment.id == payment_id).first()
+    payment = payment_query(db).filter(Payment.id == payment_id).first()
     if not payment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -125,6 +228,7 @@ def get_payment_by_id(
     return payment
 
 @router.put("/{payment_id}", response_model=PaymentResponse)
+@retry_on_bill_conflict
 def update_payment(
     payment_id: int,
     payment_data: PaymentUpdate,
@@ -133,37 +237,32 @@ def update_payment(
 ):
     """Mettre à jour un paiement (admin seulement)"""
     
-    payment = db.query(Payment).filter(Payment.id == payment_id).first()
+    payment = payment_query(db, "with_bill").filter(Payment.id == payment_id).first()
     if not payment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Paiement non trouvé"
         )
     
-    bill = db.query(Bill).filter(Bill.id == payment.bill_id).first()
+    bill = payment.bill
+    stats_before = bill_stats_snapshot(bill)
     
     # Si le montant change, recalculer les totaux de la facture
     if payment_data.amount_paid and payment_data.amount_paid != payment.amount_paid:
-        # Restaurer l'ancien montant
-        bill.total_paid -= payment.amount_paid
-        bill.total_remaining += payment.amount_paid
+        # Montant restant sans l'ancien paiement
+        available = bill.total_remaining + payment.amount_paid
         
-        # Appliquer le nouveau montant
-        if payment_data.amount_paid > bill.total_remaining:
+        if payment_data.amount_paid > available:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Le nouveau montant ({payment_data.amount_paid}) dépasse le montant restant ({bill.total_remaining})"
+                detail=f"Le nouveau montant ({payment_data.amount_paid}) dépasse le montant restant ({available})"
             )
         
-        bill.total_paid += payment_data.amount_paid
-        bill.total_remaining -= payment_data.amount_paid
+        # Appliquer la différence (UPDATE atomique, version vérifiée)
+        apply_bill_payment(db, bill, payment_data.amount_paid - payment.amount_paid)
         payment.amount_paid = payment_data.amount_paid
         
-        # Mettre à jour le statut
-        if bill.total_remaining <= Decimal('0.00'):
-            bill.status = "paid"
-        else:
-            bill.status = "not paid"
+        record_bill_stats(db, bill, stats_before)
     
     # Mettre à jour les autres champs
     if payment_data.payment_method is not None:
@@ -179,6 +278,7 @@ def update_payment(
     return payment
 
 @router.delete("/{payment_id}", status_code=status.HTTP_204_NO_CONTENT)
+@retry_on_bill_conflict
 def delete_payment(
     payment_id: int,
     current_admin = Depends(get_current_admin),
@@ -186,21 +286,19 @@ def delete_payment(
 ):
     """Supprimer un paiement (admin seulement)"""
     
-    payment = db.query(Payment).filter(Payment.id == payment_id).first()
+    payment = payment_query(db, "with_bill").filter(Payment.id == payment_id).first()
     if not payment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Paiement non trouvé"
         )
     
-    # Restaurer les totaux de la facture
-    bill = db.query(Bill).filter(Bill.id == payment.bill_id).first()
-    bill.total_paid -= payment.amount_paid
-    bill.total_remaining += payment.amount_paid
+    # Restaurer les totaux et le statut de la facture (UPDATE atomique, version vérifiée)
+    bill = payment.bill
+    stats_before = bill_stats_snapshot(bill)
+    apply_bill_payment(db, bill, -payment.amount_paid)
     
-    # Mettre à jour le statut
-    if bill.total_remaining > Decimal('0.00'):
-        bill.status = "not paid"
+    record_bill_stats(db, bill, stats_before)
     
     db.delete(payment)
     db.commit()
@@ -1,25 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from sqlalchemy.exc import DataError, IntegrityError
 from sqlalchemy.orm import Session
-from typing import List, Optional
-import json
+from datetime import datetime
+from typing import List, Literal, Optional
 
 from models.product import Product
 from models.category import Category
+from models.stock_movement import StockMovement
 from schemas.product import (
     ProductCount, ProductCreate, ProductUpdate, 
     ProductResponse, ProductWithCategory, 
-    ProductStockStatus, StockUpdate
+    ProductImportResult, ProductSearchResult, ProductStockStatus,
+    StockAtResponse, StockBulkResult, StockBulkUpdate, StockMovementResponse, StockUpdate
 )
 from utils.db import get_db
 from utils.auth import get_current_admin
-from utils.stock_manager import check_and_create_stock_alert
+from utils.catalog_snapshot import PRODUCT_LIST_COLUMNS, catalog_snapshot
+from utils.catalog_version import catalog_etag, snapshot_response
+from utils.stock_manager import apply_stock_adjustments, check_and_create_stock_alert
+from utils.pagination import NEXT_CURSOR_HEADER, CursorPage
+from utils.product_import import ProductImportError, import_products
+from utils.product_search import search_products
+from utils.stock_ledger import set_stock_movement_context, stock_at
+from utils.responses import FastJSONResponse, rows_as_dicts
 
 router = APIRouter(prefix="/product", tags=["Product"])
 
 
 @router.post("/", response_model=ProductResponse, 
-             status_code=status.HTTP_201_CREATED, 
-             dependencies=[Depends(get_current_admin)])
+             status_code=status.HTTP_201_CREATED)
 def create_product(
     product_data: ProductCreate,
     current_admin=Depends(get_current_admin),
@@ -36,14 +45,20 @@ def create_product(
             detail="Category not found"
         )
 
-    product_dict = product_data.dict(exclude={'category_id', 'image_urls'})
+    if product_data.sku and db.query(Product.id).filter(Product.sku == product_data.sku).first():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="SKU already exists"
+        )
+
+    product_dict = product_data.dict(exclude={'category_id'})
     new_product = Product(
         **product_dict,
         category_id=product_data.category_id,
-        admin_id=current_admin.id,
-        image_urls=json.dumps(product_data.image_urls)
+        admin_id=current_admin.id
     )
 
+    set_stock_movement_context(db, "initial", admin_id=current_admin.id)
     db.add(new_product)
     db.commit()
     db.refresh(new_product)
@@ -52,6 +67,69 @@ def create_product(
     return _format_product_response(new_product)
 
 
+@router.post("/import", response_model=ProductImportResult)
+def import_product_catalog(
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "ndjson"]] = None,
+    current_admin=Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Create or update products from a CSV or NDJSON file (admin only)
+
+    Rows are matched on sku, or on name when they have no sku. Empty fields keep
+    the current value. The whole file is imported in one transaction, or not at all.
+    """
+    
+    if format is None:
+        extension = (file.filename or "").rsplit(".", 1)[-1].lower()
+        format = {"csv": "csv", "ndjson": "ndjson", "jsonl": "ndjson"}.get(extension)
+    if format is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unknown file format, use format=csv or format=ndjson"
+        )
+
+    try:
+        result = import_products(db, file.file, format, current_admin.id)
+        db.commit()
+    except ProductImportError as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except DataError as e:
+        # Malformed JSON line (rejected by the jsonb cast)
+        db.rollback()
+        detail = f"Invalid file: {e.orig.diag.message_primary}"
+        if e.orig.diag.context:
+            detail += f" ({e.orig.diag.context.splitlines()[0]})"
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+    except IntegrityError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Import conflicts with existing products: {e.orig.diag.message_detail or e.orig.diag.message_primary}"
+        )
+    
+    return result
+
+
+@router.post("/stock/bulk", response_model=StockBulkResult)
+def bulk_update_stock(
+    stock_update: StockBulkUpdate,
+    current_admin=Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Apply an inventory count to many products at once (admin only)
+
+    Each item sets the counted quantity or applies a delta. All accepted items are
+    written in one transaction with their stock alerts; unknown products and items
+    that would make the stock negative are reported and skipped.
+    """
+    
+    return apply_stock_adjustments(db, stock_update.items, admin_id=current_admin.id)
+
+
 @router.get("/count", response_model=ProductCount)
 def get_product_count(db: Session = Depends(get_db)):
     """Get total product count"""
@@ -61,15 +139,24 @@ def get_product_count(db: Session = Depends(get_db)):
 
 @router.get("/", response_model=List[ProductWithCategory])
 def get_all_products(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    page: CursorPage = Depends(),
     category_id: Optional[int] = None,
     is_active: Optional[bool] = None,
     db: Session = Depends(get_db)
 ):
-    """Get all products"""
+    """Get all products (served from the in-memory catalog snapshot when it is current)"""
+    
+    if catalog_snapshot.is_current():
+        body, next_cursor = catalog_snapshot.list_products(
+            category_id, is_active, page.cursor, page.skip, page.limit)
+        return snapshot_response(
+            request, body, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+    
+    catalog_etag(request, page.response, db)
     
-    query = db.query(Product)
+    query = db.query(*PRODUCT_LIST_COLUMNS, Category.name.label("category_name")).join(
+        Category, Product.category_id == Category.id)
     
     if category_id is not None:
         query = query.filter(Product.category_id == category_id)
@@ -77,26 +164,31 @@ def get_all_products(
     if is_active is not None:
         query = query.filter(Product.is_active == is_active)
     
-    products = query.offset(skip).limit(limit).all()
+    products = page.paginate(query, Product, row_key=lambda row: row)
     
-    return [
-        ProductWithCategory(
-            id=p.id,
-            name=p.name,
-            description=p.description,
-            price=p.price,
-            quantity_in_stock=p.quantity_in_stock,
-            minimum_stock_level=p.minimum_stock_level,
-            image_urls=json.loads(p.image_urls) if p.image_urls else [],
-            category_id=p.category_id,
-            admin_id=p.admin_id,
-            is_active=p.is_active,
-            created_at=p.created_at,
-            updated_at=p.updated_at,
-            category_name=p.category.name
-        )
-        for p in products
-    ]
+    return page.json_response(rows_as_dicts(products))
+
+
+@router.get("/search", response_model=List[ProductSearchResult])
+def search_product(
+    q: str = Query(..., min_length=2, max_length=100),
+    category_id: Optional[int] = None,
+    is_active: Optional[bool] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Search products by name and description, best matches first (prefix and typo tolerant)"""
+    
+    products = search_products(
+        db, q, PRODUCT_LIST_COLUMNS,
+        category_id=category_id,
+        is_active=is_active,
+        skip=skip,
+        limit=limit
+    )
+    
+    return FastJSONResponse(rows_as_dicts(products))
 
 
 @router.get("/low-stock", response_model=List[ProductStockStatus])
@@ -129,8 +221,24 @@ def get_low_stock_products(
 
 
 @router.get("/{product_id}", response_model=ProductWithCategory)
-def get_product_by_id(product_id: int, db: Session = Depends(get_db)):
-    """Get product by ID"""
+def get_product_by_id(
+    product_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """Get product by ID (served from the in-memory catalog snapshot when it is current)"""
+    
+    if catalog_snapshot.is_current():
+        body = catalog_snapshot.get_product(product_id)
+        if body is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Product not found"
+            )
+        return snapshot_response(request, body)
+    
+    catalog_etag(request, response, db)
     
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
@@ -141,12 +249,13 @@ def get_product_by_id(product_id: int, db: Session = Depends(get_db)):
 
     return ProductWithCategory(
         id=product.id,
+        sku=product.sku,
         name=product.name,
         description=product.description,
         price=product.price,
         quantity_in_stock=product.quantity_in_stock,
         minimum_stock_level=product.minimum_stock_level,
-        image_urls=json.loads(product.image_urls) if product.image_urls else [],
+        image_urls=product.image_urls,
         category_id=product.category_id,
         admin_id=product.admin_id,
         is_active=product.is_active,
@@ -156,8 +265,7 @@ def get_product_by_id(product_id: int, db: Session = Depends(get_db)):
     )
 
 
-@router.put("/{product_id}", response_model=ProductResponse,  
-            dependencies=[Depends(get_current_admin)])
+@router.put("/{product_id}", response_model=ProductResponse)
 def update_product(
     product_id: int,
     product_data: ProductUpdate,
@@ -183,14 +291,19 @@ def update_product(
                 detail="Category not found"
             )
 
+    if product_data.sku and product_data.sku != product.sku:
+        if db.query(Product.id).filter(Product.sku == product_data.sku).first():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="SKU already exists"
+            )
+
     update_data = product_data.dict(exclude_unset=True)
     
-    if 'image_urls' in update_data:
-        update_data['image_urls'] = json.dumps(update_data['image_urls'])
-    
     for field, value in update_data.items():
         setattr(product, field, value)
 
+    set_stock_movement_context(db, "adjustment", admin_id=current_admin.id)
     db.commit()
     db.refresh(product)
     check_and_create_stock_alert(db, product)
@@ -198,11 +311,11 @@ def update_product(
     return _format_product_response(product)
 
 
-@router.patch("/{product_id}/stock", response_model=ProductResponse, 
-              dependencies=[Depends(get_current_admin)])
+@router.patch("/{product_id}/stock", response_model=ProductResponse)
 def update_product_stock(
     product_id: int,
     stock_update: StockUpdate,
+    current_admin=Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Update product stock (admin only)"""
@@ -220,6 +333,7 @@ def update_product_stock(
             detail="Quantity cannot be negative"
         )
 
+    set_stock_movement_context(db, "adjustment", admin_id=current_admin.id)
     product.quantity_in_stock = stock_update.quantity
     db.commit()
     db.refresh(product)
@@ -228,8 +342,55 @@ def update_product_stock(
     return _format_product_response(product)
 
 
-@router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT, 
-               dependencies=[Depends(get_current_admin)])
+@router.get("/{product_id}/stock/movements", response_model=List[StockMovementResponse],
+            dependencies=[Depends(get_current_admin)])
+def get_stock_movements(
+    product_id: int,
+    page: CursorPage = Depends(),
+    reason: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Stock movement ledger of a product, newest first (admin only)"""
+    
+    if not db.query(Product.id).filter(Product.id == product_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+
+    query = db.query(StockMovement).filter(StockMovement.product_id == product_id)
+    if reason:
+        query = query.filter(StockMovement.reason == reason)
+    
+    return page.paginate(query, StockMovement)
+
+
+@router.get("/{product_id}/stock/at", response_model=StockAtResponse,
+            dependencies=[Depends(get_current_admin)])
+def get_stock_at(
+    product_id: int,
+    at: datetime = Query(..., description="Point in time (ISO 8601)"),
+    db: Session = Depends(get_db)
+):
+    """Stock of a product at a point in time, from the movement ledger (admin only)"""
+    
+    if not db.query(Product.id).filter(Product.id == product_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+
+    result = stock_at(db, product_id, at)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No stock history for this product at that time"
+        )
+    
+    return StockAtResponse(product_id=product_id, at=at, **result)
+
+
+@router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_product(
     product_id: int,
     current_admin=Depends(get_current_admin),
@@ -250,15 +411,16 @@ def delete_product(
 
 
 def _format_product_response(product: Product) -> ProductResponse:
-    """Helper to format product response with parsed image URLs"""
+    """Helper to format product response"""
     return ProductResponse(
         id=product.id,
+        sku=product.sku,
         name=product.name,
         description=product.description,
         price=product.price,
         quantity_in_stock=product.quantity_in_stock,
         minimum_stock_level=product.minimum_stock_level,
-        image_urls=json.loads(product.image_urls) if product.image_urls else [],
+        image_urls=product.image_urls,
         category_id=product.category_id,
         admin_id=product.admin_id,
         is_active=product.is_active,
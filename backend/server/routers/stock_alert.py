@@ -8,25 +8,27 @@ from models.product import Product
 from schemas.stock_alert import StockAlertResponse, StockAlertWithProduct, StockAlertUpdate, StockAlertSummary
 from utils.db import get_db
 from utils.auth import get_current_admin
+from utils.queries import stock_alert_query
+from utils.pagination import CursorPage
+from utils.cache import summary_cache
 
 router = APIRouter(prefix="/stock-alert", tags=["Stock Alert"])
 
 @router.get("/", response_model=List[StockAlertWithProduct])
 def get_all_stock_alerts(
-    skip: int = 0,
-    limit: int = 100,
+    page: CursorPage = Depends(),
     is_resolved: bool = None,
     current_admin = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Obtenir toutes les alertes de stock (admin seulement)"""
     
-    query = db.query(StockAlert).join(Product)
+    query = stock_alert_query(db)
     
     if is_resolved is not None:
         query = query.filter(StockAlert.is_resolved == is_resolved)
     
-    alerts = query.order_by(StockAlert.created_at.desc()).offset(skip).limit(limit).all()
+    alerts = page.paginate(query, StockAlert)
     
     result = []
     for alert in alerts:
@@ -54,7 +56,7 @@ def get_unresolved_stock_alerts(
 ):
     """Obtenir les alertes de stock non résolues (admin seulement)"""
     
-    alerts = db.query(StockAlert).join(Product).filter(
+    alerts = stock_alert_query(db).filter(
         StockAlert.is_resolved == False
     ).order_by(StockAlert.created_at.desc()).all()
     
@@ -84,16 +86,31 @@ def get_stock_alert_summary(
 ):
     """Obtenir le résumé des alertes de stock (admin seulement)"""
     
-    total_alerts = db.query(StockAlert).count()
-    unresolved_alerts = db.query(StockAlert).filter(StockAlert.is_resolved == False).count()
-    resolved_alerts = db.query(StockAlert).filter(StockAlert.is_resolved == True).count()
-    critical_products = db.query(Product).filter(Product.quantity_in_stock == 0).count()
+    return summary_cache.get_or_set(
+        "stock_alert_summary",
+        lambda: _stock_alert_summary(db),
+        tables=("stock_alerts", "products")
+    )
+
+def _stock_alert_summary(db: Session) -> StockAlertSummary:
+    """Compteurs des alertes en une seule requête (agrégats conditionnels)"""
+    
+    critical_products = db.query(func.count(Product.id)).filter(
+        Product.quantity_in_stock == 0
+    ).scalar_subquery()
+    
+    row = db.query(
+        func.count(StockAlert.id).label("total_alerts"),
+        func.count(StockAlert.id).filter(StockAlert.is_resolved == False).label("unresolved_alerts"),
+        func.count(StockAlert.id).filter(StockAlert.is_resolved == True).label("resolved_alerts"),
+        critical_products.label("critical_products")
+    ).select_from(StockAlert).one()
     
     return StockAlertSummary(
-        total_alerts=total_alerts,
-        unresolved_alerts=unresolved_alerts,
-        resolved_alerts=resolved_alerts,
-        critical_products=critical_products
+        total_alerts=row.total_alerts,
+        unresolved_alerts=row.unresolved_alerts,
+        resolved_alerts=row.resolved_alerts,
+        critical_products=row.critical_products
     )
 
 @router.get("/{alert_id}", response_model=StockAlertWithProduct)
@@ -104,7 +121,7 @@ def get_stock_alert_by_id(
 ):
     """Obtenir une alerte de stock par son ID (admin seulement)"""
     
-    alert = db.query(StockAlert).filter(StockAlert.id == alert_id).first()
+    alert = stock_alert_query(db).filter(StockAlert.id == alert_id).first()
     if not alert:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -135,7 +152,7 @@ def resolve_stock_alert(
 ):
     """Résoudre une alerte de stock (admin seulement)"""
     
-    alert = db.query(StockAlert).filter(StockAlert.id == alert_id).first()
+    alert = stock_alert_query(db, "summary").filter(StockAlert.id == alert_id).first()
     if not alert:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -164,7 +181,7 @@ def unresolve_stock_alert(
 ):
     """Marquer une alerte comme non résolue (admin seulement)"""
     
-    alert = db.query(StockAlert).filter(StockAlert.id == alert_id).first()
+    alert = stock_alert_query(db, "summary").filter(StockAlert.id == alert_id).first()
     if not alert:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -187,7 +204,7 @@ def delete_stock_alert(
 ):
     """Supprimer une alerte de stock (admin seulement)"""
     
-    alert = db.query(StockAlert).filter(StockAlert.id == alert_id).first()
+    alert = stock_alert_query(db, "summary").filter(StockAlert.id == alert_id).first()
     if not alert:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
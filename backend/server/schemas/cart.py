@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional, List
+from decimal import Decimal
+
+# Cart Item Update Schema (quantity to hold, 0 removes the product)
+class CartItemUpdate(BaseModel):
+    quantity: int = Field(..., ge=0)
+
+# Cart Item Response Schema
+class CartItemResponse(BaseModel):
+    product_id: int
+    product_name: str
+    unit_price: Decimal
+    quantity: int
+    quantity_available: int  # Stock available to this client, own hold included
+    expires_at: datetime
+
+# Cart Response Schema
+class CartResponse(BaseModel):
+    items: List[CartItemResponse]
+    total_amount: Decimal
+    expires_at: Optional[datetime] = None  # Earliest hold expiry
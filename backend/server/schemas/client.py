@@ -1,6 +1,7 @@
 from pydantic import BaseModel, EmailStr, Field
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Optional
 
 # Client Base Schema
 
@@ -72,3 +73,25 @@ class ClientSummary(BaseModel):
 
     class Config:
         from_attributes = True
+
+# Receivables aging (balance âgée)
+class AgingBuckets(BaseModel):
+    days_0_30: Decimal = Decimal('0.00')
+    days_31_60: Decimal = Decimal('0.00')
+    days_61_90: Decimal = Decimal('0.00')
+    days_over_90: Decimal = Decimal('0.00')
+
+class ClientAging(AgingBuckets):
+    client_id: int
+    username: str
+    email: EmailStr
+    phone_number: Optional[str]
+    total_bills: int
+    total_debt: Decimal
+
+class ClientAgingReport(BaseModel):
+    as_of: date
+    total_clients: int  # Clients ayant une dette
+    total_debt: Decimal
+    totals: AgingBuckets
+    clients: List[ClientAging]
@@ -1,7 +1,8 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from decimal import Decimal
+from schemas.bill import BillResponse
 
 # Payment Base Schema
 class PaymentBase(BaseModel):
@@ -51,4 +52,32 @@ class PaymentHistory(BaseModel):
     payments: list[PaymentResponse] = []
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Bulk Payment: one transfer split across a client's bills
+class BulkPaymentAllocation(BaseModel):
+    bill_id: int
+    amount_paid: Decimal = Field(..., gt=0, decimal_places=2)
+
+class BulkPaymentCreate(BaseModel):
+    client_id: int
+    amount: Optional[Decimal] = Field(None, gt=0, decimal_places=2)  # Répartition FIFO
+    allocations: Optional[List[BulkPaymentAllocation]] = Field(None, min_length=1)  # Répartition explicite
+    payment_method: Optional[str] = Field(None, max_length=50)
+    notes: Optional[str] = Field(None, max_length=500)
+    payment_date: datetime
+
+    @model_validator(mode='after')
+    def check_amount_or_allocations(self):
+        if (self.amount is None) == (self.allocations is None):
+            raise ValueError('Provide either amount or allocations')
+        if self.allocations and len({a.bill_id for a in self.allocations}) != len(self.allocations):
+            raise ValueError('Each bill can only appear once in allocations')
+        return self
+
+class BulkPaymentResponse(BaseModel):
+    client_id: int
+    total_paid: Decimal
+    remaining_debt: Decimal
+    payments: List[PaymentResponse]
+    bills: List[BillResponse]
@@ -1,9 +1,10 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 from datetime import datetime
 from typing import Optional, List
 from decimal import Decimal
 
 class ProductBase(BaseModel):
+    sku: Optional[str] = Field(None, min_length=1, max_length=64)
     name: str = Field(..., min_length=2, max_length=200)
     description: Optional[str] = Field(None, max_length=1000)
     price: Decimal = Field(..., gt=0, decimal_places=2)
@@ -26,6 +27,7 @@ class ProductCreate(ProductBase):
     pass
 
 class ProductUpdate(BaseModel):
+    sku: Optional[str] = Field(None, min_length=1, max_length=64)
     name: Optional[str] = Field(None, min_length=2, max_length=200)
     description: Optional[str] = Field(None, max_length=1000)
     price: Optional[Decimal] = Field(None, gt=0, decimal_places=2)
@@ -45,6 +47,17 @@ class ProductUpdate(BaseModel):
                 raise ValueError('Maximum 5 images allowed')
         return v
 
+    @model_validator(mode='after')
+    def reject_null_required_fields(self):
+        # Omitted fields are left unchanged; explicit null is only allowed for nullable columns
+        nulls = sorted(
+            field for field in self.model_fields_set
+            if getattr(self, field) is None and field not in ('sku', 'description')
+        )
+        if nulls:
+            raise ValueError(f"Fields cannot be null: {', '.join(nulls)}")
+        return self
+
 class ProductCount(BaseModel):
     count: int
 
@@ -63,6 +76,17 @@ class ProductWithCategory(ProductResponse):
     class Config:
         from_attributes = True
 
+class ProductSearchResult(ProductWithCategory):
+    rank: float
+
+class ProductImportResult(BaseModel):
+    received: int
+    inserted: int
+    updated: int
+    unchanged: int
+    alerts_created: int
+    alerts_resolved: int
+
 class ProductStockStatus(BaseModel):
     id: int
     name: str
@@ -75,4 +99,58 @@ class ProductStockStatus(BaseModel):
         from_attributes = True
 
 class StockUpdate(BaseModel):
-    quantity: int
\ No newline at end of file
+    quantity: int
+
+class StockAdjustment(BaseModel):
+    product_id: int
+    quantity: Optional[int] = Field(None, ge=0)   # counted quantity (absolute)
+    delta: Optional[int] = None                   # or change relative to the current stock
+
+    @model_validator(mode='after')
+    def validate_quantity_or_delta(self):
+        if (self.quantity is None) == (self.delta is None):
+            raise ValueError('Provide either quantity or delta')
+        return self
+
+class StockBulkUpdate(BaseModel):
+    items: List[StockAdjustment] = Field(..., min_length=1, max_length=10000)
+
+    @field_validator('items')
+    @classmethod
+    def validate_unique_products(cls, v):
+        if len({item.product_id for item in v}) != len(v):
+            raise ValueError('Each product_id may appear only once')
+        return v
+
+class StockAdjustmentResult(BaseModel):
+    product_id: int
+    status: str  # "updated", "unchanged", "not_found" or "negative_stock"
+    previous_quantity: Optional[int] = None
+    quantity_in_stock: Optional[int] = None
+
+class StockBulkResult(BaseModel):
+    updated: int
+    unchanged: int
+    rejected: int
+    alerts_created: int
+    alerts_resolved: int
+    results: List[StockAdjustmentResult]
+
+class StockMovementResponse(BaseModel):
+    id: int
+    product_id: int
+    quantity: int  # Signed change
+    reason: str  # "initial", "sale", "restock", "adjustment" or "import"
+    bill_id: Optional[int] = None
+    admin_id: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class StockAtResponse(BaseModel):
+    product_id: int
+    at: datetime
+    quantity_in_stock: int
+    snapshot_at: Optional[datetime] = None
+    movements: int
@@ -0,0 +1,82 @@
+"""Cache des utilisateurs authentifiés, invalidé par LISTEN/NOTIFY (utils/auth.py)"""
+import time
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event, text
+from utils import auth
+from utils.db import engine
+
+
+@pytest.fixture
+def listener():
+    thread, stop_event = auth.start_principal_listener_thread()
+    deadline = time.monotonic() + 5
+    while not auth._principal_listening.is_set():
+        assert time.monotonic() < deadline, "écoute non démarrée"
+        time.sleep(0.01)
+    yield
+    stop_event.set()
+    thread.join(timeout=5)
+
+
+def _wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@contextmanager
+def _principal_selects():
+    """Requêtes de chargement d'un utilisateur (table clients) exécutées pendant le bloc"""
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT") and "FROM clients" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _deactivate_elsewhere(client_id: int):
+    # Modification faite hors de ce processus (aucun appel à invalidate_principal)
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE clients SET is_active = false WHERE id = :id"), {"id": client_id})
+
+
+def test_change_from_another_process_invalidates_cache(listener, api, client_user, client_headers):
+    assert api.get("/bill/my-bills", headers=client_headers).status_code == 200
+    assert auth.principal_cache.get(("client", client_user.id)) is not None
+
+    _deactivate_elsewhere(client_user.id)
+    _wait_for(lambda: auth.principal_cache.get(("client", client_user.id)) is None)
+
+    assert api.get("/bill/my-bills", headers=client_headers).status_code == 403
+
+
+def test_cached_requests_do_not_load_the_principal(listener, api, client_user, client_headers):
+    with _principal_selects() as first:
+        assert api.get("/bill/my-bills", headers=client_headers).status_code == 200
+    assert len(first) == 1
+
+    with _principal_selects() as cached:
+        for _ in range(3):
+            assert api.get("/bill/my-bills", headers=client_headers).status_code == 200
+    assert cached == []
+
+
+def test_cache_is_bypassed_without_listener(api, client_user, client_headers):
+    with _principal_selects() as statements:
+        for _ in range(2):
+            assert api.get("/bill/my-bills", headers=client_headers).status_code == 200
+    assert len(statements) == 2
+    assert auth.principal_cache.get(("client", client_user.id)) is None
+
+    _deactivate_elsewhere(client_user.id)
+
+    assert api.get("/bill/my-bills", headers=client_headers).status_code == 403
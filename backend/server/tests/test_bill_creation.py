@@ -0,0 +1,125 @@
+"""Création de facture (utils/bill_manager.py): allers-retours, verrous, stock"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from decimal import Decimal
+import random
+import pytest
+from sqlalchemy import event, func, select
+from models.bill import Bill
+from models.bill_item import BillItem
+from models.category import Category
+from models.product import Product
+
+STOCK = 100
+
+
+@pytest.fixture
+def catalog(db, admin):
+    """Vingt produits actifs, STOCK unités chacun"""
+
+    category = Category(name="Catalogue")
+    db.add(category)
+    db.flush()
+
+    items = [
+        Product(name=f"Article {i}", price=Decimal("2.50"), quantity_in_stock=STOCK,
+                minimum_stock_level=0, category_id=category.id, admin_id=admin.id,
+                image_urls=["https://example.com/p.png"])
+        for i in range(20)
+    ]
+    db.add_all(items)
+    db.commit()
+    return [item.id for item in items]
+
+
+@contextmanager
+def round_trips(engine):
+    """Instructions et commits envoyés à PostgreSQL pendant le bloc"""
+
+    trips = {"statements": [], "commits": 0}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        trips["statements"].append(statement)
+
+    def commit(conn):
+        trips["commits"] += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "commit", commit)
+    try:
+        yield trips
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        event.remove(engine, "commit", commit)
+
+
+def _order(api, headers, items: list):
+    return api.post("/bill/", json={"items": [
+        {"product_id": product_id, "quantity": quantity} for product_id, quantity in items
+    ]}, headers=headers)
+
+
+def _stock(db, product_ids) -> dict:
+    db.expire_all()
+    return dict(db.execute(
+        select(Product.id, Product.quantity_in_stock).where(Product.id.in_(product_ids))
+    ).all())
+
+
+def test_round_trips_do_not_grow_with_order_size(engine, api, client_headers, catalog):
+    counts = {}
+    for size in (1, 5, 20):
+        # Ordre de la commande inverse de l'ordre des IDs
+        items = [(product_id, 1) for product_id in reversed(catalog[:size])]
+        with round_trips(engine) as trips:
+            assert _order(api, client_headers, items).status_code == 201
+
+        statements = trips["statements"]
+        counts[size] = len(statements)
+        assert trips["commits"] == 1
+
+        locks = [s for s in statements if "FOR UPDATE" in s and "FROM products" in s]
+        assert len(locks) == 1
+        assert "ORDER BY products.id" in locks[0]
+
+        decrements = [s for s in statements if s.startswith("UPDATE products SET quantity_in_stock")]
+        assert len(decrements) == 1
+
+    assert counts[1] == counts[5] == counts[20], counts
+
+
+def test_insufficient_stock_rolls_back_everything(api, db, client_headers, catalog):
+    first, second = catalog[:2]
+
+    response = _order(api, client_headers, [(first, 3), (second, STOCK + 1)])
+
+    assert response.status_code == 400
+    assert _stock(db, [first, second]) == {first: STOCK, second: STOCK}
+    assert db.execute(select(func.count(Bill.id))).scalar_one() == 0
+
+
+def test_concurrent_orders_neither_deadlock_nor_oversell(api, db, client_headers, catalog):
+    product_ids = catalog[:5]
+    rng = random.Random(0)
+    orders = []
+    for _ in range(60):
+        # Produits communs, dans un ordre différent à chaque commande
+        items = [(product_id, rng.randint(1, 6)) for product_id in product_ids]
+        rng.shuffle(items)
+        orders.append(items)
+
+    with ThreadPoolExecutor(max_workers=12) as pool:
+        statuses = list(pool.map(lambda items: _order(api, client_headers, items).status_code,
+                                 orders))
+
+    # Refus pour stock insuffisant uniquement: ni interblocage (500) ni conflit
+    assert set(statuses) <= {201, 400}
+    assert 201 in statuses and 400 in statuses
+
+    sold = dict(db.execute(
+        select(BillItem.product_id, func.sum(BillItem.quantity)).group_by(BillItem.product_id)
+    ).all())
+    stock = _stock(db, product_ids)
+    for product_id in product_ids:
+        assert stock[product_id] >= 0
+        assert stock[product_id] == STOCK - sold.get(product_id, 0)
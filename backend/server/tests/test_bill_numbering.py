@@ -0,0 +1,73 @@
+"""Attribution concurrente des numéros de facture (utils/bill_numbering.py)"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import time
+from utils.bill_numbering import allocate_bill_number, format_bill_number
+from utils.db import SessionLocal
+
+WORKERS = 8
+PER_WORKER = 25
+ORDERS = 300
+
+
+def _allocate(count: int, rollback_every: int = 0) -> list:
+    """Numéros obtenus par un thread, chacun dans sa propre transaction"""
+
+    numbers = []
+    with SessionLocal() as db:
+        for i in range(count):
+            number = allocate_bill_number(db)
+            # Élargir la fenêtre de concurrence avant le commit
+            time.sleep(0.001)
+            if rollback_every and i % rollback_every == 0:
+                db.rollback()
+            else:
+                db.commit()
+                numbers.append(number)
+    return numbers
+
+
+def test_concurrent_allocation_is_unique_and_gapless(engine):
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        results = list(pool.map(_allocate, [PER_WORKER] * WORKERS))
+
+    numbers = [number for numbers in results for number in numbers]
+    day = datetime.now().date()
+
+    assert len(numbers) == WORKERS * PER_WORKER
+    assert sorted(numbers) == [
+        format_bill_number(day, value) for value in range(1, WORKERS * PER_WORKER + 1)
+    ]
+
+
+def test_rolled_back_numbers_are_reused(engine):
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        results = list(pool.map(_allocate, [PER_WORKER] * WORKERS, [3] * WORKERS))
+
+    numbers = [number for numbers in results for number in numbers]
+    day = datetime.now().date()
+
+    # Un rollback rend son numéro: les numéros commités restent contigus
+    assert len(set(numbers)) == len(numbers)
+    assert sorted(numbers) == [
+        format_bill_number(day, value) for value in range(1, len(numbers) + 1)
+    ]
+
+
+def test_concurrent_orders_get_unique_consecutive_numbers(api, client_headers, products):
+    product_ids = [product.id for product in products]
+
+    def order(i: int):
+        # Un article d'un produit différent à chaque commande: aucun refus de stock
+        return api.post("/bill/", json={"items": [
+            {"product_id": product_ids[i % len(product_ids)], "quantity": 1}
+        ]}, headers=client_headers)
+
+    with ThreadPoolExecutor(max_workers=12) as pool:
+        responses = list(pool.map(order, range(ORDERS)))
+
+    assert [response.status_code for response in responses] == [201] * ORDERS
+    numbers = [response.json()["bill_number"] for response in responses]
+    day = datetime.now().date()
+
+    assert sorted(numbers) == [format_bill_number(day, value) for value in range(1, ORDERS + 1)]
@@ -0,0 +1,90 @@
+"""Paiements concurrents sur une même facture (verrouillage optimiste, Bill.version)"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from decimal import Decimal
+import pytest
+from sqlalchemy import func, select
+from models.bill import Bill
+from models.payment import Payment
+from utils import bill_payments
+from utils.bill_payments import BillConflict, apply_bill_payment, retry_on_bill_conflict
+from utils.db import SessionLocal
+
+WORKERS = 8
+PER_WORKER = 10
+
+
+@pytest.fixture(autouse=True)
+def many_retries(monkeypatch):
+    # Assez d'essais pour que chaque paiement finisse par passer malgré la contention
+    monkeypatch.setattr(bill_payments, "BILL_CONFLICT_RETRIES", 200)
+
+
+@retry_on_bill_conflict
+def _pay(bill_id: int, amount: Decimal, db):
+    bill = db.get(Bill, bill_id)
+    apply_bill_payment(db, bill, amount)
+    db.commit()
+
+
+def _pay_many(bill_id: int, amount: Decimal, count: int):
+    with SessionLocal() as db:
+        for _ in range(count):
+            _pay(bill_id, amount, db=db)
+
+
+def test_stale_version_raises_conflict(db, make_bill):
+    bill = make_bill(1)
+
+    with SessionLocal() as other:
+        apply_bill_payment(other, other.get(Bill, bill.id), Decimal("1.00"))
+        other.commit()
+
+    with pytest.raises(BillConflict):
+        apply_bill_payment(db, bill, Decimal("1.00"))
+
+
+def test_concurrent_payments_are_all_applied(db, make_bill):
+    bill = make_bill(10, 10)  # 200.00
+    amount = Decimal("1.25")
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        for future in [pool.submit(_pay_many, bill.id, amount, PER_WORKER) for _ in range(WORKERS)]:
+            future.result()
+
+    db.expire_all()
+    bill = db.get(Bill, bill.id)
+    paid = amount * WORKERS * PER_WORKER
+
+    assert bill.total_paid == paid
+    assert bill.total_remaining == Decimal("200.00") - paid
+    assert bill.version == 1 + WORKERS * PER_WORKER
+    assert bill.status == "not paid"
+
+
+def test_concurrent_payment_routes_match_payment_rows(api, admin_headers, db, make_bill):
+    bill = make_bill(4)  # 40.00
+    amount = Decimal("0.50")
+    payload = {
+        "bill_id": bill.id,
+        "amount_paid": str(amount),
+        "payment_date": datetime.now(timezone.utc).isoformat(),
+    }
+
+    def post(_):
+        return api.post("/payment/", json=payload, headers=admin_headers).status_code
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        statuses = list(pool.map(post, range(WORKERS * PER_WORKER)))
+
+    assert statuses == [201] * (WORKERS * PER_WORKER)
+
+    db.expire_all()
+    bill = db.get(Bill, bill.id)
+    recorded = db.execute(
+        select(func.sum(Payment.amount_paid)).where(Payment.bill_id == bill.id)
+    ).scalar_one()
+
+    assert bill.total_paid == recorded == amount * WORKERS * PER_WORKER
+    assert bill.total_remaining == Decimal("0.00")
+    assert bill.status == "paid"
@@ -0,0 +1,57 @@
+"""Nombre de requêtes des listes de factures et de paiements (pas de N+1)"""
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from decimal import Decimal
+import pytest
+from sqlalchemy import event
+from models.payment import Payment
+
+
+@contextmanager
+def count_queries(engine):
+    """Compter les instructions envoyées à PostgreSQL (before_cursor_execute)"""
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _add_bills(db, make_bill, admin, count: int):
+    for _ in range(count):
+        bill = make_bill(1, 2, 3)
+        db.add(Payment(bill_id=bill.id, admin_id=admin.id, amount_paid=Decimal("1.00"),
+                       payment_date=datetime.now(timezone.utc)))
+    db.commit()
+
+
+@pytest.mark.parametrize("path, headers", [
+    ("/bill/all", "admin_headers"),
+    ("/bill/my-bills", "client_headers"),
+    ("/payment/", "admin_headers"),
+])
+def test_list_query_count_does_not_grow_with_rows(
+    request, engine, api, db, admin, make_bill, path, headers
+):
+    headers = request.getfixturevalue(headers)
+
+    def queries_for(bill_count: int) -> tuple:
+        _add_bills(db, make_bill, admin, bill_count)
+        api.get(path, headers=headers)  # utilisateur mis en cache
+        with count_queries(engine) as statements:
+            response = api.get(path, params={"limit": 100}, headers=headers)
+        assert response.status_code == 200
+        return len(statements), len(response.json())
+
+    few, few_rows = queries_for(2)
+    many, many_rows = queries_for(10)
+
+    assert (few_rows, many_rows) == (2, 12)
+    assert many == few
+    assert many <= 3
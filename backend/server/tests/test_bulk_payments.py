@@ -0,0 +1,96 @@
+"""Virements répartis sur plusieurs factures (POST /payment/bulk)"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from decimal import Decimal
+from sqlalchemy import func, select
+from models.bill import Bill
+from models.payment import Payment
+
+
+def _payload(client_id: int, **fields) -> dict:
+    return {"client_id": client_id, "payment_date": datetime.now(timezone.utc).isoformat(), **fields}
+
+
+def _bills(db, bills) -> list:
+    db.expire_all()
+    return [db.get(Bill, bill.id) for bill in bills]
+
+
+def _payment_count(db) -> int:
+    return db.execute(select(func.count()).select_from(Payment)).scalar_one()
+
+
+def test_fifo_pays_oldest_bills_first(api, db, admin_headers, client_user, make_bill):
+    bills = [make_bill(1), make_bill(2), make_bill(3)]  # 10.00, 20.00, 30.00
+
+    response = api.post("/payment/bulk", json=_payload(client_user.id, amount="25.00"),
+                        headers=admin_headers)
+
+    assert response.status_code == 201
+    body = response.json()
+    assert Decimal(body["total_paid"]) == Decimal("25.00")
+    assert Decimal(body["remaining_debt"]) == Decimal("35.00")
+    assert [(p["bill_id"], Decimal(p["amount_paid"])) for p in body["payments"]] == [
+        (bills[0].id, Decimal("10.00")),
+        (bills[1].id, Decimal("15.00")),
+    ]
+
+    first, second, third = _bills(db, bills)
+    assert (first.total_remaining, first.status) == (Decimal("0.00"), "paid")
+    assert (second.total_remaining, second.status) == (Decimal("5.00"), "not paid")
+    assert (third.total_paid, third.version) == (Decimal("0.00"), 1)
+
+
+def test_amount_above_debt_is_rejected(api, db, admin_headers, client_user, make_bill):
+    make_bill(1)
+
+    response = api.post("/payment/bulk", json=_payload(client_user.id, amount="10.01"),
+                        headers=admin_headers)
+
+    assert response.status_code == 400
+    assert _payment_count(db) == 0
+
+
+def test_duplicate_bill_ids_are_rejected(api, db, admin_headers, client_user, make_bill):
+    bill = make_bill(2)  # 20.00
+    allocations = [
+        {"bill_id": bill.id, "amount_paid": "15.00"},
+        {"bill_id": bill.id, "amount_paid": "15.00"},
+    ]
+
+    response = api.post("/payment/bulk", json=_payload(client_user.id, allocations=allocations),
+                        headers=admin_headers)
+
+    assert response.status_code == 422
+    assert _payment_count(db) == 0
+    assert _bills(db, [bill])[0].total_paid == Decimal("0.00")
+
+
+def test_explicit_allocation_above_remaining_is_rejected(api, db, admin_headers, client_user, make_bill):
+    first, second = make_bill(1), make_bill(1)
+    allocations = [
+        {"bill_id": first.id, "amount_paid": "5.00"},
+        {"bill_id": second.id, "amount_paid": "10.01"},
+    ]
+
+    response = api.post("/payment/bulk", json=_payload(client_user.id, allocations=allocations),
+                        headers=admin_headers)
+
+    assert response.status_code == 400
+    assert _payment_count(db) == 0
+
+
+def test_concurrent_bulk_payments_total_exactly(api, db, admin_headers, client_user, make_bill):
+    bills = [make_bill(1, 1), make_bill(2), make_bill(1, 2, 1)]  # 20.00, 20.00, 40.00
+    payload = _payload(client_user.id, amount="8.00")
+
+    def post(_):
+        return api.post("/payment/bulk", json=payload, headers=admin_headers).status_code
+
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        statuses = list(pool.map(post, range(10)))
+
+    assert statuses == [201] * 10
+    assert [bill.total_paid for bill in _bills(db, bills)] == [
+        Decimal("20.00"), Decimal("20.00"), Decimal("40.00")]
+    assert db.execute(select(func.sum(Payment.amount_paid))).scalar_one() == Decimal("80.00")
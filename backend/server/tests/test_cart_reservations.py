@@ -0,0 +1,98 @@
+"""Réservations de stock du panier (utils/stock_reservations.py)"""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import select
+from models.client import Client
+from models.product import Product
+from models.stock_reservation import StockReservation
+from utils.auth import hash_password
+from utils.db import SessionLocal
+from utils.stock_manager import check_product_availability
+from utils.stock_reservations import extend_reservations
+
+
+@pytest.fixture
+def other_client(db):
+    user = Client(username="autre", email="autre@test.dz", password_hash=hash_password("autre123"))
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _hold(db, client_id: int, product_id: int, quantity: int, minutes: float):
+    """Réservation posée directement, échue (minutes < 0) ou non"""
+
+    db.add(StockReservation(
+        client_id=client_id, product_id=product_id, quantity=quantity,
+        expires_at=datetime.now(timezone.utc) + timedelta(minutes=minutes)))
+    db.commit()
+
+
+def _reserved(db, product_id: int) -> int:
+    db.expire_all()
+    return db.execute(
+        select(Product.quantity_reserved).where(Product.id == product_id)).scalar_one()
+
+
+def test_cart_ignores_and_releases_expired_holds(api, db, client_headers, products, other_client):
+    product_id = products[0].id
+    _hold(db, other_client.id, product_id, 95, minutes=-1)
+
+    response = api.put(f"/cart/items/{product_id}", json={"quantity": 50}, headers=client_headers)
+
+    assert response.status_code == 200
+    assert _reserved(db, product_id) == 50
+
+
+def test_cart_still_counts_live_holds(api, db, client_headers, products, other_client):
+    product_id = products[0].id
+    _hold(db, other_client.id, product_id, 95, minutes=10)
+
+    response = api.put(f"/cart/items/{product_id}", json={"quantity": 50}, headers=client_headers)
+
+    assert response.status_code == 400
+    assert _reserved(db, product_id) == 95
+
+
+def test_bill_ignores_and_releases_expired_holds(api, db, client_user, client_headers,
+                                                 products, other_client):
+    product_id = products[0].id
+    _hold(db, other_client.id, product_id, 60, minutes=-1)
+    # La réservation échue du client ne couvre plus rien: elle est libérée aussi
+    _hold(db, client_user.id, product_id, 40, minutes=-1)
+
+    response = api.post("/bill/", json={"items": [{"product_id": product_id, "quantity": 100}]},
+                        headers=client_headers)
+
+    assert response.status_code == 201
+    assert _reserved(db, product_id) == 0
+    assert db.execute(select(StockReservation)).first() is None
+
+
+def test_availability_check_ignores_expired_holds(db, products, client_user, other_client):
+    product_id = products[0].id
+    _hold(db, other_client.id, product_id, 60, minutes=-1)
+    _hold(db, client_user.id, product_id, 30, minutes=10)
+
+    assert check_product_availability(db, product_id, 70)["available"]
+    assert not check_product_availability(db, product_id, 71)["available"]
+
+
+def test_extend_locks_reserved_products_first(db, products, client_user):
+    product_id = products[0].id
+    _hold(db, client_user.id, product_id, 5, minutes=10)
+
+    def extend():
+        with SessionLocal() as session:
+            extend_reservations(session, client_user.id)
+            session.commit()
+
+    # Une commande tient le verrou du produit: la prolongation l'attend
+    with SessionLocal() as locker, ThreadPoolExecutor(max_workers=1) as pool:
+        locker.execute(select(Product.id).where(Product.id == product_id).with_for_update())
+        future = pool.submit(extend)
+        with pytest.raises(TimeoutError):
+            future.result(timeout=0.5)
+        locker.rollback()
+        future.result(timeout=5)
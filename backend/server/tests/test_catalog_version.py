@@ -0,0 +1,130 @@
+"""Version du catalogue (ETag) et notifications, tenues dans la transaction qui écrit"""
+import select
+import threading
+import time
+import pytest
+from sqlalchemy import event, text
+from utils import catalog_snapshot as snapshot_module
+from utils.catalog_snapshot import CATALOG_CHANNEL, catalog_snapshot
+from utils.db import engine
+
+
+@pytest.fixture
+def listen():
+    """Connexion en écoute sur catalog_changes: listen() renvoie les payloads reçus"""
+
+    cargs, cparams = engine.dialect.create_connect_args(engine.url)
+    conn = engine.dialect.dbapi.connect(*cargs, **cparams)
+    conn.autocommit = True
+    conn.cursor().execute(f"LISTEN {CATALOG_CHANNEL}")
+
+    def received(timeout: float = 0.5) -> list:
+        payloads = []
+        while select.select([conn], [], [], timeout)[0]:
+            conn.poll()
+            payloads += [notify.payload for notify in conn.notifies]
+            conn.notifies.clear()
+            timeout = 0.1
+        return payloads
+
+    yield received
+    conn.close()
+
+
+@pytest.fixture
+def snapshot_listener():
+    thread, stop_event = snapshot_module.start_snapshot_thread()
+    deadline = time.monotonic() + 5
+    while not catalog_snapshot.is_current():
+        assert time.monotonic() < deadline, "instantané non chargé"
+        time.sleep(0.01)
+    yield
+    stop_event.set()
+    thread.join(timeout=5)
+    snapshot_module._listening.clear()
+
+
+def _etag(api) -> str:
+    response = api.get("/product/")
+    assert response.status_code == 200
+    return response.headers["ETag"]
+
+
+def _order(api, client_headers, product_id: int):
+    response = api.post("/bill/", json={"items": [{"product_id": product_id, "quantity": 1}]},
+                        headers=client_headers)
+    assert response.status_code == 201
+
+
+def test_cart_holds_keep_the_catalog_version(api, client_headers, products):
+    etag = _etag(api)
+
+    assert api.put(f"/cart/items/{products[1].id}", json={"quantity": 2},
+                   headers=client_headers).status_code == 200
+    assert api.delete("/cart/", headers=client_headers).status_code == 204
+
+    assert api.get("/product/", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_stock_writes_change_the_catalog_version(api, client_headers, admin_headers, products):
+    etag = _etag(api)
+    _order(api, client_headers, products[0].id)
+    sold = _etag(api)
+    assert sold != etag
+
+    assert api.patch(f"/product/{products[2].id}/stock", json={"quantity": 5},
+                     headers=admin_headers).status_code == 200
+    response = api.get(f"/product/{products[2].id}", headers={"If-None-Match": sold})
+    assert response.status_code == 200
+    assert response.json()["quantity_in_stock"] == 5
+
+
+def test_catalog_writes_change_the_version(api, db, admin_headers, products):
+    etag = _etag(api)
+    assert api.put(f"/product/{products[0].id}", json={"price": "12.50"},
+                   headers=admin_headers).status_code == 200
+    updated = _etag(api)
+    assert updated != etag
+
+    # SQL direct: même trigger
+    db.execute(text("UPDATE categories SET name = 'Autre'"))
+    db.commit()
+    assert _etag(api) != updated
+
+
+def test_cart_writes_are_not_notified(listen, api, client_headers, products):
+    listen()  # création des produits
+    assert api.put(f"/cart/items/{products[0].id}", json={"quantity": 2},
+                   headers=client_headers).status_code == 200
+    assert listen() == []
+
+    _order(api, client_headers, products[1].id)
+    assert f"products:{products[1].id}" in listen()
+
+
+def test_bill_commit_uses_one_pooled_connection(snapshot_listener, api, client_headers, products):
+    product_id = products[0].id
+    checkouts = []
+
+    def listener(*args):
+        # Le thread de l'instantané relit les produits notifiés sur sa propre session
+        if threading.current_thread().name != "catalog-snapshot":
+            checkouts.append(args)
+
+    event.listen(engine, "checkout", listener)
+    try:
+        _order(api, client_headers, product_id)
+    finally:
+        event.remove(engine, "checkout", listener)
+
+    assert len(checkouts) == 1
+
+
+def test_snapshot_serves_own_writes(snapshot_listener, api, admin_headers, products):
+    product_id = products[0].id
+
+    for i in range(20):
+        price = f"{20 + i}.00"
+        assert api.put(f"/product/{product_id}", json={"price": price},
+                       headers=admin_headers).status_code == 200
+        assert api.get(f"/product/{product_id}").json()["price"] == price
@@ -0,0 +1,114 @@
+"""Soldes et balance âgée des clients, comparés à un recalcul depuis les factures"""
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from sqlalchemy import func, select
+from models.bill import Bill
+from models.client import Client
+from models.payment import Payment
+from utils.bill_numbering import allocate_bill_number
+from utils.client_balances import AGING_BUCKETS
+from utils.sales_stats import record_bill_stats
+
+DAYS_AGO = (3, 45, 75, 120)  # une facture par tranche d'ancienneté
+
+
+def _bill(db, client_id: int, amount: str, days_ago: int) -> Bill:
+    """Facture antidatée, comptée dans les soldes comme par create_bill_with_items"""
+
+    bill = Bill(
+        client_id=client_id,
+        bill_number=allocate_bill_number(db),
+        total_amount=Decimal(amount),
+        total_paid=Decimal("0.00"),
+        total_remaining=Decimal(amount),
+        status="not paid",
+        created_at=datetime.now(timezone.utc) - timedelta(days=days_ago)
+    )
+    db.add(bill)
+    db.flush()
+    record_bill_stats(db, bill)
+    db.commit()
+    return bill
+
+
+def _expected(db, today: date) -> dict:
+    """Dette par client et par tranche recalculée depuis les factures et les paiements"""
+
+    paid = dict(db.execute(
+        select(Payment.bill_id, func.sum(Payment.amount_paid)).group_by(Payment.bill_id)
+    ).all())
+
+    clients = {}
+    for bill in db.scalars(select(Bill)):
+        remaining = bill.total_amount - paid.get(bill.id, Decimal("0.00"))
+        assert bill.total_remaining == remaining
+        age = (today - bill.created_at.date()).days
+        entry = clients.setdefault(bill.client_id, {
+            "total_bills": 0, "total_debt": Decimal("0.00"),
+            **{name: Decimal("0.00") for name, _, _ in AGING_BUCKETS}
+        })
+        entry["total_bills"] += 1
+        entry["total_debt"] += remaining
+        for name, low, high in AGING_BUCKETS:
+            if age >= low and (high is None or age <= high):
+                entry[name] += remaining
+
+    return clients
+
+
+def _pay(api, headers, bill_id: int, amount: str):
+    response = api.post("/payment/", headers=headers, json={
+        "bill_id": bill_id, "amount_paid": amount,
+        "payment_date": datetime.now(timezone.utc).isoformat()
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_balances_and_aging_match_bills_and_payments(api, db, admin_headers, client_user):
+    other = Client(username="other", email="other@test.dz", password_hash="x")
+    gone = Client(username="gone", email="gone@test.dz", password_hash="x")
+    db.add_all([other, gone])
+    db.commit()
+
+    bills = {
+        client.id: [_bill(db, client.id, f"{100 * (i + 1)}.00", days) for i, days in enumerate(DAYS_AGO)]
+        for client in (client_user, other, gone)
+    }
+
+    # Paiements, modification et suppression de paiements, virement FIFO
+    mine = bills[client_user.id]
+    _pay(api, admin_headers, mine[0].id, "40.00")
+    payment_id = _pay(api, admin_headers, mine[2].id, "10.00")
+    assert api.put(f"/payment/{payment_id}", headers=admin_headers,
+                   json={"amount_paid": "250.00"}).status_code == 200
+    deleted_id = _pay(api, admin_headers, mine[3].id, "400.00")
+    assert api.delete(f"/payment/{deleted_id}", headers=admin_headers).status_code == 204
+    assert api.post("/payment/bulk", headers=admin_headers, json={
+        "client_id": other.id, "amount": "250.00",
+        "payment_date": datetime.now(timezone.utc).isoformat()
+    }).status_code == 201
+    # Client supprimé avec ses factures
+    assert api.delete(f"/client/{gone.id}", headers=admin_headers).status_code == 204
+
+    report = api.get("/client/aging", headers=admin_headers).json()
+    listing = api.get("/client/", headers=admin_headers).json()
+
+    db.expire_all()
+    today = date.fromisoformat(report["as_of"])
+    expected = _expected(db, today)
+    assert set(expected) == {client_user.id, other.id}
+
+    for client in listing:
+        entry = expected.get(client["id"], {"total_bills": 0, "total_debt": Decimal("0.00")})
+        assert (client["total_bills"], Decimal(str(client["total_debt"]))) == (
+            entry["total_bills"], entry["total_debt"])
+
+    assert report["total_clients"] == len(expected)
+    assert Decimal(report["total_debt"]) == sum(entry["total_debt"] for entry in expected.values())
+    for row in report["clients"]:
+        entry = expected[row["client_id"]]
+        for name in ("total_bills", "total_debt", *(name for name, _, _ in AGING_BUCKETS)):
+            assert Decimal(str(row[name])) == entry[name], name
+    for name, _, _ in AGING_BUCKETS:
+        assert Decimal(report["totals"][name]) == sum(entry[name] for entry in expected.values()), name
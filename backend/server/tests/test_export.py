@@ -0,0 +1,111 @@
+"""Exports en flux des factures et paiements (utils/export.py)"""
+import csv
+import io
+import json
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+import anyio
+from sqlalchemy import Numeric, String, func, select, text
+from models.payment import Payment
+from utils.export import export_response
+
+EXPORT_ROWS = 1_000_000
+MAX_RSS_GROWTH = 64 * 1024 * 1024
+
+
+def _rss() -> int:
+    """Mémoire résidente actuelle du processus (octets)"""
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _backdate(db, bill, day: date):
+    db.execute(text("UPDATE bills SET created_at = :at WHERE id = :id"),
+               {"at": datetime.combine(day, time(23, 59), tzinfo=timezone.utc), "id": bill.id})
+    db.commit()
+
+
+def test_bill_export_csv(api, admin_headers, make_bill, client_user):
+    first = make_bill(1, 2)
+    second = make_bill(3)
+
+    response = api.get("/bill/export", headers=admin_headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"].startswith('attachment; filename="bills-')
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["bill_number"] for row in rows] == [first.bill_number, second.bill_number]
+    assert rows[0]["client_name"] == client_user.username
+    assert rows[0]["total_amount"] == "30.00"
+    assert rows[1]["total_remaining"] == "30.00"
+
+
+def test_bill_items_export_ndjson(api, admin_headers, make_bill, products):
+    bill = make_bill(1, 2)
+
+    response = api.get("/bill/export", params={"format": "ndjson", "scope": "items"},
+                       headers=admin_headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["product_id"] for line in lines] == [products[0].id, products[1].id]
+    assert lines[1] == {
+        **lines[1],
+        "bill_id": bill.id,
+        "unit_price": "10.00",
+        "quantity": 2,
+        "subtotal": "20.00",
+    }
+    # Dates ISO 8601, décimaux en chaînes: aucune perte de précision
+    assert datetime.fromisoformat(lines[0]["bill_created_at"])
+
+
+def test_end_date_is_inclusive(api, db, admin, admin_headers, make_bill):
+    today = date.today()
+    yesterday = today - timedelta(days=1)
+    old, recent = make_bill(1), make_bill(2)
+    _backdate(db, old, yesterday - timedelta(days=1))
+    _backdate(db, recent, yesterday)
+
+    for bill, day in ((old, yesterday - timedelta(days=1)), (recent, yesterday)):
+        db.add(Payment(bill_id=bill.id, admin_id=admin.id, amount_paid=Decimal("5.00"),
+                       payment_method="cash",
+                       payment_date=datetime.combine(day, time(23, 59), tzinfo=timezone.utc)))
+    db.commit()
+
+    params = {"format": "ndjson", "start_date": yesterday.isoformat(),
+              "end_date": yesterday.isoformat()}
+    bills = api.get("/bill/export", params=params, headers=admin_headers).text.splitlines()
+    payments = api.get("/payment/export", params=params, headers=admin_headers).text.splitlines()
+
+    assert [json.loads(line)["id"] for line in bills] == [recent.id]
+    assert [json.loads(line)["bill_id"] for line in payments] == [recent.id]
+
+
+def test_million_row_export_memory_is_bounded(engine):
+    series = func.generate_series(1, EXPORT_ROWS).table_valued("n").render_derived(name="g")
+    statement = select(
+        series.c.n.label("id"),
+        (func.cast(series.c.n, Numeric(10, 2)) / 100).label("amount"),
+        func.now().label("created_at"),
+        func.concat("BILL-", series.c.n).cast(String).label("bill_number"),
+    ).select_from(series)
+
+    response = export_response(statement, "bills", "csv")
+    baseline = _rss()
+    peak = baseline
+    lines = 0
+
+    async def consume():
+        nonlocal peak, lines
+        async for chunk in response.body_iterator:
+            lines += chunk.count(b"\n")
+            peak = max(peak, _rss())
+
+    anyio.run(consume)
+
+    assert lines == EXPORT_ROWS + 1  # en-tête compris
+    assert peak - baseline < MAX_RSS_GROWTH
@@ -0,0 +1,75 @@
+"""Idempotency-Key sur la création de factures et les paiements (utils/idempotency.py)"""
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import func, select
+from models.bill import Bill
+from models.product import Product
+
+
+def _order(product_id: int, quantity: int = 2) -> dict:
+    return {"items": [{"product_id": product_id, "quantity": quantity}]}
+
+
+def _bill_count(db) -> int:
+    return db.execute(select(func.count()).select_from(Bill)).scalar_one()
+
+
+def test_replay_returns_stored_response_without_side_effects(api, db, client_headers, products):
+    headers = {**client_headers, "Idempotency-Key": "order-1"}
+
+    first = api.post("/bill/", json=_order(products[0].id), headers=headers)
+    second = api.post("/bill/", json=_order(products[0].id), headers=headers)
+
+    assert first.status_code == second.status_code == 201
+    assert second.json() == first.json()
+    assert second.headers.get("Idempotent-Replayed") == "true"
+    assert _bill_count(db) == 1
+    db.expire_all()
+    assert db.get(Product, products[0].id).quantity_in_stock == 98
+
+
+def test_same_key_with_another_body_is_rejected(api, db, client_headers, products):
+    headers = {**client_headers, "Idempotency-Key": "order-1"}
+
+    assert api.post("/bill/", json=_order(products[0].id), headers=headers).status_code == 201
+    conflict = api.post("/bill/", json=_order(products[0].id, 3), headers=headers)
+
+    assert conflict.status_code == 422
+    assert _bill_count(db) == 1
+
+
+def test_concurrent_requests_with_same_key_create_one_bill(api, db, client_headers, products):
+    headers = {**client_headers, "Idempotency-Key": "order-1"}
+    order = _order(products[0].id)
+
+    def post(_):
+        return api.post("/bill/", json=order, headers=headers)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(post, range(8)))
+
+    assert {response.status_code for response in responses} == {201}
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert _bill_count(db) == 1
+    db.expire_all()
+    assert db.get(Product, products[0].id).quantity_in_stock == 98
+
+
+def test_failed_request_does_not_consume_key(api, db, admin_headers, make_bill):
+    bill = make_bill(1)  # 10.00
+    headers = {**admin_headers, "Idempotency-Key": "pay-1"}
+    path = f"/bill/{bill.id}/pay"
+
+    # Erreur: la transaction est annulée, clé comprise
+    assert api.post(path, params={"amount": "50.00"}, headers=headers).status_code == 400
+
+    db.execute(Bill.__table__.update().where(Bill.id == bill.id).values(
+        total_amount=100, total_remaining=100))
+    db.commit()
+
+    paid = api.post(path, params={"amount": "50.00"}, headers=headers)
+    replayed = api.post(path, params={"amount": "50.00"}, headers=headers)
+
+    assert paid.status_code == replayed.status_code == 200
+    assert replayed.headers.get("Idempotent-Replayed") == "true"
+    db.expire_all()
+    assert db.get(Bill, bill.id).total_paid == 50
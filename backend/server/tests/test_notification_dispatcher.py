@@ -0,0 +1,141 @@
+"""Boîte d'envoi des notifications (utils/notification_dispatcher.py), pool SMTP simulé"""
+import smtplib
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import select, update
+from models.notification import Notification
+from utils import notification_dispatcher, notification_manager
+from utils.db import SessionLocal
+from utils.notification_dispatcher import (
+    NOTIFICATION_MAX_ATTEMPTS, claim_batch, dispatch_batch, dispatch_pending, retry_delay
+)
+
+
+class StubPool:
+    """Remplace le pool SMTP: enregistre les envois, coupe la connexion pour `failing`"""
+
+    def __init__(self, failing=(), delay: float = 0):
+        self.failing = set(failing)
+        self.delay = delay
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send_message(self, message, from_addr=None, to_addrs=None):
+        time.sleep(self.delay)
+        if message["To"] in self.failing:
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        with self._lock:
+            self.sent.append((message["To"], message.get_payload()[0].get_payload(decode=True).decode()))
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    pool = StubPool()
+    monkeypatch.setattr(notification_manager, "notification_smtp_pool", lambda: pool)
+    return pool
+
+
+def _notify(db, count: int = 1, channel: str = "email", **fields) -> list:
+    rows = [
+        Notification(notification_type="new_bill", channel=channel, message=f"Message {i}", **fields)
+        for i in range(count)
+    ]
+    db.add_all(rows)
+    db.commit()
+    return [row.id for row in rows]
+
+
+def _state(db, notification_id: int) -> Notification:
+    db.expire_all()
+    return db.get(Notification, notification_id)
+
+
+def test_delivery_and_permanent_failures(db, smtp, admin, client_user):
+    delivered, = _notify(db, client_id=client_user.id)
+    orphan, = _notify(db)
+    no_phone, = _notify(db, client_id=client_user.id, channel="whatsapp")
+
+    assert dispatch_batch(db) == {"claimed": 3, "sent": 1, "failed": 2}
+
+    assert smtp.sent == [("client@test.dz", "Message 0")]
+    sent = _state(db, delivered)
+    assert sent.is_sent and sent.sent_at is not None and sent.last_error is None
+    for notification_id, error in ((orphan, "Notification sans destinataire"),
+                                   (no_phone, "Destinataire sans numéro de téléphone")):
+        failed = _state(db, notification_id)
+        # Pas de nouvelle tentative: plus jamais réclamée
+        assert (failed.is_sent, failed.attempts, failed.next_attempt_at, failed.last_error) == (
+            False, NOTIFICATION_MAX_ATTEMPTS, None, error)
+
+    assert dispatch_batch(db)["claimed"] == 0
+
+
+def test_transient_failures_back_off_then_give_up(db, smtp, admin):
+    smtp.failing.add(admin.email)
+    notification_id, = _notify(db, admin_id=admin.id)
+
+    for attempt in range(1, NOTIFICATION_MAX_ATTEMPTS + 1):
+        before = datetime.now(timezone.utc)
+        assert dispatch_batch(db) == {"claimed": 1, "sent": 0, "failed": 1}
+        failed = _state(db, notification_id)
+        assert failed.attempts == attempt
+        assert "Connection unexpectedly closed" in failed.last_error
+        delay = failed.next_attempt_at - before
+        assert retry_delay(attempt) <= delay < retry_delay(attempt) + timedelta(seconds=5)
+
+        # Pas encore due: ignorée jusqu'à next_attempt_at
+        assert dispatch_batch(db)["claimed"] == 0
+        db.execute(update(Notification).values(
+            next_attempt_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+        db.commit()
+
+    # NOTIFICATION_MAX_ATTEMPTS échecs: abandon
+    assert dispatch_batch(db)["claimed"] == 0
+    assert smtp.sent == []
+
+
+def test_retry_delay_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(notification_dispatcher, "NOTIFICATION_RETRY_BASE_SECONDS", 30)
+    monkeypatch.setattr(notification_dispatcher, "NOTIFICATION_RETRY_MAX_SECONDS", 200)
+
+    assert [retry_delay(n).total_seconds() for n in range(1, 6)] == [30, 60, 120, 200, 200]
+
+
+def test_workers_claim_disjoint_batches(db, client_user):
+    ids = _notify(db, 6, client_id=client_user.id)
+
+    with SessionLocal() as first, SessionLocal() as second:
+        claimed_first = [n.id for n in claim_batch(first, 4)]
+        # Lignes verrouillées par le premier worker: sautées, pas attendues
+        claimed_second = [n.id for n in claim_batch(second, 4)]
+        first.rollback()
+        second.rollback()
+
+    assert claimed_first == ids[:4]
+    assert claimed_second == ids[4:]
+
+
+def test_concurrent_dispatchers_send_each_notification_once(db, monkeypatch, client_user):
+    pool = StubPool(delay=0.01)
+    monkeypatch.setattr(notification_manager, "notification_smtp_pool", lambda: pool)
+    _notify(db, 40, client_id=client_user.id)
+    results = []
+
+    def worker():
+        with SessionLocal() as session:
+            results.append(dispatch_pending(session, batch_size=5))
+
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(Counter(pool.sent).values()) == [1] * 40
+    assert sum(result["sent"] for result in results) == 40
+    # Les deux workers ont travaillé en parallèle
+    assert all(result["sent"] for result in results)
+    assert db.execute(select(Notification).where(Notification.is_sent == False)).first() is None
@@ -0,0 +1,13 @@
+"""Paramètres de pagination (utils/pagination.py)"""
+from fastapi import Response
+from utils.pagination import MAX_PAGE_SIZE, CursorPage
+
+
+def test_limit_is_capped(api, admin_headers):
+    assert api.get("/bill/all", params={"limit": 500}, headers=admin_headers).status_code == 200
+    # Au-delà: ramenée à MAX_PAGE_SIZE, pas refusée
+    assert api.get("/bill/all", params={"limit": 501}, headers=admin_headers).status_code == 200
+    assert api.get("/bill/all", params={"limit": 0}, headers=admin_headers).status_code == 422
+
+    assert CursorPage(Response(), limit=100000).limit == MAX_PAGE_SIZE
+    assert CursorPage(Response(), limit=20).limit == 20
@@ -0,0 +1,92 @@
+"""Pool bcrypt des routes de connexion (utils/password_pool.py) et mise à jour des hachages"""
+import threading
+import bcrypt
+import pytest
+from models.admin import Admin
+from models.client import Client
+from utils import auth
+from utils.password_pool import PasswordHashPool
+
+
+def _rounds(password_hash: str) -> int:
+    return int(password_hash.split("$")[2])
+
+
+@pytest.fixture
+def saturated_pool(monkeypatch):
+    """Pool d'un seul thread sans file d'attente, vérification bloquée jusqu'à release"""
+
+    pool = PasswordHashPool(workers=1, max_queue=0)
+    started, release = threading.Event(), threading.Event()
+    verify = auth.verify_password
+
+    def blocking_verify(plain_password, hashed_password):
+        started.set()
+        release.wait(10)
+        return verify(plain_password, hashed_password)
+
+    monkeypatch.setattr(auth, "password_pool", pool)
+    monkeypatch.setattr(auth, "verify_password", blocking_verify)
+    yield pool, started, release
+    release.set()
+
+
+def test_saturated_pool_answers_503_with_retry_after(api, client_user, saturated_pool):
+    pool, started, release = saturated_pool
+    credentials = {"email": "client@test.dz", "password": "client123"}
+    statuses = []
+
+    first = threading.Thread(
+        target=lambda: statuses.append(api.post("/client/login", json=credentials).status_code))
+    first.start()
+    assert started.wait(10)
+
+    response = api.post("/client/login", json=credentials)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.json()["message"] == "Serveur surchargé, veuillez réessayer"
+
+    release.set()
+    first.join(10)
+    assert statuses == [200]
+    stats = pool.stats()
+    assert (stats["rejected"], stats["completed"], stats["peak_pending"]) == (1, 1, 1)
+
+    # Pool libre: les connexions passent de nouveau
+    assert api.post("/client/login", json=credentials).status_code == 200
+
+
+@pytest.mark.parametrize("model, path", [(Client, "/client/login"), (Admin, "/admin/login")])
+def test_login_upgrades_outdated_hashes(api, db, model, path):
+    old_hash = bcrypt.hashpw(b"secret123", bcrypt.gensalt(rounds=auth.BCRYPT_ROUNDS + 1)).decode()
+    user = model(username="ancien", email="ancien@test.dz", password_hash=old_hash)
+    db.add(user)
+    db.commit()
+    credentials = {"email": "ancien@test.dz", "password": "secret123"}
+
+    assert api.post(path, json=credentials).status_code == 200
+
+    db.refresh(user)
+    upgraded = user.password_hash
+    assert upgraded != old_hash
+    assert _rounds(upgraded) == auth.BCRYPT_ROUNDS
+    assert auth.verify_password("secret123", upgraded)
+
+    # Hachage à jour: plus réécrit
+    assert api.post(path, json=credentials).status_code == 200
+    db.refresh(user)
+    assert user.password_hash == upgraded
+
+
+def test_failed_login_keeps_the_old_hash(api, db):
+    old_hash = bcrypt.hashpw(b"secret123", bcrypt.gensalt(rounds=auth.BCRYPT_ROUNDS + 1)).decode()
+    user = Client(username="ancien", email="ancien@test.dz", password_hash=old_hash)
+    db.add(user)
+    db.commit()
+
+    response = api.post("/client/login", json={"email": "ancien@test.dz", "password": "mauvais"})
+
+    assert response.status_code == 401
+    db.refresh(user)
+    assert user.password_hash == old_hash
@@ -0,0 +1,152 @@
+"""Import du catalogue (POST /product/import, utils/product_import.py)"""
+import json
+from decimal import Decimal
+from sqlalchemy import func, select
+from models.product import Product
+from models.stock_alert import StockAlert
+from utils import product_import
+from utils.db import SessionLocal
+
+
+def _import(api, headers, content: str, filename: str = "products.csv"):
+    return api.post("/product/import", files={"file": (filename, content.encode("utf-8"))},
+                    headers=headers)
+
+
+def _ndjson(*rows) -> str:
+    return "".join(json.dumps(row) + "\n" for row in rows)
+
+
+def _product(db, **filters) -> Product:
+    db.expire_all()
+    return db.execute(select(Product).filter_by(**filters)).scalar_one()
+
+
+def _count(db, model) -> int:
+    return db.execute(select(func.count()).select_from(model)).scalar_one()
+
+
+def test_csv_creates_updates_and_counts_unchanged(api, db, admin_headers, products):
+    category_id = products[0].category_id
+    response = _import(api, admin_headers, (
+        "sku,name,price,quantity_in_stock,category_id,image_urls\n"
+        ",Produit 0,12.00,,,\n"
+        f"NEW-1,Nouveau,5.00,3,{category_id},https://a.png|https://b.png\n"
+        ",Produit 1,10.00,100,,\n"
+    ))
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "received": 3, "inserted": 1, "updated": 1, "unchanged": 1,
+        # Nouveau: 3 unités sous le seuil par défaut (10)
+        "alerts_created": 1, "alerts_resolved": 0,
+    }
+    # Champ vide: valeur actuelle gardée
+    updated = _product(db, name="Produit 0")
+    assert (updated.price, updated.quantity_in_stock) == (Decimal("12.00"), 100)
+    created = _product(db, sku="NEW-1")
+    assert created.image_urls == ["https://a.png", "https://b.png"]
+    assert created.minimum_stock_level == 10
+
+
+def test_ndjson_matches_sku_before_name_and_last_row_wins(api, db, admin_headers, products):
+    products[2].sku = "SKU-2"
+    db.commit()
+
+    response = _import(api, admin_headers, _ndjson(
+        {"sku": "SKU-2", "quantity_in_stock": 40},
+        {"sku": "SKU-2", "quantity_in_stock": 0},
+        # sku inconnu: nouveau produit, même si le nom existe déjà
+        {"sku": "SKU-X", "name": "Produit 3", "price": "7.50", "quantity_in_stock": 20,
+         "category_id": products[0].category_id, "image_urls": ["https://x.png"]},
+    ), filename="products.ndjson")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "received": 3, "inserted": 1, "updated": 1, "unchanged": 0,
+        "alerts_created": 1, "alerts_resolved": 0,
+    }
+    assert _product(db, sku="SKU-2").quantity_in_stock == 0
+    assert _product(db, id=products[3].id).sku is None
+    assert _product(db, sku="SKU-X").name == "Produit 3"
+
+
+def test_validation_errors_report_file_lines_and_import_nothing(api, db, admin_headers, products):
+    response = _import(api, admin_headers, (
+        "name,price,quantity_in_stock\n"
+        "Produit 0,11.00,\n"
+        "Produit 1,1.234,\n"
+        "Produit 2,10.00,-1\n"
+    ))
+
+    assert response.status_code == 400
+    assert response.json()["message"] == (
+        "line 3: price must be a number with at most 2 decimals; "
+        "line 4: quantity_in_stock cannot be negative"
+    )
+    assert _product(db, name="Produit 0").price == Decimal("10.00")
+
+
+def test_new_product_requires_name_price_and_category(api, db, admin_headers, products):
+    # Ligne 2 valide (mise à jour), ligne 3 refusée après validation: rien n'est importé
+    response = _import(api, admin_headers, "sku,name,price\n,Produit 0,11.00\nNEW-2,Nouveau,4.00\n")
+
+    assert response.status_code == 400
+    assert response.json()["message"] == (
+        "line 3: name, price and category_id are required for a new product")
+    assert _count(db, Product) == len(products)
+    assert _product(db, name="Produit 0").price == Decimal("10.00")
+
+
+def test_malformed_files_are_rejected_with_their_line(api, admin_headers, products):
+    response = _import(api, admin_headers, "name,price\nProduit 0,11.00\nProduit 1,1,2\n")
+    assert response.status_code == 400
+    assert response.json()["message"].startswith("line 3: extra data after last expected column")
+
+    response = _import(api, admin_headers, '{"name": "Produit 0"}\n{"name": \n',
+                       filename="products.ndjson")
+    assert response.status_code == 400
+    assert response.json()["message"].startswith("Invalid file:")
+
+    response = _import(api, admin_headers, "nom,prix\n")
+    assert response.status_code == 400
+    assert response.json()["message"] == "Unknown CSV column(s): nom, prix"
+
+
+def test_stock_alerts_are_resolved_in_the_import(api, db, admin_headers, products):
+    assert api.patch(f"/product/{products[0].id}/stock", json={"quantity": 2},
+                     headers=admin_headers).status_code == 200
+
+    response = _import(api, admin_headers, "name,quantity_in_stock\nProduit 0,50\n")
+
+    assert response.status_code == 200
+    assert response.json()["alerts_resolved"] == 1
+    db.expire_all()
+    assert db.execute(select(StockAlert.is_resolved)).scalars().all() == [True]
+
+
+def test_sku_created_during_import_is_updated(monkeypatch, api, db, admin, admin_headers, products):
+    category_id = products[0].category_id
+    text = product_import.text
+
+    def racing_text(sql, *args, **kwargs):
+        # POST /product/ concurrent: même sku, commité après le rattachement par sku
+        if sql is product_import._INSERT:
+            with SessionLocal() as other:
+                other.add(Product(sku="RACE-1", name="Concurrent", price=Decimal("1.00"),
+                                  quantity_in_stock=1, category_id=category_id,
+                                  admin_id=admin.id, image_urls=["https://r.png"]))
+                other.commit()
+        return text(sql, *args, **kwargs)
+
+    monkeypatch.setattr(product_import, "text", racing_text)
+    response = _import(api, admin_headers, (
+        "sku,name,price,quantity_in_stock,category_id,image_urls\n"
+        f"RACE-1,Importé,9.00,30,{category_id},https://i.png\n"
+    ))
+
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 0
+    assert response.json()["updated"] == 1
+    raced = _product(db, sku="RACE-1")
+    assert (raced.name, raced.quantity_in_stock) == ("Importé", 30)
@@ -0,0 +1,34 @@
+"""Recherche de produits classée par pertinence (utils/product_search.py)"""
+from decimal import Decimal
+from models.category import Category
+from models.product import Product
+from utils import product_search
+
+
+def test_best_match_survives_candidate_cap(monkeypatch, api, db, admin):
+    monkeypatch.setattr(product_search, "SEARCH_MAX_CANDIDATES", 3)
+
+    category = Category(name="Meubles")
+    db.add(category)
+    db.flush()
+
+    def product(name: str, description: str = None) -> Product:
+        return Product(name=name, description=description, price=Decimal("10.00"),
+                       quantity_in_stock=1, category_id=category.id, admin_id=admin.id,
+                       image_urls=["https://example.com/p.png"])
+
+    # Correspondances faibles d'abord: le meilleur résultat est la dernière ligne insérée
+    db.add_all([product(f"Chaise modèle {i}") for i in range(8)])
+    db.flush()
+    best = product("Chaise", "Chaise en chêne, chaise de salle à manger")
+    db.add(best)
+    db.commit()
+
+    response = api.get("/product/search", params={"q": "chaise"})
+
+    assert response.status_code == 200
+    results = response.json()
+    assert len(results) == 3
+    assert results[0]["id"] == best.id
+    ranks = [row["rank"] for row in results]
+    assert ranks == sorted(ranks, reverse=True)
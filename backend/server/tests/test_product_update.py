@@ -0,0 +1,22 @@
+"""Mise à jour partielle d'un produit (PUT /product/{id})"""
+import pytest
+
+
+@pytest.mark.parametrize("field", ["image_urls", "name", "price", "is_active"])
+def test_explicit_null_on_required_field_is_rejected(api, db, admin_headers, products, field):
+    response = api.put(f"/product/{products[0].id}", json={field: None}, headers=admin_headers)
+
+    assert response.status_code == 422
+    db.refresh(products[0])
+    assert products[0].image_urls == ["https://example.com/p.png"]
+
+
+def test_null_clears_nullable_field_and_omitted_fields_are_kept(api, db, admin_headers, products):
+    response = api.put(f"/product/{products[0].id}",
+                       json={"description": None, "price": "12.50"}, headers=admin_headers)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["description"] is None
+    assert float(body["price"]) == 12.5
+    assert body["image_urls"] == ["https://example.com/p.png"]
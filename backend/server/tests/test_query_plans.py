@@ -0,0 +1,143 @@
+"""Plans d'exécution des routes sur une base remplie (utils/query_plans.py)"""
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from sqlalchemy import event, text
+from utils.db import SessionLocal, engine
+from utils.query_plans import PLAN_CHECK_MIN_ROWS, check_query_plans, seq_scans, table_rows
+
+ROWS = 2 * PLAN_CHECK_MIN_ROWS
+CLIENTS = 5 * ROWS
+
+SEED = [
+    "INSERT INTO categories (name) SELECT 'Rayon ' || g FROM generate_series(1, 50) g",
+    # Quelques produits sous leur seuil (index partiel des stocks bas)
+    """INSERT INTO products (name, price, quantity_in_stock, minimum_stock_level,
+                             category_id, admin_id, image_urls, is_active)
+       SELECT 'Article ' || g, 10, CASE WHEN g % 1000 = 0 THEN 0 ELSE 100 END, 5,
+              (SELECT min(id) FROM categories) + g % 50, :admin_id,
+              ARRAY['https://example.com/p.png'], true
+       FROM generate_series(1, :rows) g""",
+    """INSERT INTO clients (username, email, password_hash, is_active, created_at)
+       SELECT 'client' || g, 'client' || g || '@test.dz', 'x', true, now() - g * interval '1 minute'
+       FROM generate_series(1, :clients) g""",
+    # Deux factures par client pour la moitié des clients (dont client_user), une sur dix impayée
+    """INSERT INTO bills (client_id, bill_number, total_amount, total_paid, total_remaining,
+                          status, notification_sent, created_at)
+       SELECT :client_id + g % (:rows / 2), 'SEED-' || g, 20,
+              CASE WHEN g % 10 = 0 THEN 0 ELSE 20 END,
+              CASE WHEN g % 10 = 0 THEN 20 ELSE 0 END,
+              CASE WHEN g % 10 = 0 THEN 'not paid' ELSE 'paid' END, false,
+              now() - g * interval '1 minute'
+       FROM generate_series(1, :rows) g""",
+    """INSERT INTO bill_items (bill_id, product_id, product_name, unit_price, quantity, subtotal)
+       SELECT b.id, :product_id, 'Produit', 10, 1, 10
+       FROM bills b, generate_series(1, 2)""",
+    """INSERT INTO payments (bill_id, admin_id, amount_paid, payment_method, payment_date, created_at)
+       SELECT id, :admin_id, 20, 'cash', created_at, created_at FROM bills WHERE status = 'paid'""",
+    """INSERT INTO client_balances (client_id, total_bills, total_debt)
+       SELECT client_id, count(*), sum(total_remaining) FROM bills GROUP BY client_id""",
+    """INSERT INTO client_balance_days (client_id, day, debt)
+       SELECT client_id, created_at::date, sum(total_remaining) FROM bills
+       GROUP BY client_id, created_at::date""",
+    """INSERT INTO notifications (admin_id, notification_type, channel, message, is_sent, created_at)
+       SELECT :admin_id, 'new_bill', 'email', 'Message', g % 100 <> 0, now() - g * interval '1 minute'
+       FROM generate_series(1, :rows) g""",
+    # Alertes résolues pour la plupart, comme les notifications envoyées
+    """INSERT INTO stock_alerts (product_id, alert_type, message, is_resolved, created_at)
+       SELECT id, 'low_stock', 'Stock bas', id % 1000 <> 0, now() - id * interval '1 minute'
+       FROM products""",
+    """INSERT INTO otps (email, otp_code, otp_type, is_used, is_verified, expires_at)
+       SELECT 'client' || g || '@test.dz', '123456', 'registration', true, true, now()
+       FROM generate_series(1, :rows) g""",
+    """INSERT INTO stock_reservations (client_id, product_id, quantity, expires_at)
+       SELECT :client_id, id, 1, now() + interval '15 minutes' FROM products WHERE id % 1000 = 0""",
+]
+
+
+@contextmanager
+def captured_selects():
+    """Instructions SELECT (et leurs paramètres) envoyées au pilote"""
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+
+def test_routes_do_not_seq_scan_large_tables(api, db, admin, client_user, products,
+                                             admin_headers, client_headers):
+    with engine.begin() as conn:
+        ids = {"admin_id": admin.id, "client_id": client_user.id,
+               "product_id": products[0].id, "rows": ROWS, "clients": CLIENTS}
+        for statement in SEED:
+            conn.execute(text(statement), ids)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+
+    bill_id = db.execute(text(
+        "SELECT max(id) FROM bills WHERE client_id = :id"), {"id": client_user.id}).scalar()
+    product_id = products[0].id
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    routes = [
+        ("/bill/all", admin_headers),
+        ("/bill/all?status_filter=not paid", admin_headers),
+        (f"/bill/admin/{bill_id}", admin_headers),
+        ("/bill/my-bills", client_headers),
+        ("/bill/my-bills/count", client_headers),
+        ("/bill/unpaid-bills/count", client_headers),
+        (f"/bill/{bill_id}", client_headers),
+        ("/payment/", admin_headers),
+        (f"/payment/bill/{bill_id}", admin_headers),
+        ("/notification/", admin_headers),
+        ("/notification/pending", admin_headers),
+        ("/stock-alert/", admin_headers),
+        ("/stock-alert/unresolved", admin_headers),
+        ("/product/", {}),
+        (f"/product/?category_id={products[0].category_id}", {}),
+        (f"/product/{product_id}", {}),
+        ("/product/low-stock", admin_headers),
+        ("/product/search?q=produit", {}),
+        (f"/product/{product_id}/stock/movements", admin_headers),
+        (f"/product/{product_id}/stock/at?at={now}", admin_headers),
+        ("/client/", admin_headers),
+        ("/client/aging", admin_headers),
+        ("/cart/", client_headers),
+    ]
+
+    failures = {}
+    rows = table_rows(db)
+    assert all(rows[table] >= PLAN_CHECK_MIN_ROWS
+               for table in ("bills", "bill_items", "payments", "clients", "products",
+                             "notifications", "stock_alerts", "stock_movements"))
+
+    with engine.connect() as conn:
+        for url, headers in routes:
+            with captured_selects() as statements:
+                response = api.get(url, headers=headers)
+                assert response.status_code == 200, url
+                # Page suivante (curseur) des listes paginées
+                cursor = response.headers.get("X-Next-Cursor")
+                if cursor:
+                    separator = "&" if "?" in url else "?"
+                    assert api.get(f"{url}{separator}cursor={cursor}",
+                                   headers=headers).status_code == 200, url
+
+            assert statements, url
+            for statement, parameters in statements:
+                scans = seq_scans(conn, statement, parameters, rows)
+                if scans:
+                    failures.setdefault(url, []).append((scans, statement))
+
+    assert failures == {}
+
+    # Requêtes de la commande « plans » (dont celles des tâches de fond)
+    with SessionLocal() as session:
+        assert [result for result in check_query_plans(session) if not result["ok"]] == []
@@ -0,0 +1,74 @@
+"""Réponses orjson (utils/responses.py) identiques à la sérialisation Pydantic des response_model"""
+import re
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import List
+from pydantic import TypeAdapter
+from sqlalchemy import text
+from schemas.bill import BillWithClient, BillWithItems
+from utils.responses import dumps
+
+UTC_DATETIME = re.compile(r"^\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(\.\d+)?Z$")
+DECIMAL = re.compile(r"^\d+\.\d\d$")
+
+
+def _bills(api, db, admin_headers, make_bill):
+    first = make_bill(1, 2)
+    make_bill(3)
+    paid = make_bill(0, 0, 1)
+    assert api.post(f"/bill/{paid.id}/pay", params={"amount": "10.00"},
+                    headers=admin_headers).status_code == 200
+    # Date sans microsecondes, updated_at absent
+    db.execute(text("UPDATE bills SET created_at = :at, updated_at = NULL WHERE id = :id"),
+               {"at": datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc), "id": first.id})
+    db.commit()
+
+
+def test_bill_page_matches_the_response_model(api, db, admin_headers, client_headers, make_bill):
+    _bills(api, db, admin_headers, make_bill)
+
+    for path, headers, model in (("/bill/all", admin_headers, BillWithClient),
+                                 ("/bill/my-bills", client_headers, BillWithItems)):
+        response = api.get(path, headers=headers)
+        assert response.status_code == 200
+        bills = response.json()
+        assert len(bills) == 3
+
+        # Sérialisation par Pydantic des mêmes données validées par le response_model
+        adapter = TypeAdapter(List[model])
+        assert adapter.dump_python(adapter.validate_json(response.content), mode="json") == bills
+
+        # Et par FastAPI: route de détail qui renvoie le modèle Pydantic
+        detail = "/bill/admin/{}" if model is BillWithClient else "/bill/{}"
+        for bill in bills:
+            assert api.get(detail.format(bill["id"]), headers=headers).json() == bill
+
+
+def test_decimals_and_datetimes_keep_their_format(api, db, admin_headers, make_bill):
+    _bills(api, db, admin_headers, make_bill)
+
+    bills = api.get("/bill/all", headers=admin_headers).json()
+
+    for bill in bills:
+        for field in ("total_amount", "total_paid", "total_remaining"):
+            assert DECIMAL.match(bill[field]), bill[field]
+        assert UTC_DATETIME.match(bill["created_at"]), bill["created_at"]
+        for item in bill["items"]:
+            assert item["unit_price"] == "10.00"
+            assert DECIMAL.match(item["subtotal"])
+            assert UTC_DATETIME.match(item["created_at"])
+    assert {bill["created_at"] for bill in bills} >= {"2026-01-02T03:04:05Z"}
+    assert any(bill["updated_at"] is None for bill in bills)
+    assert any(bill["status"] == "paid" and bill["total_paid"] == "10.00" for bill in bills)
+
+
+def test_dumps_matches_pydantic_for_edge_values():
+    values = {
+        "amount": Decimal("1234567890.10"),
+        "small": Decimal("0.01"),
+        "created_at": datetime(2026, 1, 2, 3, 4, 5, 60, tzinfo=timezone.utc),
+        "missing": None,
+    }
+    adapter = TypeAdapter(dict)
+
+    assert dumps(values) == adapter.dump_json(values)
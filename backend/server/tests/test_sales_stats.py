@@ -0,0 +1,147 @@
+"""Agrégats journaliers des factures (bill_daily_stats), comparés à un recalcul depuis bills"""
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+import pytest
+from sqlalchemy import Date, cast, case, func, select
+from models.bill import Bill
+from models.bill_daily_stat import BillDailyStat
+from models.client import Client
+from utils.bill_numbering import allocate_bill_number
+from utils.sales_stats import STAT_FIELDS, record_bill_stats
+
+DAYS_AGO = (0, 1, 40, 400)  # plusieurs jours, mois et années
+
+
+def _bill(db, client_id: int, amount: str, days_ago: int) -> Bill:
+    """Facture antidatée, comptée dans les agrégats comme par create_bill_with_items"""
+
+    bill = Bill(
+        client_id=client_id,
+        bill_number=allocate_bill_number(db),
+        total_amount=Decimal(amount),
+        total_paid=Decimal("0.00"),
+        total_remaining=Decimal(amount),
+        status="not paid",
+        created_at=datetime.now(timezone.utc) - timedelta(days=days_ago)
+    )
+    db.add(bill)
+    db.flush()
+    record_bill_stats(db, bill)
+    db.commit()
+    return bill
+
+
+def _pay(api, headers, bill_id: int, amount: str) -> int:
+    response = api.post("/payment/", headers=headers, json={
+        "bill_id": bill_id, "amount_paid": amount,
+        "payment_date": datetime.now(timezone.utc).isoformat()
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _direct(db, date_format: str) -> list:
+    """Statistiques par période calculées directement sur la table bills"""
+
+    period = func.to_char(cast(Bill.created_at, Date), date_format).label("period")
+    rows = db.execute(select(
+        period,
+        func.count(Bill.id),
+        func.sum(Bill.total_amount),
+        func.sum(Bill.total_paid),
+        func.sum(Bill.total_remaining),
+        func.count(case((Bill.status == "paid", 1))),
+        func.count(case((Bill.status == "not paid", 1))),
+    ).group_by(period).order_by(period)).all()
+    return [{"period": row[0], **dict(zip(STAT_FIELDS, row[1:]))} for row in rows]
+
+
+def _as_decimals(rows: list) -> list:
+    return [{key: Decimal(str(value)) if isinstance(value, float) else value
+             for key, value in row.items()} for row in rows]
+
+
+@pytest.fixture
+def history(api, db, admin_headers, client_headers, client_user, products):
+    """Factures créées, payées, modifiées et supprimées par les routes"""
+
+    other = Client(username="other", email="other@test.dz", password_hash="x")
+    gone = Client(username="gone", email="gone@test.dz", password_hash="x")
+    db.add_all([other, gone])
+    db.commit()
+
+    bills = {
+        client.id: [_bill(db, client.id, f"{100 * (i + 1)}.00", days) for i, days in enumerate(DAYS_AGO)]
+        for client in (client_user, other, gone)
+    }
+    mine = bills[client_user.id]
+
+    # Création par la route (jour courant)
+    created = api.post("/bill/", json={"items": [{"product_id": products[0].id, "quantity": 3}]},
+                       headers=client_headers)
+    assert created.status_code == 201
+
+    # Paiement total, partiel, modifié, supprimé, virement FIFO
+    assert api.post(f"/bill/{mine[0].id}/pay", params={"amount": "100.00"},
+                    headers=admin_headers).status_code == 200
+    assert api.post(f"/bill/{created.json()['id']}/pay", params={"amount": "12.50"},
+                    headers=admin_headers).status_code == 200
+    payment_id = _pay(api, admin_headers, mine[2].id, "10.00")
+    assert api.put(f"/payment/{payment_id}", headers=admin_headers,
+                   json={"amount_paid": "300.00"}).status_code == 200
+    deleted_id = _pay(api, admin_headers, mine[3].id, "400.00")
+    assert api.delete(f"/payment/{deleted_id}", headers=admin_headers).status_code == 204
+    assert api.post("/payment/bulk", headers=admin_headers, json={
+        "client_id": other.id, "amount": "250.00",
+        "payment_date": datetime.now(timezone.utc).isoformat()
+    }).status_code == 201
+    # Client supprimé avec ses factures
+    assert api.delete(f"/client/{gone.id}", headers=admin_headers).status_code == 204
+
+    db.expire_all()
+
+
+def test_daily_rollup_matches_a_recomputation(db, history):
+    rollup = db.execute(
+        select(BillDailyStat.day, *(getattr(BillDailyStat, field) for field in STAT_FIELDS))
+        .where(BillDailyStat.total_bills > 0).order_by(BillDailyStat.day)
+    ).all()
+    expected = _direct(db, "YYYY-MM-DD")
+
+    assert [{"period": row[0].isoformat(), **dict(zip(STAT_FIELDS, row[1:]))} for row in rollup] == expected
+    # Jours vidés (client supprimé): plus aucune somme résiduelle
+    assert db.execute(select(func.count()).where(
+        BillDailyStat.total_bills == 0,
+        (BillDailyStat.total_revenue != 0) | (BillDailyStat.total_paid != 0)
+        | (BillDailyStat.total_pending != 0)
+    )).scalar_one() == 0
+
+
+def test_statistics_routes_match_a_direct_aggregate(api, db, admin_headers, history):
+    today = datetime.now(timezone.utc).date()
+    first = today - timedelta(days=max(DAYS_AGO))
+
+    def get(path, **params):
+        response = api.get(f"/bill/statistics/{path}", params=params, headers=admin_headers)
+        assert response.status_code == 200
+        return _as_decimals(response.json())
+
+    def in_range(rows, start, end):
+        return [row for row in rows if start <= row["period"] <= end]
+
+    days = _direct(db, "YYYY-MM-DD")
+    months = _direct(db, "YYYY-MM")
+    years = _direct(db, "YYYY")
+
+    assert get("daily", year=today.year, month=today.month) == [
+        row for row in days if row["period"].startswith(today.strftime("%Y-%m"))]
+    assert get("monthly") == months
+    assert get("monthly", year=first.year) == [
+        row for row in months if row["period"].startswith(str(first.year))]
+    assert get("yearly") == years
+
+    start, end = today - timedelta(days=45), today - timedelta(days=1)
+    assert get("period-range", start_date=start.isoformat(), end_date=end.isoformat()) == \
+        in_range(days, start.isoformat(), end.isoformat())
+    assert get("period-range", start_date=first.isoformat(), end_date=today.isoformat(),
+               group_by="month") == months
@@ -0,0 +1,165 @@
+"""Pool de connexions SMTP (utils/smtp_pool.py) contre un serveur SMTP local minimal"""
+import smtplib
+import socketserver
+import threading
+from email.message import EmailMessage
+import pytest
+from utils import smtp_pool
+from utils.smtp_pool import SMTPConnectionPool
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Une session SMTP: EHLO, MAIL, RCPT, DATA, NOOP, RSET, QUIT"""
+
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 stub ESMTP")
+
+        for raw in self.rfile:
+            command = raw.decode().strip().split(" ")[0].upper()
+            if command == "EHLO":
+                self.reply("250-stub")
+                self.reply("250 8BITMIME")
+            elif command == "MAIL" and server.drops:
+                # Connexion coupée par le serveur au début d'une transaction
+                server.drops -= 1
+                return
+            elif command in ("HELO", "MAIL", "RCPT", "RSET"):
+                self.reply("250 OK")
+            elif command == "NOOP":
+                with server.lock:
+                    server.noops += 1
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                body = []
+                for line in self.rfile:
+                    if line == b".\r\n":
+                        break
+                    body.append(line)
+                with server.lock:
+                    server.messages.append(b"".join(body))
+                self.reply("250 OK")
+                if server.hangup:
+                    return
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.noops = 0
+        self.messages = []
+        self.drops = 0       # MAIL suivants auxquels le serveur répond en coupant la connexion
+        self.hangup = False  # fermer la connexion après chaque message
+
+
+@pytest.fixture
+def server():
+    stub = StubSMTPServer()
+    thread = threading.Thread(target=stub.serve_forever, daemon=True)
+    thread.start()
+    yield stub
+    stub.shutdown()
+    stub.server_close()
+
+
+def _pool(server, **options) -> SMTPConnectionPool:
+    host, port = server.server_address
+    return SMTPConnectionPool(host, port, starttls=False, **options)
+
+
+def _message(i: int) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = "noreply@test.dz"
+    message["To"] = f"client{i}@test.dz"
+    message["Subject"] = f"Notification {i}"
+    message.set_content(f"Message {i}")
+    return message
+
+
+def _send(pool: SMTPConnectionPool, count: int, start: int = 0):
+    for i in range(start, start + count):
+        pool.send_message(_message(i))
+
+
+def test_connection_is_reused(server):
+    pool = _pool(server)
+
+    _send(pool, 5)
+
+    assert server.connections == 1
+    assert pool.stats() == {"idle": 1, "opened": 1, "reused": 4}
+    assert len(server.messages) == 5
+
+
+def test_connection_is_recycled_after_max_messages(server):
+    pool = _pool(server, max_messages=2)
+
+    _send(pool, 5)
+
+    # 2 + 2 + 1 messages
+    assert server.connections == 3
+    assert pool.stats()["opened"] == 3
+    assert len(server.messages) == 5
+
+
+def test_idle_connection_is_checked_with_noop(server, monkeypatch):
+    pool = _pool(server)
+    _send(pool, 1)
+    monkeypatch.setattr(smtp_pool, "SMTP_POOL_KEEPALIVE", 0)
+
+    _send(pool, 1, start=1)
+
+    assert (server.noops, server.connections) == (1, 1)
+
+    # Connexion fermée côté serveur pendant l'inactivité: NOOP échoue, nouvelle connexion
+    server.hangup = True
+    _send(pool, 1, start=2)
+    server.hangup = False
+    _send(pool, 1, start=3)
+
+    assert server.connections == 2
+    assert len(server.messages) == 4
+
+
+def test_connection_idle_too_long_is_replaced_without_noop(server, monkeypatch):
+    pool = _pool(server)
+    _send(pool, 1)
+    monkeypatch.setattr(smtp_pool, "SMTP_POOL_MAX_IDLE", 0)
+
+    _send(pool, 1, start=1)
+
+    assert (server.noops, server.connections) == (0, 2)
+
+
+def test_dropped_connection_is_retried_once(server):
+    pool = _pool(server)
+    _send(pool, 1)
+
+    server.drops = 1
+    _send(pool, 1, start=1)
+
+    assert server.connections == 2
+    assert len(server.messages) == 2
+
+    # Deuxième coupure: une seule nouvelle tentative, l'erreur remonte
+    server.drops = 2
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        _send(pool, 1, start=2)
+    assert len(server.messages) == 2
+    assert pool.stats()["idle"] == 0
@@ -0,0 +1,87 @@
+"""Inventaire en masse (POST /product/stock/bulk, apply_stock_adjustments)"""
+import pytest
+from sqlalchemy import select
+from models.notification import Notification
+from models.product import Product
+from models.stock_alert import StockAlert
+from utils import stock_manager
+
+
+def _stock(db) -> dict:
+    db.expire_all()
+    return dict(db.execute(select(Product.id, Product.quantity_in_stock)).all())
+
+
+def _open_alerts(db) -> dict:
+    db.expire_all()
+    return dict(db.execute(
+        select(StockAlert.product_id, StockAlert.alert_type).where(StockAlert.is_resolved == False)
+    ).all())
+
+
+def test_bulk_adjustments_report_each_row(api, db, admin_headers, products):
+    p0, p1, p2, p3, p4 = (product.id for product in products)
+    # Alerte ouverte sur p4, résolue par l'inventaire
+    assert api.patch(f"/product/{p4}/stock", json={"quantity": 2},
+                     headers=admin_headers).status_code == 200
+
+    response = api.post("/product/stock/bulk", json={"items": [
+        {"product_id": p0, "quantity": 3},
+        {"product_id": p1, "delta": -100},
+        {"product_id": p2, "quantity": 100},
+        {"product_id": p3, "delta": -101},
+        {"product_id": 999999, "quantity": 1},
+        {"product_id": p4, "delta": 48},
+    ]}, headers=admin_headers)
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "updated": 3,
+        "unchanged": 1,
+        "rejected": 2,
+        "alerts_created": 2,
+        "alerts_resolved": 1,
+        "results": [
+            {"product_id": p0, "status": "updated", "previous_quantity": 100, "quantity_in_stock": 3},
+            {"product_id": p1, "status": "updated", "previous_quantity": 100, "quantity_in_stock": 0},
+            {"product_id": p2, "status": "unchanged", "previous_quantity": 100, "quantity_in_stock": 100},
+            {"product_id": p3, "status": "negative_stock", "previous_quantity": 100,
+             "quantity_in_stock": 100},
+            {"product_id": 999999, "status": "not_found", "previous_quantity": None,
+             "quantity_in_stock": None},
+            {"product_id": p4, "status": "updated", "previous_quantity": 2, "quantity_in_stock": 50},
+        ],
+    }
+    assert _stock(db) == {p0: 3, p1: 0, p2: 100, p3: 100, p4: 50}
+    assert _open_alerts(db) == {p0: "low_stock", p1: "out_of_stock"}
+    # Une notification par admin et par nouvelle alerte
+    assert len(db.execute(select(Notification).where(
+        Notification.notification_type == "stock_alert")).all()) >= 2
+
+
+def test_alert_failure_rolls_back_the_stock(monkeypatch, api, db, admin_headers, products):
+    def failing_sync(db, product_ids):
+        raise RuntimeError("alertes indisponibles")
+
+    monkeypatch.setattr(stock_manager, "sync_stock_alerts", failing_sync)
+
+    # Erreur serveur (500): relevée par le client de test
+    with pytest.raises(RuntimeError):
+        api.post("/product/stock/bulk", json={"items": [
+            {"product_id": products[0].id, "quantity": 1},
+        ]}, headers=admin_headers)
+
+    assert _stock(db)[products[0].id] == 100
+    assert _open_alerts(db) == {}
+
+
+@pytest.mark.parametrize("items", [
+    [{"product_id": 1, "quantity": 1, "delta": 1}],
+    [{"product_id": 1}],
+    [{"product_id": 1, "quantity": -1}],
+    [{"product_id": 1, "quantity": 1}, {"product_id": 1, "delta": 1}],
+    [],
+])
+def test_invalid_items_are_rejected(api, admin_headers, items):
+    assert api.post("/product/stock/bulk", json={"items": items},
+                    headers=admin_headers).status_code == 422
@@ -0,0 +1,124 @@
+"""Journal des mouvements de stock (trigger record_stock_movements, utils/stock_ledger.py)"""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import select, text
+from models.stock_movement import StockMovement
+from models.stock_snapshot import StockSnapshot
+from utils.db import SessionLocal
+from utils.stock_ledger import compact_stock_snapshots, set_stock_movement_context, stock_at
+
+
+def _movements(db, product_id: int) -> list:
+    db.expire_all()
+    return db.execute(
+        select(StockMovement.quantity, StockMovement.reason, StockMovement.bill_id,
+               StockMovement.admin_id)
+        .where(StockMovement.product_id == product_id).order_by(StockMovement.id)
+    ).all()
+
+
+def _set_stock(db, product_id: int, quantity: int) -> datetime:
+    """Modifier le stock (SQL direct), renvoie un instant situé après le commit"""
+    db.execute(text("UPDATE products SET quantity_in_stock = :q WHERE id = :id"),
+               {"q": quantity, "id": product_id})
+    db.commit()
+    return datetime.now(timezone.utc)
+
+
+def test_every_stock_write_is_recorded(api, db, admin, client_headers, admin_headers, products):
+    product_id = products[0].id
+
+    response = api.post("/bill/", json={"items": [{"product_id": product_id, "quantity": 4}]},
+                        headers=client_headers)
+    assert response.status_code == 201
+    assert api.patch(f"/product/{product_id}/stock", json={"quantity": 90},
+                     headers=admin_headers).status_code == 200
+    set_stock_movement_context(db, "restock")
+    _set_stock(db, product_id, 95)
+    # Sans contexte: ajustement
+    _set_stock(db, product_id, 93)
+
+    assert _movements(db, product_id) == [
+        (100, "initial", None, None),
+        (-4, "sale", response.json()["id"], None),
+        (-6, "adjustment", None, admin.id),
+        (5, "restock", None, None),
+        (-2, "adjustment", None, None),
+    ]
+
+
+def test_unknown_reason_is_rejected(db):
+    with pytest.raises(ValueError):
+        set_stock_movement_context(db, "bill_cancellation")
+
+
+def test_stock_at_uses_snapshot_and_later_movements(db, products):
+    product_id = products[0].id
+    created = datetime.now(timezone.utc)
+    at_80 = _set_stock(db, product_id, 80)
+    at_70 = _set_stock(db, product_id, 70)
+
+    assert compact_stock_snapshots(db, min_movements=1) == len(products)
+    at_snapshot = datetime.now(timezone.utc)
+    at_75 = _set_stock(db, product_id, 75)
+    at_60 = _set_stock(db, product_id, 60)
+
+    snapshot = db.execute(
+        select(StockSnapshot).where(StockSnapshot.product_id == product_id)).scalar_one()
+    assert snapshot.quantity == 70
+
+    # Avant l'instantané: mouvements depuis le début du journal
+    assert stock_at(db, product_id, created) == {
+        "quantity_in_stock": 100, "snapshot_at": None, "movements": 1}
+    assert stock_at(db, product_id, at_80)["quantity_in_stock"] == 80
+    assert stock_at(db, product_id, at_70)["quantity_in_stock"] == 70
+    # Après: l'instantané plus les seuls mouvements qui le suivent
+    assert stock_at(db, product_id, at_snapshot) == {
+        "quantity_in_stock": 70, "snapshot_at": snapshot.taken_at, "movements": 0}
+    assert stock_at(db, product_id, at_75) == {
+        "quantity_in_stock": 75, "snapshot_at": snapshot.taken_at, "movements": 1}
+    assert stock_at(db, product_id, at_60) == {
+        "quantity_in_stock": 60, "snapshot_at": snapshot.taken_at, "movements": 2}
+
+
+def test_stock_at_before_the_ledger_starts_is_unknown(api, db, admin_headers, products):
+    product_id = products[0].id
+    # Produit antérieur au journal: état initial repris par la migration (movement_id = 0)
+    db.execute(text("DELETE FROM stock_movements WHERE product_id = :id"), {"id": product_id})
+    started = datetime.now(timezone.utc)
+    db.add(StockSnapshot(product_id=product_id, taken_at=started, quantity=100, movement_id=0))
+    db.commit()
+    after = _set_stock(db, product_id, 99)
+
+    assert stock_at(db, product_id, started - timedelta(seconds=1)) is None
+    assert stock_at(db, product_id, after)["quantity_in_stock"] == 99
+    response = api.get(f"/product/{product_id}/stock/at",
+                       params={"at": (started - timedelta(days=1)).isoformat().replace("+00:00", "Z")},
+                       headers=admin_headers)
+    assert response.status_code == 404
+
+
+def test_compaction_waits_for_stock_writes_in_progress(db, products):
+    product_id = products[0].id
+
+    def compact():
+        with SessionLocal() as session:
+            return compact_stock_snapshots(session, min_movements=1)
+
+    with SessionLocal() as writer, ThreadPoolExecutor(max_workers=1) as pool:
+        writer.execute(text("UPDATE products SET quantity_in_stock = 42 WHERE id = :id"),
+                       {"id": product_id})
+        future = pool.submit(compact)
+        # FOR SHARE: le lot attend la fin de la transaction qui écrit le stock
+        with pytest.raises(TimeoutError):
+            future.result(timeout=0.5)
+        writer.commit()
+        assert future.result(timeout=5) == len(products)
+
+    snapshot = db.execute(
+        select(StockSnapshot).where(StockSnapshot.product_id == product_id)).scalar_one()
+    last_movement = db.execute(
+        select(StockMovement.id).where(StockMovement.product_id == product_id)
+        .order_by(StockMovement.id.desc()).limit(1)).scalar_one()
+    assert (snapshot.quantity, snapshot.movement_id) == (42, last_movement)
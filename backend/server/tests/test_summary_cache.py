@@ -0,0 +1,45 @@
+"""Résumés admin en cache, invalidés au commit (utils/cache.py)"""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from routers import bill as bill_router
+
+
+def test_commit_during_load_is_not_cached(monkeypatch, api, admin_headers, make_bill):
+    loaded = threading.Event()
+    release = threading.Event()
+    bill_summary = bill_router._bill_summary
+
+    def slow_summary(db):
+        summary = bill_summary(db)
+        loaded.set()
+        release.wait(5)
+        return summary
+
+    monkeypatch.setattr(bill_router, "_bill_summary", slow_summary)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        # Clé vide: rien à invalider au commit, seul le chargement en cours en dépend
+        future = pool.submit(api.get, "/bill/summary", headers=admin_headers)
+        assert loaded.wait(5)
+        make_bill(1)
+        release.set()
+        stale = future.result(timeout=5)
+
+    assert stale.json()["total_bills"] == 0
+    monkeypatch.setattr(bill_router, "_bill_summary", bill_summary)
+    assert api.get("/bill/summary", headers=admin_headers).json()["total_bills"] == 1
+
+
+def test_summary_is_cached_until_commit(monkeypatch, api, admin_headers, make_bill):
+    calls = []
+    bill_summary = bill_router._bill_summary
+    monkeypatch.setattr(bill_router, "_bill_summary",
+                        lambda db: calls.append(1) or bill_summary(db))
+
+    api.get("/bill/summary", headers=admin_headers)
+    api.get("/bill/summary", headers=admin_headers)
+    assert len(calls) == 1
+
+    make_bill(1)
+    assert api.get("/bill/summary", headers=admin_headers).json()["total_bills"] == 1
+    assert len(calls) == 2
@@ -4,7 +4,8 @@ from .auth import (
     create_access_token,
     get_current_admin,
     get_current_client,
-    get_current_user
+    get_current_user,
+    invalidate_principal
 )
 
 from .stock_manager import (
@@ -28,6 +29,7 @@ __all__ = [
     "get_current_admin",
     "get_current_client",
     "get_current_user",
+    "invalidate_principal",
     
     # Stock manager utilities
     "check_and_create_stock_alert",
@@ -1,13 +1,18 @@
 import os
+import select
+import threading
 import bcrypt
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
 from models.admin import Admin
 from models.client import Client
-from utils.db import get_db
+from utils.db import engine, get_db
+from utils.cache import TTLCache
+from utils.password_pool import password_pool
 import hashlib
 
 # Configuration de sécurité
@@ -18,9 +23,25 @@ ALGORITHM = "HS256"
 
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 20  # 24 heures
 
+# Coût bcrypt (2^rounds itérations) ; les anciens hachages sont mis à jour à la connexion
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
 # OAuth2 scheme pour l'extraction du token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Cache des utilisateurs authentifiés, clé (type, id)
+# Utilisé seulement pendant l'écoute du canal principal_changes : une
+# modification (désactivation, suppression...) faite par n'importe quel
+# processus l'invalide au commit. Sans écoute, chaque requête lit la base.
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_ENABLED = AUTH_CACHE_TTL > 0
+PRINCIPAL_MODELS = {"admin": Admin, "client": Client}
+PRINCIPAL_CHANNEL = "principal_changes"
+PRINCIPAL_TABLES = {"admins": "admin", "clients": "client"}
+RECONNECT_DELAY = 5  # secondes
+principal_cache = TTLCache(ttl=AUTH_CACHE_TTL)
+_principal_listening = threading.Event()
+
 
 def hash_password(password: str) -> str:
     """
@@ -33,7 +54,7 @@ def hash_password(password: str) -> str:
 
     # Hacher avec bcrypt
     password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
 
     return hashed.decode('utf-8')
@@ -55,6 +76,25 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(password_bytes, hashed_bytes)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Vrai si le hachage n'utilise pas le coût BCRYPT_ROUNDS configuré"""
+    try:
+        # Format bcrypt: $2b$12$<sel et hachage>
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password exécuté dans le pool bcrypt (routes async)"""
+    return await password_pool.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password exécuté dans le pool bcrypt (routes async)"""
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     """Créer un token JWT"""
     to_encode = data.copy()
@@ -70,6 +110,119 @@ def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     return encoded_jwt
 
 
+def _principal_state(db: Session, user_type: str, user_id: int):
+    """Colonnes de l'utilisateur lues en base (None s'il n'existe pas)"""
+    user = db.get(PRINCIPAL_MODELS[user_type], user_id)
+    if user is None:
+        return None
+    return {attr.key: getattr(user, attr.key) for attr in inspect(user).mapper.column_attrs}
+
+
+def load_principal(db: Session, user_type: str, user_id: int):
+    """
+    Charger l'utilisateur d'un token, depuis le cache si possible
+
+    L'instance renvoyée est attachée à la session de la requête sans SELECT
+    (merge avec load=False) : les routes peuvent la modifier et la committer.
+
+    Args:
+        db: Session de base de données
+        user_type: "admin" ou "client"
+        user_id: ID de l'utilisateur
+
+    Returns:
+        Admin ou Client, None si l'utilisateur n'existe pas
+    """
+
+    if _principal_listening.is_set():
+        state = principal_cache.get_or_set(
+            (user_type, user_id),
+            lambda: _principal_state(db, user_type, user_id)
+        )
+    else:
+        state = _principal_state(db, user_type, user_id)
+    if state is None:
+        return None
+
+    user = PRINCIPAL_MODELS[user_type](**state)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
+def invalidate_principal(user_type: str, user_id: int):
+    """Retirer un utilisateur du cache (à appeler après le commit qui le modifie)"""
+    principal_cache.invalidate((user_type, user_id))
+
+
+def _apply_principal_changes(payloads: list):
+    """Invalider les utilisateurs notifiés (« table:id,id » ou « table:* »)"""
+
+    for payload in payloads:
+        table, _, ids = payload.partition(":")
+        user_type = PRINCIPAL_TABLES.get(table)
+        if user_type is None or ids == "*":
+            principal_cache.invalidate()
+            return
+        for user_id in ids.split(","):
+            principal_cache.invalidate((user_type, int(user_id)))
+
+
+def run_principal_listener(stop_event: threading.Event):
+    """
+    Boucle d'écoute du canal principal_changes (triggers sur admins et clients)
+
+    Le cache n'est utilisé que pendant l'écoute ; il est vidé à chaque
+    (re)connexion, les notifications manquées entre-temps étant perdues.
+
+    Args:
+        stop_event: Événement qui arrête la boucle
+    """
+
+    while not stop_event.is_set():
+        conn = None
+        try:
+            # Connexion dédiée, hors du pool
+            cargs, cparams = engine.dialect.create_connect_args(engine.url)
+            conn = engine.dialect.dbapi.connect(*cargs, **cparams)
+            conn.autocommit = True
+            conn.cursor().execute(f"LISTEN {PRINCIPAL_CHANNEL}")
+
+            principal_cache.invalidate()
+            _principal_listening.set()
+
+            while not stop_event.is_set():
+                if not select.select([conn], [], [], 1.0)[0]:
+                    continue
+                conn.poll()
+                payloads = [notify.payload for notify in conn.notifies]
+                conn.notifies.clear()
+                _apply_principal_changes(payloads)
+        except Exception as e:
+            _principal_listening.clear()
+            print(f"❌ Erreur de l'écoute du cache des utilisateurs: {str(e)}")
+            stop_event.wait(RECONNECT_DELAY)
+        finally:
+            _principal_listening.clear()
+            principal_cache.invalidate()
+            if conn is not None and not conn.closed:
+                conn.close()
+
+
+def start_principal_listener_thread() -> tuple:
+    """Démarrer l'écoute du cache des utilisateurs dans un thread (retourne le thread et son stop_event)"""
+
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=run_principal_listener,
+        args=(stop_event,),
+        name="principal-cache-listener",
+        daemon=True
+    )
+    thread.start()
+
+    return thread, stop_event
+
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     """Obtenir l'utilisateur actuel (admin ou client) à partir du token"""
 
@@ -91,13 +244,11 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         raise credentials_exception
 
     # Récupérer l'utilisateur en fonction du type
-    if user_type == "admin":
-        user = db.query(Admin).filter(Admin.id == int(user_id)).first()
-    elif user_type == "client":
-        user = db.query(Client).filter(Client.id == int(user_id)).first()
-    else:
+    if user_type not in PRINCIPAL_MODELS:
         raise credentials_exception
 
+    user = load_principal(db, user_type, int(user_id))
+
     if user is None:
         raise credentials_exception
 
@@ -132,7 +283,7 @@ def get_current_admin(token: str = Depends(oauth2_scheme), db: Session = Depends
     except JWTError:
         raise credentials_exception
 
-    admin = db.query(Admin).filter(Admin.id == int(user_id)).first()
+    admin = load_principal(db, "admin", int(user_id))
 
     if admin is None:
         raise credentials_exception
@@ -168,7 +319,7 @@ def get_current_client(token: str = Depends(oauth2_scheme), db: Session = Depend
     except JWTError:
         raise credentials_exception
 
-    client = db.query(Client).filter(Client.id == int(user_id)).first()
+    client = load_principal(db, "client", int(user_id))
 
     if client is None:
         raise credentials_exception
@@ -0,0 +1,200 @@
+from collections import OrderedDict
+from decimal import Decimal
+from fastapi import HTTPException, status
+from sqlalchemy import Integer, column, update, values
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from models.bill import Bill
+from models.bill_item import BillItem
+from models.client import Client
+from models.product import Product
+from utils.bill_numbering import allocate_bill_number
+from utils.sales_stats import record_bill_stats
+from utils.stock_ledger import set_stock_movement_context
+from utils.stock_reservations import client_reservations, release_cart_items, release_expired_holds
+from utils.stock_manager import check_and_create_stock_alerts
+from utils.notification_manager import create_bill_notification
+
+def aggregate_quantities(items: list) -> "OrderedDict[int, int]":
+    """
+    Regrouper les quantités demandées par produit
+
+    Args:
+        items: Articles de la commande (product_id, quantity)
+
+    Returns:
+        OrderedDict product_id -> quantité totale, dans l'ordre de la commande
+    """
+
+    quantities = OrderedDict()
+    for item in items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    return quantities
+
+def lock_products(db: Session, product_ids) -> dict:
+    """
+    Charger et verrouiller (SELECT ... FOR UPDATE) tous les produits d'une commande
+
+    Une seule requête WHERE id IN (...). Les lignes sont verrouillées dans l'ordre
+    des IDs pour que deux commandes concurrentes ne puissent pas s'interbloquer.
+
+    Args:
+        db: Session de base de données
+        product_ids: IDs des produits
+
+    Returns:
+        dict product_id -> Product
+    """
+
+    products = db.query(Product).filter(
+        Product.id.in_(product_ids)
+    ).order_by(Product.id).with_for_update().all()
+
+    return {product.id: product for product in products}
+
+def decrement_stock(db: Session, quantities: dict) -> int:
+    """
+    Décrémenter le stock de plusieurs produits avec une seule instruction
+
+    UPDATE products SET quantity_in_stock = quantity_in_stock - v.qty
+    FROM (VALUES ...) AS v(id, qty)
+    WHERE products.id = v.id AND products.quantity_in_stock >= v.qty
+
+    Args:
+        db: Session de base de données
+        quantities: dict product_id -> quantité à retirer
+
+    Returns:
+        Nombre de produits mis à jour
+    """
+
+    rows = values(
+        column("id", Integer), column("qty", Integer), name="v"
+    ).data(sorted(quantities.items()))
+
+    stmt = update(Product).where(
+        Product.id == rows.c.id,
+        Product.quantity_in_stock >= rows.c.qty
+    ).values(
+        quantity_in_stock=Product.quantity_in_stock - rows.c.qty
+    ).execution_options(synchronize_session=False)
+
+    return db.execute(stmt).rowcount
+
+def create_bill_with_items(db: Session, client: Client, items: list) -> Bill:
+    """
+    Créer une facture et ses articles en un nombre fixe d'allers-retours
+
+    Les produits sont chargés et verrouillés en une requête, les articles insérés
+    en un seul lot, le stock décrémenté en une seule instruction et les alertes de
+    stock vérifiées en groupe. Les réservations expirées des produits sont
+    libérées, puis celles du panier du client sont converties en vente : une ligne couverte par sa réservation n'est pas
+    revérifiée, les autres ne peuvent pas prendre le stock réservé par d'autres
+    clients. La transaction n'est pas validée : l'appelant fait un seul commit.
+
+    Args:
+        db: Session de base de données
+        client: Client qui passe la commande
+        items: Articles de la commande (product_id, quantity)
+
+    Returns:
+        Facture créée (avec bill_items chargés)
+    """
+
+    quantities = aggregate_quantities(items)
+    products = lock_products(db, list(quantities.keys()))
+
+    # Réservations expirées non encore balayées (du client comprises): libérées, jamais comptées
+    for product_id, expired in release_expired_holds(db, list(products)).items():
+        product = products[product_id]
+        set_committed_value(product, "quantity_reserved", product.quantity_reserved - expired)
+
+    reserved = client_reservations(db, client.id, list(quantities.keys()))
+
+    # Vérifier les produits dans l'ordre de la commande
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
+        if not product:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Produit avec ID {product_id} non trouvé"
+            )
+
+        if not product.is_active:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Le produit '{product.name}' n'est pas disponible"
+            )
+
+        # Stock disponible pour ce client: sa réservation comprise, pas celles des
+        # autres (une ligne couverte par sa réservation passe toujours)
+        available = product.quantity_in_stock - product.quantity_reserved + reserved.get(product_id, 0)
+        if quantity > available:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Stock insuffisant pour le produit '{product.name}'. Stock disponible: {max(available, 0)}"
+            )
+
+    # Générer un numéro de facture unique
+    bill_number = allocate_bill_number(db)
+
+    # Un article de facture par ligne de commande
+    bill_items = []
+    total_amount = Decimal('0.00')
+    for item in items:
+        product = products[item.product_id]
+        subtotal = product.price * item.quantity
+        total_amount += subtotal
+        bill_items.append(BillItem(
+            product_id=product.id,
+            product_name=product.name,
+            unit_price=product.price,
+            quantity=item.quantity,
+            subtotal=subtotal
+        ))
+
+    new_bill = Bill(
+        client_id=client.id,
+        bill_number=bill_number,
+        total_amount=total_amount,
+        total_paid=Decimal('0.00'),
+        total_remaining=total_amount,
+        status="not paid",
+        bill_items=bill_items
+    )
+    db.add(new_bill)
+    db.flush()
+
+    # Mettre à jour les statistiques journalières
+    record_bill_stats(db, new_bill)
+
+    # Décrémenter le stock (les lignes sont déjà verrouillées)
+    set_stock_movement_context(db, "sale", bill_id=new_bill.id)
+    if decrement_stock(db, quantities) != len(quantities):
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Le stock a changé pendant la commande, veuillez réessayer"
+        )
+
+    for product_id, quantity in quantities.items():
+        product = products[product_id]
+        set_committed_value(product, "quantity_in_stock", product.quantity_in_stock - quantity)
+
+    # Libérer les réservations converties (produits déjà verrouillés)
+    if reserved:
+        release_cart_items(db, client.id, list(reserved))
+        for product_id, held in reserved.items():
+            product = products[product_id]
+            set_committed_value(product, "quantity_reserved", product.quantity_reserved - held)
+
+    # Vérifier et créer les alertes de stock si nécessaire
+    check_and_create_stock_alerts(db, list(products.values()))
+
+    # Créer les notifications pour l'admin et le client
+    create_bill_notification(db, new_bill, client, commit=False)
+
+    return new_bill
@@ -0,0 +1,86 @@
+"""
+Attribution des numéros de facture (BILL-YYYYMMDD-NNNN)
+
+Chaque jour a sa ligne dans bill_number_counters : un numéro s'obtient avec un seul
+INSERT ... ON CONFLICT DO UPDATE ... RETURNING, sans compter les factures.
+
+- Par défaut (BILL_NUMBER_BLOCK_SIZE=1) le compteur est incrémenté dans la
+  transaction de la facture : un rollback rend le numéro, la série reste sans trou.
+- Avec BILL_NUMBER_BLOCK_SIZE > 1 chaque processus réserve un bloc de numéros dans
+  sa propre transaction. Moins de contention, mais les numéros non utilisés d'un
+  bloc (redémarrage, rollback) laissent des trous.
+"""
+import os
+import threading
+from datetime import date, datetime
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from models.bill_number_counter import BillNumberCounter
+from utils.db import engine
+
+BILL_NUMBER_PREFIX = "BILL"
+BILL_NUMBER_BLOCK_SIZE = max(1, int(os.getenv("BILL_NUMBER_BLOCK_SIZE", "1")))
+
+
+def format_bill_number(day: date, value: int) -> str:
+    """Formater un numéro de facture: BILL-20240131-0042"""
+    return f"{BILL_NUMBER_PREFIX}-{day.strftime('%Y%m%d')}-{value:04d}"
+
+
+def _reserve_statement(day: date, count: int):
+    """INSERT ... ON CONFLICT (day) DO UPDATE qui retourne le dernier numéro réservé"""
+    stmt = insert(BillNumberCounter).values(day=day, last_value=count)
+    return stmt.on_conflict_do_update(
+        index_elements=[BillNumberCounter.day],
+        set_={"last_value": BillNumberCounter.last_value + count}
+    ).returning(BillNumberCounter.last_value)
+
+
+class _BlockAllocator:
+    """Blocs de numéros réservés par processus (un bloc courant par jour)"""
+
+    def __init__(self, block_size: int):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._day = None
+        self._next = 0
+        self._last = -1
+
+    def next_value(self, day: date) -> int:
+        with self._lock:
+            if self._day != day or self._next > self._last:
+                # Réserver un nouveau bloc dans une transaction séparée et courte
+                with engine.begin() as conn:
+                    last = conn.execute(_reserve_statement(day, self.block_size)).scalar_one()
+                self._day = day
+                self._next = last - self.block_size + 1
+                self._last = last
+
+            value = self._next
+            self._next += 1
+            return value
+
+
+_block_allocator = _BlockAllocator(BILL_NUMBER_BLOCK_SIZE)
+
+
+def allocate_bill_number(db: Session) -> str:
+    """
+    Obtenir le prochain numéro de facture du jour
+
+    Args:
+        db: Session de base de données (transaction de la facture)
+
+    Returns:
+        Numéro de facture unique
+    """
+
+    day = datetime.now().date()
+
+    if BILL_NUMBER_BLOCK_SIZE > 1:
+        value = _block_allocator.next_value(day)
+    else:
+        # Le verrou de ligne est tenu jusqu'au commit de la facture
+        value = db.execute(_reserve_statement(day, 1)).scalar_one()
+
+    return format_bill_number(day, value)
@@ -0,0 +1,268 @@
+"""
+Mises à jour des montants payés des factures
+
+Verrouillage optimiste (colonne Bill.version) :
+- apply_bill_payment ajoute un montant en un seul UPDATE atomique
+  (SET total_paid = total_paid + :montant ... WHERE id = :id AND version = :lue)
+  et lève BillConflict si une autre transaction a modifié la facture depuis
+  sa lecture
+- les routes décorées par @retry_on_bill_conflict sont alors rejouées
+  (rollback puis nouvel essai, BILL_CONFLICT_RETRIES fois au plus) : aucune
+  mise à jour n'est perdue et aucun verrou n'est tenu pendant la route
+
+Paiements répartis sur plusieurs factures d'un client (virement groupé) :
+- les factures ouvertes concernées sont verrouillées en une requête
+  (SELECT ... FOR UPDATE), dans l'ordre de création
+- le montant est réparti de la plus ancienne à la plus récente (FIFO), ou
+  selon une liste explicite facture / montant
+- les paiements sont insérés en une requête, les factures mises à jour en un
+  seul UPDATE ... FROM (VALUES ...) et les statistiques journalières en un
+  seul INSERT ... ON CONFLICT, dans la transaction de la route
+"""
+import functools
+import os
+import random
+import time
+from decimal import Decimal
+from typing import List, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import Integer, Numeric, case, column, func, insert, select, update, values
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
+from models.bill import Bill
+from models.payment import Payment
+from utils.sales_stats import record_bills_stats
+
+BILL_CONFLICT_RETRIES = max(1, int(os.getenv("BILL_CONFLICT_RETRIES", "10")))
+BILL_CONFLICT_BACKOFF_BASE = 0.01  # secondes
+BILL_CONFLICT_BACKOFF_MAX = 0.5
+
+
+class BillConflict(Exception):
+    """La facture a été modifiée par une autre transaction depuis sa lecture"""
+
+
+def apply_bill_payment(db: Session, bill: Bill, amount: Decimal):
+    """
+    Ajouter un montant payé à une facture (négatif pour l'annuler), sans commit
+
+    Args:
+        db: Session de base de données
+        bill: Facture lue dans la transaction (sa version sert de garde)
+        amount: Montant à ajouter à total_paid (et à retirer de total_remaining)
+
+    Raises:
+        BillConflict: la facture a changé depuis sa lecture
+    """
+
+    new_remaining = Bill.total_remaining - amount
+
+    row = db.execute(
+        update(Bill).where(Bill.id == bill.id, Bill.version == bill.version).values(
+            total_paid=Bill.total_paid + amount,
+            total_remaining=new_remaining,
+            status=case((new_remaining <= 0, "paid"), else_="not paid"),
+            updated_at=func.now(),
+            version=Bill.version + 1
+        ).returning(
+            Bill.total_paid, Bill.total_remaining, Bill.status, Bill.updated_at, Bill.version
+        ),
+        execution_options={"synchronize_session": False}
+    ).first()
+
+    if row is None:
+        raise BillConflict(bill.id)
+
+    # Aligner l'objet de la session sur la ligne mise à jour (sans nouvelle lecture)
+    for key, value in row._asdict().items():
+        set_committed_value(bill, key, value)
+
+
+def retry_on_bill_conflict(route):
+    """
+    Rejouer une route (paramètre db) quand une facture a été modifiée simultanément
+
+    Après BILL_CONFLICT_RETRIES essais la route répond 409.
+    """
+
+    @functools.wraps(route)
+    def wrapper(*args, **kwargs):
+        db = kwargs["db"]
+        for attempt in range(BILL_CONFLICT_RETRIES):
+            try:
+                return route(*args, **kwargs)
+            except (BillConflict, StaleDataError):
+                db.rollback()
+                # Backoff exponentiel aléatoire pour désynchroniser les requêtes concurrentes
+                time.sleep(random.uniform(0, min(
+                    BILL_CONFLICT_BACKOFF_MAX, BILL_CONFLICT_BACKOFF_BASE * 2 ** attempt)))
+
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="La facture a été modifiée simultanément, veuillez réessayer"
+        )
+
+    return wrapper
+
+
+OPEN_BILL_COLUMNS = (
+    Bill.id,
+    Bill.bill_number,
+    Bill.total_amount,
+    Bill.total_paid,
+    Bill.total_remaining,
+    Bill.status,
+    Bill.created_at,
+)
+
+
+def allocate_fifo(open_bills: list, amount: Decimal) -> List[Tuple[int, Decimal]]:
+    """
+    Répartir un montant sur des factures, de la plus ancienne à la plus récente
+
+    Args:
+        open_bills: Factures ouvertes triées par ancienneté (id, total_remaining)
+        amount: Montant à répartir
+
+    Returns:
+        Liste de couples (bill_id, montant)
+    """
+
+    allocations = []
+    left = amount
+
+    for bill in open_bills:
+        if left <= 0:
+            break
+        part = min(left, bill.total_remaining)
+        if part > 0:
+            allocations.append((bill.id, part))
+            left -= part
+
+    return allocations
+
+
+def lock_open_bills(db: Session, client_id: int, bill_ids: list = None) -> list:
+    """
+    Verrouiller les factures ouvertes d'un client, les plus anciennes d'abord
+
+    Args:
+        db: Session de base de données
+        client_id: ID du client
+        bill_ids: Limiter aux factures listées (optionnel)
+
+    Returns:
+        Lignes OPEN_BILL_COLUMNS
+    """
+
+    stmt = select(*OPEN_BILL_COLUMNS).where(
+        Bill.client_id == client_id,
+        Bill.status == "not paid",
+        Bill.total_remaining > 0
+    )
+    if bill_ids is not None:
+        stmt = stmt.where(Bill.id.in_(bill_ids))
+
+    return db.execute(
+        stmt.order_by(Bill.created_at, Bill.id).with_for_update()
+    ).all()
+
+
+def apply_bulk_payment(
+    db: Session,
+    admin_id: int,
+    client_id: int,
+    allocations: list,
+    payment_fields: dict,
+    amount: Decimal = None
+) -> dict:
+    """
+    Enregistrer un virement réparti sur plusieurs factures (sans commit)
+
+    Args:
+        db: Session de base de données
+        admin_id: ID de l'admin qui enregistre le paiement
+        client_id: ID du client
+        allocations: Couples (bill_id, montant) explicites, ou None pour FIFO
+        payment_fields: payment_method, notes, payment_date
+        amount: Montant à répartir en FIFO (si allocations est None)
+
+    Returns:
+        dict avec total_paid, payments (objets Payment) et bills (lignes mises à jour)
+    """
+
+    if allocations is None:
+        open_bills = lock_open_bills(db, client_id)
+        debt = sum((bill.total_remaining for bill in open_bills), Decimal('0.00'))
+        if not open_bills:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Le client n'a aucune facture impayée"
+            )
+        if amount > debt:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Le montant du paiement ({amount}) dépasse la dette du client ({debt})"
+            )
+        allocations = allocate_fifo(open_bills, amount)
+    else:
+        open_bills = lock_open_bills(db, client_id, [bill_id for bill_id, _ in allocations])
+        remaining = {bill.id: bill.total_remaining for bill in open_bills}
+        for bill_id, part in allocations:
+            if bill_id not in remaining:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Facture impayée {bill_id} non trouvée pour ce client"
+                )
+            if part > remaining[bill_id]:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Le montant du paiement ({part}) dépasse le montant restant ({remaining[bill_id]}) de la facture {bill_id}"
+                )
+
+    payments = db.scalars(insert(Payment).returning(Payment), [
+        {
+            "bill_id": bill_id,
+            "admin_id": admin_id,
+            "amount_paid": part,
+            **payment_fields
+        }
+        for bill_id, part in allocations
+    ]).all()
+
+    paid = values(
+        column("bill_id", Integer), column("amount", Numeric(10, 2)), name="paid"
+    ).data(allocations)
+    new_remaining = Bill.total_remaining - paid.c.amount
+
+    updated = db.execute(
+        update(Bill).where(Bill.id == paid.c.bill_id).values(
+            total_paid=Bill.total_paid + paid.c.amount,
+            total_remaining=new_remaining,
+            status=case((new_remaining <= 0, "paid"), else_="not paid"),
+            updated_at=func.now(),
+            version=Bill.version + 1
+        ).returning(
+            Bill.id,
+            Bill.bill_number,
+            Bill.client_id,
+            Bill.total_amount,
+            Bill.total_paid,
+            Bill.total_remaining,
+            Bill.status,
+            Bill.created_at,
+            Bill.updated_at,
+            Bill.notification_sent
+        ),
+        execution_options={"synchronize_session": False}
+    ).all()
+
+    before = {bill.id: bill for bill in open_bills}
+    record_bills_stats(db, [(before[bill.id], bill) for bill in updated])
+
+    return {
+        "total_paid": sum((part for _, part in allocations), Decimal('0.00')),
+        "payments": payments,
+        "bills": sorted(updated, key=lambda bill: (bill.created_at, bill.id)),
+    }
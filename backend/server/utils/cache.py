@@ -0,0 +1,161 @@
+"""
+Cache en mémoire (par processus) avec durée de vie, invalidé au commit
+
+Les sessions SQLAlchemy notent les tables modifiées (flush ORM et instructions
+INSERT/UPDATE/DELETE passées par session.execute, mark_tables_written pour
+COPY et SQL brut). Après un commit réussi, les écouteurs enregistrés avec
+on_tables_committed reçoivent ces tables ; chaque TTLCache invalide alors les
+entrées qui dépendent de l'une d'elles.
+"""
+import os
+import threading
+import time
+from typing import Callable, Iterable
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+SUMMARY_CACHE_TTL = float(os.getenv("SUMMARY_CACHE_TTL", "30"))
+
+_WRITTEN_TABLES = "written_tables"
+_commit_listeners = []
+
+
+def on_tables_committed(callback: Callable):
+    """Enregistrer callback(tables: set) appelé après chaque commit qui écrit des tables"""
+    _commit_listeners.append(callback)
+    return callback
+
+
+def mark_tables_written(session: Session, tables: Iterable[str]):
+    """Noter des tables écrites hors ORM (COPY, SQL brut) pour les écouteurs du commit"""
+    session.info.setdefault(_WRITTEN_TABLES, set()).update(tables)
+
+
+def written_tables(session: Session) -> set:
+    """Tables écrites par la transaction en cours (jusqu'au dernier flush)"""
+    return session.info.get(_WRITTEN_TABLES, set())
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    tables = {
+        obj.__table__.name
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if hasattr(obj, "__table__")
+    }
+    if tables:
+        mark_tables_written(session, tables)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_statement(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            mark_tables_written(orm_execute_state.session, [table.name])
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_commit(session):
+    tables = session.info.pop(_WRITTEN_TABLES, None)
+    if not tables:
+        return
+    for callback in _commit_listeners:
+        try:
+            callback(tables)
+        except Exception as e:
+            print(f"Erreur lors de l'invalidation du cache: {str(e)}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop(_WRITTEN_TABLES, None)
+
+
+class TTLCache:
+    """Cache clé -> valeur avec expiration, thread-safe"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}      # clé -> (expiration, valeur)
+        self._tables = {}       # clé -> tables dont dépend la valeur
+        self._loading = {}      # chargement en cours -> tables dont il dépend
+        self._generation = 0    # incrémenté à chaque invalidation
+        on_tables_committed(self.invalidate_tables)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+            return default
+
+    def set(self, key, value, tables: Iterable[str] = ()):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._tables[key] = frozenset(tables)
+
+    def get_or_set(self, key, loader: Callable, tables: Iterable[str] = ()):
+        """
+        Lire la valeur en cache ou la calculer avec loader()
+
+        Args:
+            key: Clé du cache
+            loader: Fonction qui calcule la valeur
+            tables: Tables dont une écriture invalide la valeur
+
+        Returns:
+            Valeur en cache ou nouvellement calculée
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+            generation = self._generation
+            # Déclaré avant la lecture: un commit sur ses tables pendant le
+            # chargement l'empêche d'être stocké, même si la clé est vide
+            load = object()
+            self._loading[load] = frozenset(tables)
+
+        try:
+            value = loader()
+        finally:
+            with self._lock:
+                del self._loading[load]
+
+        with self._lock:
+            # Ne pas stocker une valeur calculée pendant une invalidation
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._tables[key] = frozenset(tables)
+
+        return value
+
+    def invalidate(self, key=None):
+        """Invalider une clé (ou tout le cache si key est None)"""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+                self._tables.clear()
+            else:
+                self._entries.pop(key, None)
+                self._tables.pop(key, None)
+
+    def invalidate_tables(self, tables: set):
+        """Invalider les entrées (et chargements en cours) qui dépendent d'une des tables modifiées"""
+        with self._lock:
+            stale = [key for key, deps in self._tables.items() if deps & tables]
+            loading = any(deps & tables for deps in self._loading.values())
+            if not stale and not loading:
+                return
+            self._generation += 1
+            for key in stale:
+                self._entries.pop(key, None)
+                self._tables.pop(key, None)
+
+
+# Résumés des tableaux de bord admin
+summary_cache = TTLCache(ttl=SUMMARY_CACHE_TTL)
@@ -0,0 +1,337 @@
+"""
+Instantané du catalogue en mémoire (par processus) pour les routes publiques
+
+GET /product/ et GET /product/{id} sont servis sans requête PostgreSQL :
+- chaque produit est gardé déjà encodé en JSON (bytes), indexé par id
+- des vues triées par (created_at, id) existent pour chaque combinaison de
+  filtres (catégorie, is_active) : une page (curseur ou skip/limit) est une
+  bisection puis la concaténation des produits de la page
+
+Mise à jour incrémentale, par LISTEN/NOTIFY :
+- des triggers (par instruction, tables de transition) sur products et
+  categories envoient les ids modifiés sur le canal catalog_changes ; NOTIFY
+  n'est délivré qu'au commit, quel que soit l'auteur (routes, SQL direct, COPY)
+- un thread par processus écoute le canal et relit uniquement les produits
+  concernés (ou recharge tout pour « * », écritures massives)
+- lecture de ses propres écritures : une transaction qui modifie le catalogue
+  envoie, juste avant son commit et sur sa propre connexion, un marqueur sync
+  (délivré après ses notifications) ; tant que le thread ne l'a pas reçu, les
+  routes lisent PostgreSQL
+
+Si l'écoute est interrompue, l'instantané est désactivé (routes sur PostgreSQL)
+jusqu'à la reconnexion, suivie d'un rechargement complet.
+
+Exécution: CATALOG_SNAPSHOT_ENABLED=true (défaut), thread démarré par lifespan
+"""
+import os
+import select
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from models.category import Category
+from models.product import Product
+from utils.cache import written_tables
+from utils.db import SessionLocal, engine
+from utils.pagination import decode_cursor, encode_cursor
+from utils.responses import dumps
+
+CATALOG_SNAPSHOT_ENABLED = os.getenv("CATALOG_SNAPSHOT_ENABLED", "true").lower() == "true"
+CATALOG_CHANNEL = "catalog_changes"
+CATALOG_TABLES = {"products", "categories"}
+RECONNECT_DELAY = 5  # secondes
+FETCH_CHUNK = 1000
+
+# Colonnes des réponses produit (liste, détail, recherche, instantané)
+PRODUCT_LIST_COLUMNS = (
+    Product.sku,
+    Product.name,
+    Product.description,
+    Product.price,
+    Product.quantity_in_stock,
+    Product.minimum_stock_level,
+    Product.image_urls,
+    Product.category_id,
+    Product.is_active,
+    Product.id,
+    Product.admin_id,
+    Product.created_at,
+    Product.updated_at,
+)
+
+_OLDEST = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def _product_rows(db, *conditions) -> Iterable:
+    query = db.query(*PRODUCT_LIST_COLUMNS, Category.name.label("category_name")).join(
+        Category, Product.category_id == Category.id)
+    return query.filter(*conditions).yield_per(FETCH_CHUNK)
+
+
+def _view_keys(category_id: int, is_active: bool) -> tuple:
+    """Vues (catégorie, is_active) contenant un produit, None = sans filtre"""
+    return ((None, None), (None, is_active), (category_id, None), (category_id, is_active))
+
+
+class CatalogSnapshot:
+    """Produits encodés et vues triées, protégés par un verrou"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._products = {}  # id -> (clé de tri, category_id, is_active, JSON)
+        self._views = {}     # (category_id, is_active) -> clés (created_at, id) croissantes
+        self._ready = False
+        self._sync_issued = 0      # dernier marqueur attribué
+        self._sync_floor = 0       # marqueurs <= floor: couverts par le dernier rechargement
+        self._sync_pending = set() # commités, pas encore reçus
+        self._sync_arrived = set() # reçus avant la fin du commit
+
+    # --- Lecture (routes) ---
+
+    def is_current(self) -> bool:
+        """L'instantané est chargé, écouté et contient les écritures de ce processus"""
+        return self._ready and not self._sync_pending
+
+    def get_product(self, product_id: int) -> Optional[bytes]:
+        """JSON d'un produit, None s'il n'existe pas"""
+        entry = self._products.get(product_id)
+        return entry[3] if entry else None
+
+    def list_products(
+        self,
+        category_id: Optional[int],
+        is_active: Optional[bool],
+        cursor: Optional[str],
+        skip: int,
+        limit: int
+    ) -> Tuple[bytes, Optional[str]]:
+        """
+        Page de produits triés par (created_at, id) décroissant, comme CursorPage
+
+        Returns:
+            (tableau JSON de la page, curseur de la page suivante ou None)
+        """
+
+        after = decode_cursor(cursor) if cursor else None
+
+        with self._lock:
+            keys = self._views.get((category_id, is_active), ())
+            end = bisect_left(keys, after) if after else len(keys) - skip
+            # Une clé de plus pour savoir s'il existe une page suivante
+            page = keys[max(0, end - limit - 1):max(0, end)][::-1]
+            bodies = [self._products[row_id][3] for _, row_id in page[:limit]]
+
+        next_cursor = encode_cursor(*page[limit - 1]) if len(page) > limit else None
+
+        return b"[" + b",".join(bodies) + b"]", next_cursor
+
+    # --- Écriture (thread d'écoute) ---
+
+    def _entry(self, row) -> tuple:
+        record = row._asdict()
+        key = (record["created_at"] or _OLDEST, record["id"])
+        return key, record["category_id"], record["is_active"], dumps(record)
+
+    def reload(self):
+        """Recharger tout le catalogue (démarrage, reconnexion, écriture massive)"""
+
+        with SessionLocal() as db:
+            products = {row.id: self._entry(row) for row in _product_rows(db)}
+
+        views = {}
+        for key, category_id, is_active, _ in sorted(products.values()):
+            for view in _view_keys(category_id, is_active):
+                views.setdefault(view, []).append(key)
+
+        with self._lock:
+            self._products = products
+            self._views = views
+        print(f"🗂️  Instantané du catalogue chargé: {len(products)} produit(s)")
+
+    def refresh(self, product_ids: set = (), category_ids: set = ()):
+        """Relire quelques produits (par id ou par catégorie) et mettre les vues à jour"""
+
+        entries = {}
+        with SessionLocal() as db:
+            for column, ids in ((Product.id, list(product_ids)), (Product.category_id, list(category_ids))):
+                for start in range(0, len(ids), FETCH_CHUNK):
+                    for row in _product_rows(db, column.in_(ids[start:start + FETCH_CHUNK])):
+                        entries[row.id] = self._entry(row)
+
+        with self._lock:
+            # Produits notifiés mais absents: supprimés
+            for product_id in set(product_ids) - entries.keys():
+                self._remove(product_id)
+            for product_id, entry in entries.items():
+                old = self._products.get(product_id)
+                if old is None or old[:3] != entry[:3]:
+                    self._remove(product_id)
+                    for view in _view_keys(entry[1], entry[2]):
+                        insort(self._views.setdefault(view, []), entry[0])
+                self._products[product_id] = entry
+
+    def _remove(self, product_id: int):
+        old = self._products.pop(product_id, None)
+        if old is None:
+            return
+        for view in _view_keys(old[1], old[2]):
+            keys = self._views.get(view, [])
+            index = bisect_left(keys, old[0])
+            if index < len(keys) and keys[index] == old[0]:
+                del keys[index]
+
+    # --- Lecture de ses propres écritures ---
+
+    def next_sync_token(self) -> int:
+        """Marqueur à envoyer dans une transaction qui modifie le catalogue"""
+
+        with self._lock:
+            self._sync_issued += 1
+            return self._sync_issued
+
+    def expect_sync(self, token: int):
+        """Après le commit: resservir l'instantané une fois le marqueur reçu"""
+
+        with self._lock:
+            if token <= self._sync_floor:
+                return
+            if token in self._sync_arrived:
+                self._sync_arrived.discard(token)
+            else:
+                self._sync_pending.add(token)
+
+    def _synced(self, tokens: set):
+        with self._lock:
+            for token in tokens:
+                if token in self._sync_pending:
+                    self._sync_pending.discard(token)
+                elif token > self._sync_floor:
+                    self._sync_arrived.add(token)
+
+    def _reset_sync(self, floor: int):
+        """Marqueurs antérieurs au LISTEN: perdus ou couverts par le rechargement"""
+
+        with self._lock:
+            self._sync_floor = max(self._sync_floor, floor)
+            self._sync_pending = {token for token in self._sync_pending if token > floor}
+            self._sync_arrived = {token for token in self._sync_arrived if token > floor}
+
+    def _apply(self, payloads: list):
+        """Appliquer un lot de notifications, dans l'ordre des commits"""
+
+        product_ids, category_ids, synced = set(), set(), set()
+        full_reload = False
+
+        for payload in payloads:
+            table, _, ids = payload.partition(":")
+            if table == "sync":
+                pid, _, token = ids.partition(":")
+                if pid == str(os.getpid()):
+                    synced.add(int(token))
+            elif ids == "*":
+                full_reload = True
+            elif table in CATALOG_TABLES:
+                target = product_ids if table == "products" else category_ids
+                target.update(int(value) for value in ids.split(","))
+
+        if full_reload:
+            self.reload()
+        elif product_ids or category_ids:
+            self.refresh(product_ids, category_ids)
+
+        if synced:
+            self._synced(synced)
+
+    def run(self, stop_event: threading.Event):
+        """
+        Boucle d'écoute: LISTEN, chargement complet, puis notifications
+
+        Args:
+            stop_event: Événement qui arrête la boucle
+        """
+
+        while not stop_event.is_set():
+            conn = None
+            try:
+                # Connexion dédiée, hors du pool
+                cargs, cparams = engine.dialect.create_connect_args(engine.url)
+                conn = engine.dialect.dbapi.connect(*cargs, **cparams)
+                conn.autocommit = True
+                conn.cursor().execute(f"LISTEN {CATALOG_CHANNEL}")
+
+                # LISTEN avant le chargement: aucune écriture commitée entre les deux n'est perdue
+                sync_before_reload = self._sync_issued
+                self.reload()
+                self._reset_sync(sync_before_reload)
+                self._ready = True
+
+                while not stop_event.is_set():
+                    if not select.select([conn], [], [], 1.0)[0]:
+                        continue
+                    conn.poll()
+                    payloads = [notify.payload for notify in conn.notifies]
+                    conn.notifies.clear()
+                    self._apply(payloads)
+            except Exception as e:
+                self._ready = False
+                print(f"❌ Erreur de l'instantané du catalogue: {str(e)}")
+                stop_event.wait(RECONNECT_DELAY)
+            finally:
+                self._ready = False
+                if conn is not None and not conn.closed:
+                    conn.close()
+
+
+catalog_snapshot = CatalogSnapshot()
+_listening = threading.Event()
+
+
+_SYNC_TOKEN = "catalog_sync_token"
+
+
+@event.listens_for(Session, "before_commit")
+def _send_sync_marker(session):
+    """Marqueur sync dans la transaction qui modifie le catalogue (même connexion)"""
+
+    if not _listening.is_set():
+        return
+    session.flush()
+    if not written_tables(session) & CATALOG_TABLES:
+        return
+
+    token = catalog_snapshot.next_sync_token()
+    session.execute(text("SELECT pg_notify(:channel, :payload)"), {
+        "channel": CATALOG_CHANNEL,
+        "payload": f"sync:{os.getpid()}:{token}"
+    })
+    session.info[_SYNC_TOKEN] = token
+
+
+@event.listens_for(Session, "after_commit")
+def _expect_sync_marker(session):
+    token = session.info.pop(_SYNC_TOKEN, None)
+    if token is not None:
+        catalog_snapshot.expect_sync(token)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_sync_marker(session):
+    session.info.pop(_SYNC_TOKEN, None)
+
+
+def start_snapshot_thread() -> tuple:
+    """Démarrer l'écoute du catalogue dans un thread (retourne le thread et son stop_event)"""
+
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=catalog_snapshot.run,
+        args=(stop_event,),
+        name="catalog-snapshot",
+        daemon=True
+    )
+    _listening.set()
+    thread.start()
+
+    return thread, stop_event
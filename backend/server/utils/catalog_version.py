@@ -0,0 +1,113 @@
+"""
+Version du catalogue et requêtes conditionnelles (ETag / If-None-Match)
+
+Les routes publiques du catalogue (GET /product/, GET /product/{id},
+GET /category/) sont appelées à chaque ouverture d'écran de l'application.
+Leur réponse dépend uniquement des tables products et categories ; la version
+du catalogue (table catalog_version, une ligne) est lue en une requête légère.
+Elle est incrémentée par le trigger notify_catalog_change, dans la transaction
+qui modifie le catalogue, quel que soit l'auteur (routes, SQL direct, COPY) :
+un client ne peut pas recevoir l'ancienne version des données avec le nouvel
+ETag, et aucune connexion supplémentaire n'est prise après le commit.
+
+Les ventes et les inventaires changent la version : quantity_in_stock fait
+partie des réponses, comme dans l'instantané dont l'ETag est l'empreinte du
+corps. Seules les réservations du panier (quantity_reserved, non servie) la
+laissent inchangée.
+
+Usage dans les routes: dependencies=[Depends(catalog_etag)]
+Si l'en-tête If-None-Match correspond, la route répond 304 sans exécuter sa requête.
+
+Les réponses servies par l'instantané en mémoire (utils/catalog_snapshot.py)
+passent par snapshot_response : l'ETag est l'empreinte du JSON déjà encodé,
+identique d'un processus à l'autre, sans requête à PostgreSQL.
+"""
+import hashlib
+import os
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from utils.db import get_db
+
+CATALOG_CACHE_MAX_AGE = int(os.getenv("CATALOG_CACHE_MAX_AGE", "0"))
+CATALOG_CACHE_CONTROL = f"public, max-age={CATALOG_CACHE_MAX_AGE}, must-revalidate"
+
+_VERSION_QUERY = text("SELECT version FROM catalog_version")
+
+
+def current_catalog_etag(db: Session) -> str:
+    """
+    ETag faible de la version courante du catalogue
+
+    Args:
+        db: Session de base de données
+
+    Returns:
+        ETag (W/"...")
+    """
+
+    version = db.execute(_VERSION_QUERY).one()
+    digest = hashlib.sha1(repr(tuple(version)).encode("utf-8")).hexdigest()[:16]
+
+    return f'W/"{digest}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Comparaison faible (RFC 9110) de l'en-tête If-None-Match avec l'ETag"""
+    if if_none_match.strip() == "*":
+        return True
+
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def _conditional_headers(request: Request, etag: str) -> dict:
+    """En-têtes de cache; lève 304 si If-None-Match correspond à l'ETag"""
+
+    headers = {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return headers
+
+
+def snapshot_response(request: Request, body: bytes, headers: dict = None) -> Response:
+    """
+    Réponse JSON déjà encodée, avec un ETag calculé sur son contenu
+
+    Args:
+        request: Requête (en-tête If-None-Match)
+        body: Tableau ou objet JSON encodé
+        headers: En-têtes supplémentaires (X-Next-Cursor)
+
+    Raises:
+        HTTPException 304: If-None-Match correspond au contenu
+    """
+
+    etag = f'W/"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    headers = {**(headers or {}), **_conditional_headers(request, etag)}
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def catalog_etag(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+) -> str:
+    """
+    Dépendance des routes du catalogue: ETag et Cache-Control, 304 si inchangé
+
+    Raises:
+        HTTPException 304: If-None-Match correspond à la version courante
+    """
+
+    etag = current_catalog_etag(db)
+    response.headers.update(_conditional_headers(request, etag))
+
+    return etag
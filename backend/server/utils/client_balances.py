@@ -0,0 +1,182 @@
+"""
+Soldes des clients (tables client_balances et client_balance_days)
+
+client_balances garde, par client, le nombre de factures et la dette totale ;
+client_balance_days garde la dette restante par client et par jour de création
+des factures. Les deux tables reçoivent les variations de chaque écriture de
+facture (création, paiement, suppression) avec un INSERT ... ON CONFLICT DO
+UPDATE, dans la même transaction, depuis utils/sales_stats.py.
+
+- liste des clients: lecture de client_balances, sans agréger les factures
+- balance âgée (/client/aging): tri par dette sur l'index de client_balances,
+  puis répartition par ancienneté (0-30, 31-60, 61-90, 90+ jours) des seuls
+  clients de la page à partir de client_balance_days
+
+Reconstruction complète (backfill): python utils/db.py stats
+"""
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import Date, cast, delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from models.bill import Bill
+from models.bill_daily_stat import BillDailyStat
+from models.client_balance import ClientBalance
+from models.client_balance_day import ClientBalanceDay
+
+# (nom, âge minimum, âge maximum) en jours depuis la création de la facture
+AGING_BUCKETS = (
+    ("days_0_30", 0, 30),
+    ("days_31_60", 31, 60),
+    ("days_61_90", 61, 90),
+    ("days_over_90", 91, None),
+)
+
+
+def record_client_balances(db: Session, changes: list):
+    """
+    Appliquer des variations aux soldes des clients (sans commit)
+
+    Args:
+        db: Session de base de données
+        changes: Liste de tuples (client_id, jour de la facture, variation du
+                 nombre de factures, variation de la dette)
+    """
+
+    per_client = {}
+    per_day = {}
+    for client_id, day, bills, debt in changes:
+        totals = per_client.setdefault(client_id, [0, Decimal('0.00')])
+        totals[0] += bills
+        totals[1] += debt
+        per_day[(client_id, day)] = per_day.get((client_id, day), Decimal('0.00')) + debt
+
+    # Ordre de clé fixe: les transactions concurrentes verrouillent les lignes dans le même ordre
+    client_rows = [
+        {"client_id": client_id, "total_bills": bills, "total_debt": debt}
+        for client_id, (bills, debt) in sorted(per_client.items())
+        if bills or debt
+    ]
+    day_rows = [
+        {"client_id": client_id, "day": day, "debt": debt}
+        for (client_id, day), debt in sorted(per_day.items())
+        if debt
+    ]
+
+    if client_rows:
+        stmt = insert(ClientBalance).values(client_rows)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[ClientBalance.client_id],
+            set_={
+                "total_bills": ClientBalance.total_bills + stmt.excluded.total_bills,
+                "total_debt": ClientBalance.total_debt + stmt.excluded.total_debt,
+                "updated_at": func.now()
+            }
+        ))
+
+    if day_rows:
+        stmt = insert(ClientBalanceDay).values(day_rows)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[ClientBalanceDay.client_id, ClientBalanceDay.day],
+            set_={"debt": ClientBalanceDay.debt + stmt.excluded.debt}
+        ))
+
+
+def _aging_columns(day_column, amount_column, today: date) -> list:
+    """Sommes de amount_column par tranche d'ancienneté (today - day_column)"""
+
+    age = today - day_column
+    columns = []
+    for name, low, high in AGING_BUCKETS:
+        condition = age >= low if high is None else age.between(low, high)
+        columns.append(func.coalesce(func.sum(amount_column).filter(condition), Decimal('0.00')).label(name))
+
+    return columns
+
+
+def client_aging(db: Session, client_ids: list, today: date) -> dict:
+    """
+    Répartition par ancienneté de la dette de quelques clients
+
+    Args:
+        db: Session de base de données
+        client_ids: IDs des clients (page du rapport)
+        today: Date de référence
+
+    Returns:
+        dict client_id -> dict des tranches (AGING_BUCKETS)
+    """
+
+    if not client_ids:
+        return {}
+
+    rows = db.execute(
+        select(
+            ClientBalanceDay.client_id,
+            *_aging_columns(ClientBalanceDay.day, ClientBalanceDay.debt, today)
+        ).where(
+            ClientBalanceDay.client_id.in_(client_ids),
+            ClientBalanceDay.debt != 0
+        ).group_by(ClientBalanceDay.client_id)
+    ).all()
+
+    return {row.client_id: {name: getattr(row, name) for name, _, _ in AGING_BUCKETS} for row in rows}
+
+
+def aging_totals(db: Session, today: date) -> dict:
+    """
+    Répartition par ancienneté de la dette de tous les clients
+
+    Lue dans bill_daily_stats (total_pending par jour): quelques centaines de lignes.
+
+    Args:
+        db: Session de base de données
+        today: Date de référence
+
+    Returns:
+        dict des tranches (AGING_BUCKETS)
+    """
+
+    row = db.execute(
+        select(*_aging_columns(BillDailyStat.day, BillDailyStat.total_pending, today))
+    ).one()
+
+    return row._asdict()
+
+
+def rebuild_client_balances(db: Session) -> int:
+    """
+    Recalculer client_balances et client_balance_days à partir des factures (avec commit)
+
+    Args:
+        db: Session de base de données
+
+    Returns:
+        Nombre de clients ayant des factures
+    """
+
+    day = cast(Bill.created_at, Date)
+
+    db.execute(delete(ClientBalanceDay))
+    db.execute(delete(ClientBalance))
+
+    result = db.execute(insert(ClientBalance).from_select(
+        ["client_id", "total_bills", "total_debt"],
+        select(
+            Bill.client_id,
+            func.count(Bill.id),
+            func.coalesce(func.sum(Bill.total_remaining), 0)
+        ).group_by(Bill.client_id)
+    ))
+    db.execute(insert(ClientBalanceDay).from_select(
+        ["client_id", "day", "debt"],
+        select(
+            Bill.client_id,
+            day,
+            func.sum(Bill.total_remaining)
+        ).where(Bill.total_remaining != 0).group_by(Bill.client_id, day)
+    ))
+
+    db.commit()
+
+    return result.rowcount
@@ -106,6 +106,14 @@ def init_db():
     from models.payment import Payment
     from models.stock_alert import StockAlert
     from models.notification import Notification
+    from models.bill_number_counter import BillNumberCounter
+    from models.bill_daily_stat import BillDailyStat
+    from models.idempotency_key import IdempotencyKey
+    from models.client_balance import ClientBalance
+    from models.client_balance_day import ClientBalanceDay
+    from models.stock_movement import StockMovement
+    from models.stock_snapshot import StockSnapshot
+    from models.stock_reservation import StockReservation
     
     print("🔄 Création des tables de la base de données PostgreSQL...")
     try:
@@ -258,7 +266,88 @@ def create_sample_data():
         session.close()
 
 
+def rebuild_stats():
+    """Reconstruire bill_daily_stats et les soldes clients à partir des factures existantes"""
+    from utils.sales_stats import rebuild_bill_daily_stats
+    from utils.client_balances import rebuild_client_balances
+    
+    print("🔄 Reconstruction des statistiques journalières et des soldes clients...")
+    
+    session = Session(bind=engine)
+    
+    try:
+        days = rebuild_bill_daily_stats(session)
+        print(f"✅ Statistiques reconstruites: {days} jour(s)")
+        clients = rebuild_client_balances(session)
+        print(f"✅ Soldes clients reconstruits: {clients} client(s)")
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Erreur lors de la reconstruction des statistiques: {str(e)}")
+        raise
+    finally:
+        session.close()
+
+
+def purge_idempotency_keys():
+    """Supprimer les clés d'idempotence expirées"""
+    from utils.idempotency import purge_expired_keys
+    
+    session = Session(bind=engine)
+    
+    try:
+        deleted = purge_expired_keys(session)
+        print(f"✅ Clés d'idempotence expirées supprimées: {deleted}")
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Erreur lors de la purge des clés d'idempotence: {str(e)}")
+        raise
+    finally:
+        session.close()
+
+
+def compact_stock_ledger():
+    """Prendre les instantanés de stock des produits ayant accumulé des mouvements"""
+    from utils.stock_ledger import compact_stock_snapshots
+    
+    session = Session(bind=engine)
+    
+    try:
+        created = compact_stock_snapshots(session)
+        print(f"✅ Instantanés de stock créés: {created}")
+    except Exception as e:
+        session.rollback()
+        print(f"❌ Erreur lors de la compaction du journal de stock: {str(e)}")
+        raise
+    finally:
+        session.close()
+
+
+def check_plans():
+    """Vérifier qu'aucune requête des routes ne parcourt séquentiellement une grande table"""
+    from utils.query_plans import check_query_plans
+    
+    print("🔍 Vérification des plans d'exécution...")
+    
+    session = Session(bind=engine)
+    
+    try:
+        results = check_query_plans(session)
+    finally:
+        session.close()
+    
+    for result in results:
+        if result["ok"]:
+            print(f"✅ {result['name']}")
+        else:
+            print(f"❌ {result['name']}: Seq Scan sur {', '.join(result['seq_scans'])}")
+    
+    return all(result["ok"] for result in results)
+
+
 if __name__ == "__main__":
+    # Rendre le package utils importable quand le script est lancé directement
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    
     if len(sys.argv) > 1:
         command = sys.argv[1]
         
@@ -276,8 +365,16 @@ if __name__ == "__main__":
             check_connection()
             init_db()
             create_sample_data()
+        elif command == "stats":
+            rebuild_stats()
+        elif command == "purge-keys":
+            purge_idempotency_keys()
+        elif command == "stock-snapshots":
+            compact_stock_ledger()
+        elif command == "plans":
+            sys.exit(0 if check_plans() else 1)
         else:
-            print("❌ Commande inconnue. Utilisez: init, drop, reset, check, ou sample")
+            print("❌ Commande inconnue. Utilisez: init, drop, reset, check, sample, stats, purge-keys, stock-snapshots ou plans")
     else:
         print("""
 Usage:
@@ -286,4 +383,8 @@ Usage:
   python utils/db.py reset   - Réinitialiser la DB
   python utils/db.py check   - Vérifier la connexion
   python utils/db.py sample  - Créer des données de test
+  python utils/db.py stats   - Reconstruire les statistiques journalières et les soldes clients
+  python utils/db.py purge-keys - Supprimer les clés d'idempotence expirées
+  python utils/db.py stock-snapshots - Compacter le journal de stock (instantanés)
+  python utils/db.py plans   - Vérifier les plans d'exécution des requêtes des routes
         """)
\ No newline at end of file
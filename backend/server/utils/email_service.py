@@ -1,10 +1,10 @@
 
 # utils/email_service.py
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Optional
 import os
+from utils.smtp_pool import get_smtp_pool
 
 class EmailService:
     def __init__(self):
@@ -12,6 +12,9 @@ class EmailService:
         self.smtp_port = int(os.getenv("SMTP_PORT", "587"))
         self.sender_email = os.getenv("SENDER_EMAIL")
         self.sender_password = os.getenv("SENDER_PASSWORD")
+        # Connexions SMTP persistantes partagées entre les envois
+        self.smtp_pool = get_smtp_pool(
+            self.smtp_server, self.smtp_port, self.sender_email, self.sender_password)
         
     def send_otp_email(self, recipient_email: str, otp_code: str, otp_type: str) -> bool:
         """Send OTP via email"""
@@ -38,10 +41,7 @@ class EmailService:
             html_part = MIMEText(body, "html")
             message.attach(html_part)
             
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.sender_email, self.sender_password)
-                server.send_message(message)
+            self.smtp_pool.send_message(message)
                 
             return True
         except Exception as e:
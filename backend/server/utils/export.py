@@ -0,0 +1,117 @@
+"""
+Export en flux (CSV ou NDJSON) de grandes requêtes
+
+Les lignes sont lues avec un curseur côté serveur (stream_results) par paquets
+de EXPORT_CHUNK_ROWS, sur une connexion ouverte par le générateur lui-même (la
+session de la requête est fermée avant la fin de l'envoi). Seuls des tuples de
+colonnes sont lus, sans objets ORM ni modèles Pydantic : la mémoire reste
+constante quel que soit le nombre de lignes.
+Usage dans les routes: return export_response(select(...), "bills", export_format)
+"""
+import csv
+import io
+import json
+import os
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Iterator, Optional
+from fastapi.responses import StreamingResponse
+from utils.db import engine
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "5000"))
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def date_range_filters(column, start_date: Optional[date], end_date: Optional[date]) -> list:
+    """Filtres start_date <= column < end_date + 1 jour (bornes incluses)"""
+    filters = []
+    if start_date:
+        filters.append(column >= start_date)
+    if end_date:
+        filters.append(column < end_date + timedelta(days=1))
+    return filters
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunks(columns: list, partitions) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(columns)
+    for rows in partitions:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _ndjson_chunks(columns: list, partitions) -> Iterator[bytes]:
+    for rows in partitions:
+        yield "".join(
+            json.dumps(
+                {column: _json_value(value) for column, value in zip(columns, row)},
+                ensure_ascii=False
+            ) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+
+def stream_rows(statement, export_format: str) -> Iterator[bytes]:
+    """
+    Exécuter une requête avec un curseur côté serveur et produire le fichier par morceaux
+
+    Args:
+        statement: Requête select() (les noms de colonnes servent d'en-têtes)
+        export_format: "csv" ou "ndjson"
+
+    Yields:
+        Morceaux encodés en UTF-8
+    """
+
+    with engine.connect() as connection:
+        result = connection.execution_options(
+            stream_results=True, max_row_buffer=EXPORT_CHUNK_ROWS
+        ).execute(statement)
+        columns = list(result.keys())
+        partitions = result.partitions(EXPORT_CHUNK_ROWS)
+
+        if export_format == "ndjson":
+            yield from _ndjson_chunks(columns, partitions)
+        else:
+            yield from _csv_chunks(columns, partitions)
+
+
+def export_response(statement, name: str, export_format: str) -> StreamingResponse:
+    """
+    Réponse HTTP en flux pour une requête d'export
+
+    Args:
+        statement: Requête select()
+        name: Préfixe du nom de fichier (ex: "bills")
+        export_format: "csv" ou "ndjson"
+
+    Returns:
+        StreamingResponse en pièce jointe
+    """
+
+    filename = f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{export_format}"
+
+    return StreamingResponse(
+        stream_rows(statement, export_format),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,163 @@
+"""
+Clés d'idempotence (en-tête Idempotency-Key) des routes d'écriture
+
+La clé est enregistrée dans la transaction de la route, avec le hash de la
+requête et la réponse, juste avant le commit :
+- première requête: la ligne est insérée, la route s'exécute, la réponse est stockée
+- requête rejouée: la réponse stockée est renvoyée telle quelle, sans toucher
+  aux factures ni au stock (en-tête Idempotent-Replayed: true)
+- requête concurrente avec la même clé: l'INSERT attend le commit de la première
+  (index unique) puis rejoue sa réponse ; si la première échoue (rollback), la
+  clé est libre et la requête s'exécute
+- même clé avec un autre corps ou une autre route: 422
+
+Une erreur (4xx/5xx) annule la transaction, clé comprise : le client peut
+réessayer. Les clés expirent après IDEMPOTENCY_KEY_TTL_HOURS heures ; une clé
+expirée est réutilisable et `python utils/db.py purge-keys` supprime les
+lignes expirées.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from models.idempotency_key import IdempotencyKey
+
+IDEMPOTENCY_KEY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+
+def request_hash(endpoint: str, payload) -> str:
+    """SHA-256 de la route et du corps de la requête (JSON canonique)"""
+    body = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{endpoint}\n{body}".encode("utf-8")).hexdigest()
+
+
+class IdempotentRequest:
+    """
+    Clé d'idempotence réclamée par une requête
+
+    Usage dans une route:
+        idem = begin_idempotent(db, key, "client", client.id, "POST /bill/", payload)
+        if idem.replay:
+            return idem.replay
+        ...
+        idem.store(db, response, status_code=201)
+        db.commit()
+    """
+
+    def __init__(self, record_id: Optional[int] = None, replay: Optional[JSONResponse] = None):
+        self.record_id = record_id
+        self.replay = replay
+
+    def store(self, db: Session, response, status_code: int = status.HTTP_200_OK):
+        """Enregistrer la réponse dans la transaction courante (avant le commit)"""
+        if self.record_id is None:
+            return
+        db.query(IdempotencyKey).filter(IdempotencyKey.id == self.record_id).update({
+            IdempotencyKey.status_code: status_code,
+            IdempotencyKey.response_body: jsonable_encoder(response)
+        }, synchronize_session=False)
+
+
+def begin_idempotent(
+    db: Session,
+    key: Optional[str],
+    owner_type: str,
+    owner_id: int,
+    endpoint: str,
+    payload
+) -> IdempotentRequest:
+    """
+    Réclamer une clé d'idempotence ou retrouver la réponse déjà enregistrée
+
+    Args:
+        db: Session de base de données (transaction de la route)
+        key: Valeur de l'en-tête Idempotency-Key (None: pas d'idempotence)
+        owner_type: "admin" ou "client"
+        owner_id: ID de l'utilisateur (les clés sont propres à chaque utilisateur)
+        endpoint: Route (ex: "POST /bill/")
+        payload: Corps et paramètres de la requête
+
+    Returns:
+        IdempotentRequest (replay est la réponse à renvoyer si la clé a déjà servi)
+    """
+
+    if key is None:
+        return IdempotentRequest()
+
+    if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idempotency-Key doit contenir entre 1 et {IDEMPOTENCY_KEY_MAX_LENGTH} caractères"
+        )
+
+    fingerprint = request_hash(endpoint, payload)
+    expires_at = datetime.now(timezone.utc) + timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+
+    # Insérer la clé, ou reprendre une clé expirée (attend une transaction concurrente)
+    stmt = insert(IdempotencyKey).values(
+        owner_type=owner_type,
+        owner_id=owner_id,
+        key=key,
+        endpoint=endpoint,
+        request_hash=fingerprint,
+        expires_at=expires_at
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_idempotency_keys_owner_key",
+        set_={
+            "endpoint": stmt.excluded.endpoint,
+            "request_hash": stmt.excluded.request_hash,
+            "status_code": None,
+            "response_body": None,
+            "created_at": func.now(),
+            "expires_at": stmt.excluded.expires_at
+        },
+        where=IdempotencyKey.expires_at <= func.now()
+    ).returning(IdempotencyKey.id)
+
+    record_id = db.execute(stmt).scalar()
+    if record_id is not None:
+        return IdempotentRequest(record_id=record_id)
+
+    existing = db.query(IdempotencyKey).filter(
+        IdempotencyKey.owner_type == owner_type,
+        IdempotencyKey.owner_id == owner_id,
+        IdempotencyKey.key == key
+    ).first()
+
+    if existing.endpoint != endpoint or existing.request_hash != fingerprint:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key déjà utilisée pour une autre requête"
+        )
+
+    return IdempotentRequest(replay=JSONResponse(
+        status_code=existing.status_code,
+        content=existing.response_body,
+        headers={"Idempotent-Replayed": "true"}
+    ))
+
+
+def purge_expired_keys(db: Session) -> int:
+    """
+    Supprimer les clés d'idempotence expirées
+
+    Args:
+        db: Session de base de données
+
+    Returns:
+        Nombre de clés supprimées
+    """
+
+    result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= func.now()))
+    db.commit()
+
+    return result.rowcount
@@ -0,0 +1,230 @@
+"""
+Envoi des notifications en attente (boîte d'envoi / outbox)
+
+Les routes ne font qu'insérer des lignes Notification dans leur transaction.
+Le dispatcher les réclame par lots avec SELECT ... FOR UPDATE SKIP LOCKED :
+plusieurs workers (threads ou processus) se partagent la file sans envoyer deux
+fois la même notification. Les emails passent par le pool SMTP
+(utils/smtp_pool.py), les messages WhatsApp d'un lot partagent une session HTTP.
+Un échec incrémente attempts et reporte la notification à next_attempt_at
+(backoff exponentiel) ; après NOTIFICATION_MAX_ATTEMPTS tentatives elle n'est
+plus réclamée (last_error garde la cause).
+
+Exécution:
+- dans l'API: NOTIFICATION_DISPATCHER_ENABLED=true (thread démarré par lifespan)
+- processus séparé: python -m utils.notification_dispatcher
+"""
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+import requests
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, selectinload
+from models.notification import Notification
+from utils.db import SessionLocal
+from utils.notification_manager import deliver_email, deliver_whatsapp
+
+NOTIFICATION_DISPATCHER_ENABLED = os.getenv(
+    "NOTIFICATION_DISPATCHER_ENABLED", "false").lower() == "true"
+NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "50"))
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "5"))
+NOTIFICATION_RETRY_BASE_SECONDS = float(os.getenv("NOTIFICATION_RETRY_BASE_SECONDS", "30"))
+NOTIFICATION_RETRY_MAX_SECONDS = float(os.getenv("NOTIFICATION_RETRY_MAX_SECONDS", "3600"))
+NOTIFICATION_POLL_INTERVAL = float(os.getenv("NOTIFICATION_POLL_INTERVAL", "5"))
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Délai avant la prochaine tentative: base * 2^(attempts - 1), plafonné"""
+    seconds = NOTIFICATION_RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1))
+    return timedelta(seconds=min(seconds, NOTIFICATION_RETRY_MAX_SECONDS))
+
+
+class _Channels:
+    """Session HTTP partagée par un lot, ouverte à la première utilisation"""
+
+    def __init__(self):
+        self._http = None
+
+    @property
+    def http(self) -> requests.Session:
+        if self._http is None:
+            self._http = requests.Session()
+        return self._http
+
+    def close(self):
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+
+
+class _PermanentFailure(Exception):
+    """Échec qui ne se résoudra pas en réessayant (destinataire sans adresse)"""
+
+
+def _deliver(notification: Notification, channels: _Channels):
+    """Envoyer une notification sur son canal (lève une exception en cas d'échec)"""
+
+    recipient = notification.admin or notification.client
+    if recipient is None:
+        raise _PermanentFailure("Notification sans destinataire")
+
+    if notification.channel == "email":
+        if not recipient.email:
+            raise _PermanentFailure("Destinataire sans email")
+        subject = f"Notification - {notification.notification_type}"
+        deliver_email(recipient.email, subject, notification.message)
+
+    elif notification.channel == "whatsapp":
+        if not recipient.phone_number:
+            raise _PermanentFailure("Destinataire sans numéro de téléphone")
+        deliver_whatsapp(channels.http, recipient.phone_number, notification.message)
+
+    else:
+        raise _PermanentFailure(f"Canal inconnu: {notification.channel}")
+
+
+def claim_batch(db: Session, batch_size: int = NOTIFICATION_BATCH_SIZE) -> list:
+    """
+    Réclamer un lot de notifications à envoyer (verrouillées jusqu'au commit)
+
+    Args:
+        db: Session de base de données
+        batch_size: Nombre maximum de notifications
+
+    Returns:
+        Liste des notifications réclamées
+    """
+
+    now = datetime.now(timezone.utc)
+
+    return db.query(Notification).options(
+        selectinload(Notification.admin),
+        selectinload(Notification.client),
+    ).filter(
+        Notification.is_sent == False,
+        Notification.attempts < NOTIFICATION_MAX_ATTEMPTS,
+        or_(Notification.next_attempt_at.is_(None), Notification.next_attempt_at <= now)
+    ).order_by(
+        Notification.id
+    ).limit(batch_size).with_for_update(skip_locked=True, of=Notification).all()
+
+
+def dispatch_batch(db: Session, batch_size: int = NOTIFICATION_BATCH_SIZE) -> dict:
+    """
+    Réclamer, envoyer et valider un lot de notifications
+
+    Args:
+        db: Session de base de données
+        batch_size: Nombre maximum de notifications
+
+    Returns:
+        dict avec le nombre de notifications réclamées, envoyées et en échec
+    """
+
+    batch = claim_batch(db, batch_size)
+    sent_count = 0
+    failed_count = 0
+    channels = _Channels()
+
+    try:
+        for notification in batch:
+            now = datetime.now(timezone.utc)
+            try:
+                _deliver(notification, channels)
+            except _PermanentFailure as e:
+                notification.attempts = NOTIFICATION_MAX_ATTEMPTS
+                notification.next_attempt_at = None
+                notification.last_error = str(e)
+                failed_count += 1
+            except Exception as e:
+                notification.attempts = (notification.attempts or 0) + 1
+                notification.next_attempt_at = now + retry_delay(notification.attempts)
+                notification.last_error = str(e)[:500]
+                failed_count += 1
+            else:
+                notification.is_sent = True
+                notification.sent_at = now
+                notification.next_attempt_at = None
+                notification.last_error = None
+                sent_count += 1
+    finally:
+        channels.close()
+        db.commit()
+
+    return {
+        "claimed": len(batch),
+        "sent": sent_count,
+        "failed": failed_count
+    }
+
+
+def dispatch_pending(db: Session, batch_size: int = NOTIFICATION_BATCH_SIZE) -> dict:
+    """
+    Envoyer par lots toutes les notifications actuellement dues
+
+    Args:
+        db: Session de base de données
+        batch_size: Taille des lots
+
+    Returns:
+        dict avec les statistiques d'envoi
+    """
+
+    total = {"total": 0, "sent": 0, "failed": 0}
+
+    while True:
+        result = dispatch_batch(db, batch_size)
+        total["total"] += result["claimed"]
+        total["sent"] += result["sent"]
+        total["failed"] += result["failed"]
+        # Les échecs sont reportés à plus tard: un lot incomplet vide la file
+        if result["claimed"] < batch_size:
+            return total
+
+
+def run_dispatcher(stop_event: threading.Event, poll_interval: float = NOTIFICATION_POLL_INTERVAL):
+    """
+    Boucle du dispatcher: envoie les lots dus puis attend poll_interval
+
+    Args:
+        stop_event: Événement qui arrête la boucle
+        poll_interval: Attente (secondes) quand la file est vide
+    """
+
+    while not stop_event.is_set():
+        try:
+            with SessionLocal() as db:
+                result = dispatch_batch(db)
+            if result["claimed"]:
+                print(f"📨 Notifications: {result['sent']} envoyée(s), {result['failed']} en échec")
+            if result["claimed"] == NOTIFICATION_BATCH_SIZE:
+                continue
+        except Exception as e:
+            print(f"❌ Erreur du dispatcher de notifications: {str(e)}")
+
+        stop_event.wait(poll_interval)
+
+
+def start_dispatcher_thread() -> tuple:
+    """Démarrer le dispatcher dans un thread (retourne le thread et son stop_event)"""
+
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=run_dispatcher,
+        args=(stop_event,),
+        name="notification-dispatcher",
+        daemon=True
+    )
+    thread.start()
+
+    return thread, stop_event
+
+
+if __name__ == "__main__":
+    print("📨 Dispatcher de notifications démarré (Ctrl+C pour arrêter)")
+    stop = threading.Event()
+    try:
+        run_dispatcher(stop)
+    except KeyboardInterrupt:
+        stop.set()
+        print("👋 Dispatcher arrêté")
@@ -5,26 +5,28 @@ from models.client import Client
 from models.admin import Admin
 from models.stock_alert import StockAlert
 from models.product import Product
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+import os
 import requests
 from typing import Optional
+from utils.smtp_pool import SMTPConnectionPool, get_smtp_pool
 
-# Configuration Email (à modifier selon votre fournisseur)
-SMTP_SERVER = "smtp.gmail.com"
-SMTP_PORT = 587
-SMTP_USERNAME = "votre_email@gmail.com"  # Changez ceci
-SMTP_PASSWORD = "votre_mot_de_passe"      # Changez ceci
-FROM_EMAIL = "votre_email@gmail.com"       # Changez ceci
+# Configuration Email (voir .env.example)
+SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME", "votre_email@gmail.com")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "votre_mot_de_passe")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+FROM_EMAIL = os.getenv("FROM_EMAIL", "votre_email@gmail.com")
 
 # Configuration WhatsApp API (exemple avec Twilio)
 WHATSAPP_API_URL = "https://api.twilio.com/2010-04-01/Accounts/{account_sid}/Messages.json"
-TWILIO_ACCOUNT_SID = "votre_account_sid"   # Changez ceci
-TWILIO_AUTH_TOKEN = "votre_auth_token"     # Changez ceci
-TWILIO_WHATSAPP_NUMBER = "whatsapp:+14155238886"  # Numéro Twilio WhatsApp
+TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID", "votre_account_sid")
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "votre_auth_token")
+TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER", "whatsapp:+14155238886")
 
-def create_bill_notification(db: Session, bill: Bill, client: Client) -> list:
+def create_bill_notification(db: Session, bill: Bill, client: Client, commit: bool = True) -> list:
     """
     Créer des notifications pour une nouvelle facture
     
@@ -32,6 +34,7 @@ def create_bill_notification(db: Session, bill: Bill, client: Client) -> list:
         db: Session de base de données
         bill: Facture créée
         client: Client qui a créé la facture
+        commit: Valider la transaction (False pour laisser l'appelant valider)
         
     Returns:
         Liste des notifications créées
@@ -115,45 +118,67 @@ Merci pour votre achat!
         db.add(client_email_notification)
         notifications.append(client_email_notification)
     
-    db.commit()
+    if commit:
+        db.commit()
     
     return notifications
 
-def create_stock_alert_notification(db: Session, alert: StockAlert, product: Product) -> list:
+def stock_alert_admin_message(alert_type: str, alert_message: str, product, category_name: str) -> str:
     """
-    Créer des notifications pour une alerte de stock
+    Message envoyé aux admins pour une alerte de stock
     
     Args:
-        db: Session de base de données
-        alert: Alerte de stock créée
-        product: Produit concerné
+        alert_type: "low_stock" ou "out_of_stock"
+        alert_message: Message de l'alerte
+        product: Produit ou ligne (name, quantity_in_stock, minimum_stock_level)
+        category_name: Nom de la catégorie du produit
         
     Returns:
-        Liste des notifications créées
+        Texte de la notification
     """
     
-    notifications = []
-    
-    # Obtenir tous les admins
-    admins = db.query(Admin).all()
-    
     # Déterminer la priorité
-    priority = "🔴 URGENT" if alert.alert_type == "out_of_stock" else "⚠️ ATTENTION"
+    priority = "🔴 URGENT" if alert_type == "out_of_stock" else "⚠️ ATTENTION"
     
-    # Message pour l'admin
-    message = f"""
+    return f"""
 {priority} - Alerte de stock!
 
 Produit: {product.name}
-Catégorie: {product.category.name}
+Catégorie: {category_name}
 Stock actuel: {product.quantity_in_stock} unités
 Stock minimum: {product.minimum_stock_level} unités
 
-Type d'alerte: {alert.alert_type}
-Message: {alert.message}
+Type d'alerte: {alert_type}
+Message: {alert_message}
 
 Action requise: Réapprovisionner le stock dès que possible.
 """
+
+def create_stock_alert_notification(db: Session, alert: StockAlert, product: Product,
+                                    admins: Optional[list] = None, commit: bool = True) -> list:
+    """
+    Créer des notifications pour une alerte de stock
+    
+    Args:
+        db: Session de base de données
+        alert: Alerte de stock créée
+        product: Produit concerné
+        admins: Liste des admins déjà chargée (optionnel, évite une requête par alerte)
+        commit: Valider la transaction (False pour laisser l'appelant valider)
+        
+    Returns:
+        Liste des notifications créées
+    """
+    
+    notifications = []
+    
+    # Obtenir tous les admins
+    if admins is None:
+        admins = db.query(Admin).all()
+    
+    # Message pour l'admin
+    message = stock_alert_admin_message(
+        alert.alert_type, alert.message, product, product.category.name)
     
     # Créer une notification pour chaque admin
     for admin in admins:
@@ -181,7 +206,8 @@ Action requise: Réapprovisionner le stock dès que possible.
             db.add(whatsapp_notification)
             notifications.append(whatsapp_notification)
     
-    db.commit()
+    if commit:
+        db.commit()
     
     return notifications
 
@@ -237,6 +263,65 @@ Merci pour votre paiement!
     
     return notifications
 
+def notification_smtp_pool() -> SMTPConnectionPool:
+    """Pool SMTP du compte d'envoi des notifications"""
+    return get_smtp_pool(SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, SMTP_STARTTLS)
+
+def deliver_email(to_email: str, subject: str, message: str):
+    """
+    Envoyer un email via le pool SMTP (lève une exception en cas d'échec)
+    
+    Args:
+        to_email: Email du destinataire
+        subject: Sujet de l'email
+        message: Corps du message
+    """
+    
+    # Créer le message
+    msg = MIMEMultipart()
+    msg['From'] = FROM_EMAIL
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    
+    # Ajouter le corps du message
+    msg.attach(MIMEText(message, 'plain', 'utf-8'))
+    
+    notification_smtp_pool().send_message(msg)
+
+def deliver_whatsapp(http: requests.Session, to_phone: str, message: str):
+    """
+    Envoyer un message WhatsApp via Twilio (lève une exception en cas d'échec)
+    
+    Args:
+        http: Session HTTP (connexions réutilisées)
+        to_phone: Numéro de téléphone du destinataire (format: +213XXXXXXXXX)
+        message: Message à envoyer
+    """
+    
+    # Formater le numéro pour WhatsApp
+    if not to_phone.startswith('whatsapp:'):
+        to_phone = f"whatsapp:{to_phone}"
+    
+    # Préparer la requête
+    url = WHATSAPP_API_URL.format(account_sid=TWILIO_ACCOUNT_SID)
+    
+    data = {
+        'From': TWILIO_WHATSAPP_NUMBER,
+        'To': to_phone,
+        'Body': message
+    }
+    
+    # Envoyer la requête
+    response = http.post(
+        url,
+        data=data,
+        auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
+        timeout=30
+    )
+    
+    if response.status_code != 201:
+        raise RuntimeError(f"Twilio a répondu {response.status_code}: {response.text[:200]}")
+
 def send_email_notification(to_email: str, subject: str, message: str) -> bool:
     """
     Envoyer une notification par email
@@ -251,24 +336,7 @@ def send_email_notification(to_email: str, subject: str, message: str) -> bool:
     """
     
     try:
-        # Créer le message
-        msg = MIMEMultipart()
-        msg['From'] = FROM_EMAIL
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        
-        # Ajouter le corps du message
-        msg.attach(MIMEText(message, 'plain', 'utf-8'))
-        
-        # Se connecter au serveur SMTP
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-        server.login(SMTP_USERNAME, SMTP_PASSWORD)
-        
-        # Envoyer l'email
-        text = msg.as_string()
-        server.sendmail(FROM_EMAIL, to_email, text)
-        server.quit()
+        deliver_email(to_email, subject, message)
         
         return True
         
@@ -289,27 +357,10 @@ def send_whatsapp_notification(to_phone: str, message: str) -> bool:
     """
     
     try:
-        # Formater le numéro pour WhatsApp
-        if not to_phone.startswith('whatsapp:'):
-            to_phone = f"whatsapp:{to_phone}"
-        
-        # Préparer la requête
-        url = WHATSAPP_API_URL.format(account_sid=TWILIO_ACCOUNT_SID)
+        with requests.Session() as http:
+            deliver_whatsapp(http, to_phone, message)
         
-        data = {
-            'From': TWILIO_WHATSAPP_NUMBER,
-            'To': to_phone,
-            'Body': message
-        }
-        
-        # Envoyer la requête
-        response = requests.post(
-            url,
-            data=data,
-            auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        )
-        
-        return response.status_code == 201
+        return True
         
     except Exception as e:
         print(f"Erreur lors de l'envoi du message WhatsApp: {str(e)}")
@@ -317,7 +368,7 @@ def send_whatsapp_notification(to_phone: str, message: str) -> bool:
 
 def send_pending_notifications(db: Session) -> dict:
     """
-    Envoyer toutes les notifications en attente
+    Envoyer toutes les notifications en attente (voir utils/notification_dispatcher.py)
     
     Args:
         db: Session de base de données
@@ -326,47 +377,6 @@ def send_pending_notifications(db: Session) -> dict:
         dict avec les statistiques d'envoi
     """
     
-    from datetime import datetime
-    
-    # Récupérer les notifications en attente
-    pending_notifications = db.query(Notification).filter(
-        Notification.is_sent == False
-    ).all()
-    
-    sent_count = 0
-    failed_count = 0
-    
-    for notification in pending_notifications:
-        success = False
-        
-        # Déterminer le destinataire
-        if notification.admin_id:
-            recipient = db.query(Admin).filter(Admin.id == notification.admin_id).first()
-        elif notification.client_id:
-            recipient = db.query(Client).filter(Client.id == notification.client_id).first()
-        else:
-            continue
-        
-        # Envoyer selon le canal
-        if notification.channel == "email" and recipient.email:
-            subject = f"Notification - {notification.notification_type}"
-            success = send_email_notification(recipient.email, subject, notification.message)
-            
-        elif notification.channel == "whatsapp" and recipient.phone_number:
-            success = send_whatsapp_notification(recipient.phone_number, notification.message)
-        
-        # Mettre à jour le statut
-        if success:
-            notification.is_sent = True
-            notification.sent_at = datetime.now()
-            sent_count += 1
-        else:
-            failed_count += 1
-    
-    db.commit()
+    from utils.notification_dispatcher import dispatch_pending
     
-    return {
-        "total": len(pending_notifications),
-        "sent": sent_count,
-        "failed": failed_count
-    }
\ No newline at end of file
+    return dispatch_pending(db)
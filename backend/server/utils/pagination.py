@@ -0,0 +1,107 @@
+"""
+Pagination par curseur (keyset) pour les routes de liste
+
+Les lignes sont triées par (created_at, id) décroissant. Le curseur est l'encodage
+opaque du couple (created_at, id) de la dernière ligne renvoyée ; la page suivante
+est lue avec WHERE (created_at, id) < (...), que l'index (created_at, id) sert
+directement, quelle que soit la profondeur.
+
+Le curseur de la page suivante est renvoyé dans l'en-tête X-Next-Cursor, le corps
+de la réponse reste une liste. Les paramètres skip/limit restent acceptés pour les
+clients existants (application Flutter). Une limite supérieure à MAX_PAGE_SIZE
+est ramenée à MAX_PAGE_SIZE sans erreur.
+Usage dans les routes: page: CursorPage = Depends()
+Une route qui renvoie directement sa réponse utilise page.json_response(rows), qui
+reprend les en-têtes posés sur la réponse de la route.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Callable, Optional
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import tuple_
+from utils.responses import FastJSONResponse
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encoder (created_at, id) en curseur opaque"""
+    payload = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Décoder un curseur en (created_at, id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError, UnicodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Curseur de pagination invalide"
+        )
+
+
+class CursorPage:
+    """Paramètres de pagination: cursor (prioritaire) ou skip/limit"""
+
+    def __init__(
+        self,
+        response: Response,
+        cursor: Optional[str] = Query(
+            None, description="Curseur renvoyé dans l'en-tête X-Next-Cursor"),
+        skip: int = Query(0, ge=0),
+        limit: int = Query(100, ge=1, description=f"Taille de page ({MAX_PAGE_SIZE} au plus)"),
+    ):
+        self.response = response
+        self.cursor = cursor
+        self.skip = skip
+        self.limit = min(limit, MAX_PAGE_SIZE)
+
+    def paginate(self, query, model, row_key: Callable = None) -> list:
+        """
+        Appliquer le tri, le curseur (ou skip) et la limite à une requête
+
+        Args:
+            query: Requête SQLAlchemy
+            model: Modèle portant les colonnes created_at et id
+            row_key: Extrait l'objet du modèle d'une ligne (requêtes multi-colonnes)
+
+        Returns:
+            Liste des lignes de la page
+        """
+
+        query = query.order_by(model.created_at.desc(), model.id.desc())
+
+        if self.cursor:
+            created_at, row_id = decode_cursor(self.cursor)
+            query = query.filter(
+                tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+        elif self.skip:
+            query = query.offset(self.skip)
+
+        # Une ligne de plus pour savoir s'il existe une page suivante
+        rows = query.limit(self.limit + 1).all()
+
+        if len(rows) > self.limit:
+            rows = rows[:self.limit]
+            last = row_key(rows[-1]) if row_key else rows[-1]
+            if last.created_at is not None:
+                self.response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+                    last.created_at, last.id)
+
+        return rows
+
+    def json_response(self, content) -> FastJSONResponse:
+        """Réponse JSON renvoyée directement, avec les en-têtes de la page (X-Next-Cursor, ETag...)"""
+
+        # Une réponse renvoyée par la route n'hérite pas des en-têtes de self.response
+        response = FastJSONResponse(content)
+        for name, value in self.response.headers.items():
+            if name != "content-length":
+                response.headers[name] = value
+
+        return response
@@ -0,0 +1,83 @@
+"""
+Pool de threads dédié au hachage bcrypt
+
+bcrypt libère le GIL mais occupe un thread pendant toute la durée du calcul.
+Exécuté dans le threadpool d'AnyIO, un pic de connexions bloque tous les threads
+et ralentit les autres routes. Les routes d'authentification attendent donc le
+résultat de ce pool de taille fixe ; au-delà de PASSWORD_HASH_MAX_QUEUE
+demandes en attente, la requête est refusée avec 503.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from fastapi import HTTPException, status
+
+PASSWORD_HASH_WORKERS = max(1, int(os.getenv(
+    "PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))))
+PASSWORD_HASH_MAX_QUEUE = max(0, int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "256")))
+
+
+class PasswordHashPool:
+    """Exécuteur borné avec compteurs de file d'attente"""
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._peak_pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    async def run(self, fn: Callable, *args):
+        """
+        Exécuter fn(*args) dans le pool sans bloquer la boucle d'événements
+
+        Args:
+            fn: Fonction de hachage ou de vérification
+            *args: Arguments de la fonction
+
+        Returns:
+            Résultat de fn
+
+        Raises:
+            HTTPException 503 si la file d'attente est pleine
+        """
+
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Serveur surchargé, veuillez réessayer",
+                    headers={"Retry-After": "1"}
+                )
+            self._pending += 1
+            self._peak_pending = max(self._peak_pending, self._pending)
+
+        try:
+            return await asyncio.wrap_future(self._executor.submit(fn, *args))
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+
+    def stats(self) -> dict:
+        """Métriques du pool (exposées par /health)"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "in_progress": min(self._pending, self.workers),
+                "queued": max(0, self._pending - self.workers),
+                "max_queue": self.max_queue,
+                "peak_pending": self._peak_pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+
+password_pool = PasswordHashPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE)
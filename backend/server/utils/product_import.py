@@ -0,0 +1,317 @@
+"""
+Import du catalogue d'un fournisseur (POST /product/import)
+
+Un fichier CSV (ligne d'en-tête) ou NDJSON (un objet JSON par ligne) est
+chargé en une transaction, sans objets ORM :
+1. COPY ... FROM STDIN du fichier reçu vers une table temporaire (texte brut)
+2. validation en SQL (numéros de ligne des erreurs), dédoublonnage par clé
+   (la dernière ligne du fichier l'emporte)
+3. rattachement aux produits existants : par sku si la ligne en a un, sinon
+   par nom (produit le plus ancien de ce nom)
+4. un UPDATE des produits existants (uniquement les champs fournis et les
+   lignes réellement modifiées), un INSERT ... ON CONFLICT (sku) des nouveaux
+5. alertes de stock de tous les produits touchés en une passe ensembliste
+   (sync_stock_alerts)
+
+Un champ vide (ou une clé absente en NDJSON) garde la valeur actuelle du
+produit, ou la valeur par défaut à la création. image_urls : URLs séparées
+par « | » en CSV, tableau JSON en NDJSON.
+
+Les imports sont sérialisés par un verrou consultatif (deux imports du même
+nouveau produit sans sku ne peuvent pas le créer deux fois). Les triggers de
+notification du catalogue envoient « * » pour un gros import : l'instantané
+(utils/catalog_snapshot.py) se recharge une fois, après le commit.
+"""
+import csv
+import io
+import os
+import re
+from psycopg2 import DataError as CopyDataError
+from sqlalchemy import column, select, table, text
+from sqlalchemy.orm import Session
+from utils.cache import mark_tables_written
+from utils.stock_ledger import set_stock_movement_context
+from utils.stock_manager import sync_stock_alerts
+
+IMPORT_FORMATS = ("csv", "ndjson")
+IMPORT_COLUMNS = (
+    "sku", "name", "description", "price", "quantity_in_stock",
+    "minimum_stock_level", "image_urls", "category_id", "is_active",
+)
+IMPORT_LOCK_KEY = 0x70726f64  # pg_advisory_xact_lock: un import à la fois
+COPY_BUFFER_SIZE = 1 << 18
+# Mémoire de la transaction d'import: tri du dédoublonnage, jointures, insertion
+# dans l'index GIN (liste d'attente de search_vector vidée par lots de work_mem)
+PRODUCT_IMPORT_WORK_MEM = os.getenv("PRODUCT_IMPORT_WORK_MEM", "64MB")
+MAX_REPORTED_ERRORS = 20
+
+_INTEGER = r"^\s*[+-]?\d{1,9}\s*$"
+_PRICE = r"^\s*[+-]?\d{1,8}(\.\d{1,2})?\s*$"
+_BOOLEAN = r"^\s*(t|f|true|false|y|n|yes|no|on|off|1|0)\s*$"
+
+# Lignes du fichier ramenées à des colonnes texte (NULL = champ non fourni)
+_CSV_ROWS = """
+    SELECT line, {columns}, string_to_array(NULLIF(image_urls, ''), '|') AS images,
+           true AS images_valid
+    FROM product_import_raw
+"""
+_NDJSON_ROWS = """
+    SELECT line, {columns},
+           CASE WHEN jsonb_typeof(doc -> 'image_urls') = 'array'
+                THEN ARRAY(SELECT jsonb_array_elements_text(doc -> 'image_urls')) END AS images,
+           coalesce(jsonb_typeof(doc -> 'image_urls') IN ('array', 'null'), true) AS images_valid
+    FROM (SELECT line, doc::jsonb AS doc FROM product_import_raw
+          WHERE btrim(doc) <> '') AS raw
+"""
+
+# (condition d'erreur, message) évaluées sur product_import_rows ; les conversions
+# sont gardées par CASE (l'ordre d'évaluation d'un AND n'est pas garanti)
+_CHECKS = (
+    ("sku IS NULL AND name IS NULL", "sku or name is required"),
+    ("char_length(sku) > 64", "sku is longer than 64 characters"),
+    ("char_length(name) NOT BETWEEN 2 AND 200", "name must be 2 to 200 characters"),
+    ("char_length(description) > 1000", "description is longer than 1000 characters"),
+    (f"price !~ '{_PRICE}'", "price must be a number with at most 2 decimals"),
+    (f"CASE WHEN price ~ '{_PRICE}' THEN price::numeric <= 0 END", "price must be greater than 0"),
+    (f"quantity_in_stock !~ '{_INTEGER}'", "quantity_in_stock must be an integer"),
+    (f"CASE WHEN quantity_in_stock ~ '{_INTEGER}' THEN quantity_in_stock::integer < 0 END",
+     "quantity_in_stock cannot be negative"),
+    (f"minimum_stock_level !~ '{_INTEGER}'", "minimum_stock_level must be an integer"),
+    (f"CASE WHEN minimum_stock_level ~ '{_INTEGER}' THEN minimum_stock_level::integer < 0 END",
+     "minimum_stock_level cannot be negative"),
+    (f"category_id !~ '{_INTEGER}'", "category_id must be an integer"),
+    (f"CASE WHEN category_id ~ '{_INTEGER}' THEN NOT EXISTS "
+     "(SELECT 1 FROM categories c WHERE c.id = category_id::integer) END", "category not found"),
+    (f"is_active !~* '{_BOOLEAN}'", "is_active must be a boolean"),
+    ("NOT images_valid", "image_urls must be an array"),
+    ("cardinality(images) NOT BETWEEN 1 AND 5", "1 to 5 images are required"),
+)
+
+# Lignes dédoublonnées et typées, rattachées au produit existant (product_id)
+_TYPED_ROWS = """
+    CREATE TEMP TABLE product_import ON COMMIT DROP AS
+    SELECT DISTINCT ON (sku IS NULL, coalesce(sku, name))
+        line, sku, name, description,
+        price::numeric(10, 2) AS price,
+        quantity_in_stock::integer AS quantity_in_stock,
+        minimum_stock_level::integer AS minimum_stock_level,
+        images AS image_urls,
+        category_id::integer AS category_id,
+        is_active::boolean AS is_active,
+        NULL::integer AS product_id
+    FROM product_import_rows
+    ORDER BY sku IS NULL, coalesce(sku, name), line DESC
+"""
+_MATCH_BY_SKU = """
+    UPDATE product_import s SET product_id = p.id
+    FROM products p
+    WHERE s.sku IS NOT NULL AND p.sku = s.sku
+"""
+_MATCH_BY_NAME = """
+    UPDATE product_import s SET product_id = p.id
+    FROM (SELECT DISTINCT ON (name) id, name FROM products ORDER BY name, id) p
+    WHERE s.sku IS NULL AND p.name = s.name
+"""
+# Nouveaux produits: champs obligatoires
+_MISSING_REQUIRED = """
+    SELECT line, 'name, price and category_id are required for a new product' AS error
+    FROM product_import
+    WHERE product_id IS NULL AND (name IS NULL OR price IS NULL OR category_id IS NULL)
+    ORDER BY line
+    LIMIT :limit
+"""
+
+_UPDATED_FIELDS = (
+    "sku", "name", "description", "price", "quantity_in_stock",
+    "minimum_stock_level", "image_urls", "category_id", "is_active",
+)
+_UPDATE = """
+    WITH updated AS (
+        UPDATE products p SET {assignments}, updated_at = now()
+        FROM product_import s
+        WHERE p.id = s.product_id
+          AND ({current}) IS DISTINCT FROM ({merged})
+        RETURNING p.id
+    )
+    INSERT INTO product_import_touched (id, inserted) SELECT id, false FROM updated
+"""
+_INSERT = """
+    WITH inserted AS (
+        INSERT INTO products (
+            sku, name, description, price, quantity_in_stock, minimum_stock_level,
+            image_urls, category_id, is_active, admin_id
+        )
+        SELECT sku, name, description, price, coalesce(quantity_in_stock, 0),
+               coalesce(minimum_stock_level, 10), coalesce(image_urls, '{}'), category_id,
+               coalesce(is_active, true), :admin_id
+        FROM product_import
+        WHERE product_id IS NULL
+        ORDER BY line
+        -- sku créé entre-temps par POST /product/ : la ligne importée l'emporte
+        ON CONFLICT (sku) DO UPDATE SET
+            name = EXCLUDED.name,
+            description = EXCLUDED.description,
+            price = EXCLUDED.price,
+            quantity_in_stock = EXCLUDED.quantity_in_stock,
+            minimum_stock_level = EXCLUDED.minimum_stock_level,
+            image_urls = EXCLUDED.image_urls,
+            category_id = EXCLUDED.category_id,
+            is_active = EXCLUDED.is_active,
+            updated_at = now()
+        RETURNING id, xmax = 0 AS inserted
+    )
+    INSERT INTO product_import_touched (id, inserted) SELECT id, inserted FROM inserted
+"""
+
+_touched = table("product_import_touched", column("id"))
+
+
+class ProductImportError(ValueError):
+    """Fichier d'import invalide (message avec les numéros de ligne)"""
+
+
+def _csv_header(file) -> list:
+    """Lire et valider la ligne d'en-tête CSV (le reste du fichier est envoyé à COPY)"""
+
+    header = file.readline().decode("utf-8-sig")
+    columns = [name.strip() for name in next(csv.reader(io.StringIO(header)), [])]
+
+    unknown = [name for name in columns if name not in IMPORT_COLUMNS]
+    if unknown:
+        raise ProductImportError(f"Unknown CSV column(s): {', '.join(unknown)}")
+    if len(set(columns)) != len(columns):
+        raise ProductImportError("Duplicate CSV column in header")
+    if "sku" not in columns and "name" not in columns:
+        raise ProductImportError("CSV header must contain sku or name")
+
+    return columns
+
+
+def _copy(cursor, sql: str, file, first_line: int):
+    """COPY ... FROM STDIN; une ligne mal formée devient une erreur d'import (ligne du fichier)"""
+
+    try:
+        cursor.copy_expert(sql, file, size=COPY_BUFFER_SIZE)
+    except CopyDataError as e:
+        line = re.search(r"line (\d+)", e.diag.context or "")
+        where = f"line {int(line.group(1)) + first_line - 1}: " if line else ""
+        raise ProductImportError(f"{where}{e.diag.message_primary}")
+
+
+def _load_rows(db: Session, cursor, file, file_format: str):
+    """COPY du fichier vers product_import_raw, puis vue texte product_import_rows"""
+
+    if file_format == "csv":
+        columns = _csv_header(file)
+        db.execute(text(
+            "CREATE TEMP TABLE product_import_raw ("
+            "line bigint GENERATED ALWAYS AS IDENTITY (START WITH 2), "
+            + ", ".join(f"{name} text" for name in columns)
+            + ") ON COMMIT DROP"
+        ))
+        _copy(
+            cursor,
+            f"COPY product_import_raw ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            file, first_line=2
+        )
+        present = set(columns)
+        selected = ", ".join(
+            f"NULLIF({name}, '') AS {name}" if name in present else f"NULL::text AS {name}"
+            for name in IMPORT_COLUMNS if name != "image_urls"
+        )
+        if "image_urls" not in present:
+            db.execute(text("ALTER TABLE product_import_raw ADD COLUMN image_urls text"))
+        rows = _CSV_ROWS.format(columns=selected)
+    else:
+        # Une ligne = un champ: ni guillemet ni séparateur possibles dans du JSON
+        db.execute(text(
+            "CREATE TEMP TABLE product_import_raw ("
+            "line bigint GENERATED ALWAYS AS IDENTITY, doc text) ON COMMIT DROP"
+        ))
+        _copy(
+            cursor,
+            "COPY product_import_raw (doc) FROM STDIN "
+            "WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')",
+            file, first_line=1
+        )
+        selected = ", ".join(
+            f"NULLIF(doc ->> '{name}', '') AS {name}"
+            for name in IMPORT_COLUMNS if name != "image_urls"
+        )
+        rows = _NDJSON_ROWS.format(columns=selected)
+
+    db.execute(text(f"CREATE TEMP TABLE product_import_rows ON COMMIT DROP AS {rows}"))
+
+
+def _raise_errors(errors: list):
+    if errors:
+        raise ProductImportError("; ".join(f"line {line}: {error}" for line, error in errors))
+
+
+def import_products(db: Session, file, file_format: str, admin_id: int) -> dict:
+    """
+    Importer (créer ou mettre à jour) des produits depuis un fichier CSV ou NDJSON
+
+    Args:
+        db: Session de base de données
+        file: Fichier binaire (lecture en flux par COPY)
+        file_format: "csv" ou "ndjson"
+        admin_id: Admin propriétaire des produits créés
+
+    Returns:
+        dict avec received, inserted, updated, unchanged, alerts_created, alerts_resolved
+
+    Raises:
+        ProductImportError: Fichier invalide (rien n'est importé)
+    """
+
+    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": IMPORT_LOCK_KEY})
+    db.execute(text("SELECT set_config('work_mem', :work_mem, true)"), {"work_mem": PRODUCT_IMPORT_WORK_MEM})
+    set_stock_movement_context(db, "import", admin_id=admin_id)
+    cursor = db.connection().connection.cursor()
+
+    _load_rows(db, cursor, file, file_format)
+    received = db.execute(text("SELECT count(*) FROM product_import_rows")).scalar()
+
+    # Validation sur le texte brut, en un parcours: toutes les erreurs (bornées) avec leur ligne
+    checks = ", ".join(f"({condition}, '{message}')" for condition, message in _CHECKS)
+    _raise_errors(db.execute(text(
+        f"SELECT line, error FROM product_import_rows "
+        f"CROSS JOIN LATERAL (VALUES {checks}) AS checks (failed, error) "
+        f"WHERE failed ORDER BY line LIMIT :limit"
+    ), {"limit": MAX_REPORTED_ERRORS}).all())
+
+    db.execute(text(_TYPED_ROWS))
+    db.execute(text(_MATCH_BY_SKU))
+    db.execute(text(_MATCH_BY_NAME))
+    # Tables temporaires: jamais analysées par autovacuum, statistiques pour les jointures
+    db.execute(text("ANALYZE product_import"))
+    _raise_errors(db.execute(text(_MISSING_REQUIRED), {"limit": MAX_REPORTED_ERRORS}).all())
+
+    db.execute(text(
+        "CREATE TEMP TABLE product_import_touched (id integer, inserted boolean) ON COMMIT DROP"
+    ))
+    merged = [f"coalesce(s.{field}, p.{field})" for field in _UPDATED_FIELDS]
+    db.execute(text(_UPDATE.format(
+        assignments=", ".join(f"{field} = {value}" for field, value in zip(_UPDATED_FIELDS, merged)),
+        current=", ".join(f"p.{field}" for field in _UPDATED_FIELDS),
+        merged=", ".join(merged)
+    )))
+    db.execute(text(_INSERT), {"admin_id": admin_id})
+    mark_tables_written(db, {"products"})
+
+    inserted, updated = db.execute(text(
+        "SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) "
+        "FROM product_import_touched"
+    )).one()
+
+    alerts = sync_stock_alerts(db, select(_touched.c.id))
+
+    return {
+        "received": received,
+        "inserted": inserted,
+        "updated": updated,
+        "unchanged": db.execute(text("SELECT count(*) FROM product_import")).scalar() - inserted - updated,
+        "alerts_created": alerts["created"],
+        "alerts_resolved": alerts["resolved"],
+    }
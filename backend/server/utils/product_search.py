@@ -0,0 +1,116 @@
+"""
+Recherche de produits (/product/search)
+
+Deux index GIN sur products :
+- ix_products_search_vector : colonne générée search_vector (nom poids A,
+  description poids B), interrogée en préfixe sur le dernier mot (« cha » trouve
+  « chaise ») pour l'autocomplétion
+- ix_products_name_trgm (pg_trgm) : recherche approchée sur le nom, qui tolère
+  les fautes de frappe (« chiase » trouve « chaise »)
+
+Les deux prédicats sont combinés en OR (BitmapOr des deux index) et les
+résultats triés par pertinence : rang plein texte + similarité du nom.
+Seules les SEARCH_MAX_CANDIDATES lignes les plus pertinentes sont paginables :
+le tri top-N garde une mémoire bornée même quand une saisie très courte
+(« ch ») correspond à une grande partie du catalogue ; la saisie suivante affine.
+"""
+import os
+import re
+from typing import Optional
+from sqlalchemy import func, literal, or_, select
+from sqlalchemy.orm import Session
+from models.product import Product
+from models.category import Category
+
+SEARCH_CONFIG = "simple"
+SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", "1000"))
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def prefix_tsquery(q: str) -> Optional[str]:
+    """
+    Construire une requête to_tsquery d'autocomplétion à partir de la saisie
+
+    Les mots déjà tapés doivent correspondre exactement, seul le dernier est un
+    préfixe (en cours de saisie) : les correspondances partielles sont les plus
+    coûteuses dans l'index GIN. Seuls les mots (lettres, chiffres) sont gardés :
+    la saisie ne peut pas injecter d'opérateurs tsquery.
+
+    Args:
+        q: Texte saisi
+
+    Returns:
+        'mot1 & mot2:*', ou None si la saisie ne contient aucun mot
+    """
+
+    words = _WORD.findall(q.lower())
+    if not words:
+        return None
+
+    return " & ".join(words[:-1] + [f"{words[-1]}:*"])
+
+
+def search_products(
+    db: Session,
+    q: str,
+    columns: tuple,
+    category_id: Optional[int] = None,
+    is_active: Optional[bool] = None,
+    skip: int = 0,
+    limit: int = 20
+) -> list:
+    """
+    Chercher des produits par nom et description, triés par pertinence
+
+    Args:
+        db: Session de base de données
+        q: Texte saisi
+        columns: Colonnes de Product à renvoyer
+        category_id: Filtrer par catégorie (optionnel)
+        is_active: Filtrer par état (optionnel)
+        skip: Nombre de résultats à sauter
+        limit: Nombre maximum de résultats
+
+    Returns:
+        Lignes (columns, category_name, rank)
+    """
+
+    q = q.strip()
+    words = prefix_tsquery(q)
+    name_similarity = func.word_similarity(literal(q), Product.name)
+
+    # Recherche approchée sur le nom: q <% name (index trigrammes)
+    conditions = [Product.name.op("%>")(q)]
+    rank = name_similarity
+    if words:
+        tsquery = func.to_tsquery(SEARCH_CONFIG, words)
+        conditions.append(Product.search_vector.op("@@")(tsquery))
+        rank = func.ts_rank_cd(Product.search_vector, tsquery) + name_similarity
+
+    candidates = select(Product.id, rank.label("rank")).where(or_(*conditions))
+
+    if category_id is not None:
+        candidates = candidates.where(Product.category_id == category_id)
+
+    if is_active is not None:
+        candidates = candidates.where(Product.is_active == is_active)
+
+    # Garder les SEARCH_MAX_CANDIDATES lignes les mieux classées (tri top-N), puis
+    # ne lire que la page demandée
+    candidates = candidates.order_by(
+        rank.desc(), Product.id
+    ).limit(SEARCH_MAX_CANDIDATES).subquery()
+    page = select(candidates).order_by(
+        candidates.c.rank.desc(), candidates.c.id
+    ).offset(skip).limit(limit).subquery()
+
+    return db.query(
+        *columns,
+        Category.name.label("category_name"),
+        page.c.rank
+    ).join(
+        page, page.c.id == Product.id
+    ).join(
+        Category, Product.category_id == Category.id
+    ).order_by(page.c.rank.desc(), Product.id).all()
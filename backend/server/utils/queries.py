@@ -0,0 +1,63 @@
+"""
+Construction des requêtes avec chargement anticipé des relations
+
+Chaque profil précise les relations chargées avec la requête principale, pour
+qu'une liste de N lignes coûte un nombre fixe de requêtes au lieu de 1 + N.
+Usage dans les routes: bill_query(db, "with_items").filter(...).all()
+"""
+from sqlalchemy.orm import Session, joinedload, selectinload
+from models.bill import Bill
+from models.payment import Payment
+from models.product import Product
+from models.stock_alert import StockAlert
+
+BILL_LOAD_PROFILES = {
+    "summary": (),
+    "with_items": (
+        selectinload(Bill.bill_items),
+    ),
+    "with_client": (
+        selectinload(Bill.bill_items),
+        joinedload(Bill.client, innerjoin=True),
+    ),
+    "with_payments": (
+        selectinload(Bill.payments),
+    ),
+}
+
+PAYMENT_LOAD_PROFILES = {
+    "summary": (),
+    "with_bill": (
+        joinedload(Payment.bill, innerjoin=True),
+    ),
+}
+
+STOCK_ALERT_LOAD_PROFILES = {
+    "summary": (),
+    "with_product": (
+        joinedload(StockAlert.product, innerjoin=True)
+        .joinedload(Product.category, innerjoin=True),
+    ),
+}
+
+
+def _apply_profile(db: Session, model, profiles: dict, profile: str):
+    if profile not in profiles:
+        raise ValueError(
+            f"Profil de chargement inconnu pour {model.__name__}: {profile}")
+    return db.query(model).options(*profiles[profile])
+
+
+def bill_query(db: Session, profile: str = "summary"):
+    """Requête sur les factures: summary, with_items, with_client, with_payments"""
+    return _apply_profile(db, Bill, BILL_LOAD_PROFILES, profile)
+
+
+def payment_query(db: Session, profile: str = "summary"):
+    """Requête sur les paiements: summary, with_bill"""
+    return _apply_profile(db, Payment, PAYMENT_LOAD_PROFILES, profile)
+
+
+def stock_alert_query(db: Session, profile: str = "with_product"):
+    """Requête sur les alertes de stock: summary, with_product (produit et catégorie)"""
+    return _apply_profile(db, StockAlert, STOCK_ALERT_LOAD_PROFILES, profile)
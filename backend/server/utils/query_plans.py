@@ -0,0 +1,179 @@
+"""
+Contrôle des plans d'exécution des requêtes chaudes des routes
+
+Chaque requête est passée à EXPLAIN. Un « Seq Scan » sur une table de plus de
+PLAN_CHECK_MIN_ROWS lignes (estimation pg_class.reltuples, après ANALYZE) est
+signalé comme régression : il manque un index pour le prédicat de la route.
+
+- python utils/db.py plans : requêtes de route_queries() sur la base configurée
+  (code de sortie 1 en cas de régression), dont celles des tâches de fond
+- tests/test_query_plans.py : base remplie, routes appelées par l'API, chaque
+  SELECT réellement émis passé à seq_scans()
+"""
+import os
+from sqlalchemy import func, or_, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+from models.bill import Bill
+from models.bill_item import BillItem
+from models.client import Client
+from models.client_balance import ClientBalance
+from models.client_balance_day import ClientBalanceDay
+from models.notification import Notification
+from models.otp import OTP
+from models.payment import Payment
+from models.product import Product
+from models.stock_alert import StockAlert
+from models.stock_movement import StockMovement
+from models.stock_snapshot import StockSnapshot
+from models.stock_reservation import StockReservation
+
+PLAN_CHECK_MIN_ROWS = int(os.getenv("PLAN_CHECK_MIN_ROWS", "10000"))
+
+PAGE = 101  # limit + 1 de CursorPage
+
+
+def _page(stmt, model):
+    return stmt.order_by(model.created_at.desc(), model.id.desc()).limit(PAGE)
+
+
+def route_queries() -> dict:
+    """Requêtes des routes, avec des valeurs de paramètres représentatives"""
+
+    return {
+        "GET /bill/all": _page(select(Bill.id, Client.username).join(
+            Client, Bill.client_id == Client.id), Bill),
+        "GET /bill/all?status_filter": _page(select(Bill.id, Client.username).join(
+            Client, Bill.client_id == Client.id).where(Bill.status == "not paid"), Bill),
+        "GET /bill/my-bills": _page(select(Bill).where(Bill.client_id == 1), Bill),
+        "GET /bill/unpaid-bills/count": select(func.count(Bill.id)).where(
+            Bill.client_id == 1, Bill.status == "not paid"),
+        "selectinload Bill.bill_items": select(BillItem).where(BillItem.bill_id.in_([1, 2, 3])),
+        "selectinload Bill.payments": select(Payment).where(Payment.bill_id.in_([1, 2, 3])),
+        "GET /payment/": _page(select(Payment), Payment),
+        "GET /notification/": _page(select(Notification), Notification),
+        "GET /notification/pending": select(Notification).where(
+            Notification.is_sent == False).order_by(Notification.created_at.desc()),
+        "notification dispatcher claim": select(Notification).where(
+            Notification.is_sent == False,
+            Notification.attempts < 5
+        ).order_by(Notification.id).limit(50),
+        "GET /stock-alert/": _page(select(StockAlert), StockAlert),
+        "GET /stock-alert/unresolved": select(StockAlert).where(
+            StockAlert.is_resolved == False).order_by(StockAlert.created_at.desc()),
+        "stock alerts of products": select(StockAlert).where(
+            StockAlert.product_id.in_([1, 2, 3]), StockAlert.is_resolved == False),
+        "GET /product/{id}/stock/movements": _page(
+            select(StockMovement).where(StockMovement.product_id == 1), StockMovement),
+        "GET /product/{id}/stock/at snapshot": select(StockSnapshot).where(
+            StockSnapshot.product_id == 1, StockSnapshot.taken_at <= func.now()
+        ).order_by(StockSnapshot.taken_at.desc()).limit(1),
+        "GET /product/{id}/stock/at movements": select(func.sum(StockMovement.quantity)).where(
+            StockMovement.product_id == 1,
+            StockMovement.created_at > func.now() - text("interval '1 day'"),
+            StockMovement.created_at <= func.now()
+        ),
+        "GET /cart/": select(StockReservation, Product.name).join(
+            Product, Product.id == StockReservation.product_id
+        ).where(StockReservation.client_id == 1),
+        "cart reservation sweeper": select(StockReservation.product_id).where(
+            StockReservation.expires_at <= func.now()
+        ).distinct().order_by(StockReservation.product_id).limit(500),
+        "POST /otp/verify": select(OTP).where(
+            OTP.email == "client@example.com",
+            OTP.otp_code == "123456",
+            OTP.otp_type == "registration",
+            OTP.is_used == False,
+            OTP.expires_at > func.now()
+        ).limit(1),
+        # Servies par l'instantané du catalogue quand il est à jour (sinon par PostgreSQL)
+        "GET /product/": _page(select(Product), Product),
+        "GET /product/?category_id": _page(select(Product).where(Product.category_id == 1), Product),
+        "GET /product/low-stock": select(Product).where(
+            Product.quantity_in_stock <= Product.minimum_stock_level),
+        "GET /product/search": select(Product.id).where(or_(
+            Product.search_vector.op("@@")(func.to_tsquery("simple", "chai:*")),
+            Product.name.op("%>")("chai")
+        )).limit(20),
+        "GET /client/": _page(
+            select(Client, ClientBalance.total_bills, ClientBalance.total_debt).outerjoin(
+                ClientBalance, ClientBalance.client_id == Client.id),
+            Client
+        ),
+        "GET /client/aging": select(ClientBalance.client_id, Client.username).join(
+            Client, Client.id == ClientBalance.client_id
+        ).where(ClientBalance.total_debt > 0).order_by(
+            ClientBalance.total_debt.desc(), ClientBalance.client_id.desc()).limit(100),
+        "GET /client/aging buckets": select(
+            ClientBalanceDay.client_id, func.sum(ClientBalanceDay.debt)
+        ).where(
+            ClientBalanceDay.client_id.in_([1, 2, 3]), ClientBalanceDay.debt != 0
+        ).group_by(ClientBalanceDay.client_id),
+    }
+
+
+def _seq_scans(plan: dict) -> list:
+    """Tables parcourues séquentiellement dans un plan EXPLAIN (FORMAT JSON)"""
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+def table_rows(db: Session) -> dict:
+    """Lignes estimées (pg_class.reltuples) de chaque table du schéma public"""
+
+    return dict(db.execute(text(
+        "SELECT relname, reltuples FROM pg_class "
+        "WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace"
+    )).all())
+
+
+def seq_scans(connection, statement: str, parameters=None, rows: dict = None,
+              min_rows: int = PLAN_CHECK_MIN_ROWS) -> list:
+    """
+    Grandes tables parcourues séquentiellement par une requête SQL
+
+    Args:
+        connection: Connexion SQLAlchemy
+        statement: SQL tel qu'envoyé au pilote (paramètres du pilote)
+        parameters: Paramètres de la requête
+        rows: Lignes estimées par table (table_rows)
+        min_rows: Taille à partir de laquelle un Seq Scan est refusé
+
+    Returns:
+        Tables de plus de min_rows lignes parcourues séquentiellement
+    """
+
+    plan = connection.exec_driver_sql(
+        "EXPLAIN (FORMAT JSON) " + statement, parameters or {}
+    ).scalar()[0]["Plan"]
+
+    return [table for table in _seq_scans(plan) if (rows or {}).get(table, 0) >= min_rows]
+
+
+def check_query_plans(db: Session, min_rows: int = PLAN_CHECK_MIN_ROWS) -> list:
+    """
+    Passer chaque requête des routes à EXPLAIN
+
+    Args:
+        db: Session de base de données
+        min_rows: Taille (lignes estimées) à partir de laquelle un Seq Scan est refusé
+
+    Returns:
+        Liste de dicts {name, seq_scans, ok}
+    """
+
+    rows = table_rows(db)
+    connection = db.connection()
+    results = []
+
+    for name, stmt in route_queries().items():
+        compiled = stmt.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"render_postcompile": True})
+        large_scans = seq_scans(connection, str(compiled), compiled.params, rows, min_rows)
+        results.append({"name": name, "seq_scans": large_scans, "ok": not large_scans})
+
+    return results
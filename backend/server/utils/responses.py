@@ -0,0 +1,43 @@
+"""
+Encodage JSON rapide des réponses (orjson)
+
+FastJSONResponse est la classe de réponse par défaut de l'application : orjson
+encode en C les dicts, listes, datetime et entiers. Les Decimal sont encodés en
+chaîne ("10.00"), comme Pydantic, et les datetime UTC avec le suffixe Z : le
+format des réponses ne change pas.
+
+Les grandes listes (factures, produits, statistiques) lisent des tuples de
+colonnes et renvoient directement FastJSONResponse(rows_as_dicts(...)) : FastAPI
+ne revalide pas ces données internes avec response_model, qui reste déclaré
+pour la documentation OpenAPI.
+"""
+from decimal import Decimal
+from typing import Any, Iterable, List
+import orjson
+from fastapi.responses import JSONResponse
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any):
+    """Types non gérés nativement par orjson"""
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type non sérialisable en JSON: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Encoder un contenu en JSON (bytes UTF-8)"""
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """Réponse JSON encodée avec orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def rows_as_dicts(rows: Iterable) -> List[dict]:
+    """Convertir des lignes SQLAlchemy (Row) en dicts, sans validation"""
+    return [row._asdict() for row in rows]
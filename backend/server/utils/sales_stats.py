@@ -0,0 +1,172 @@
+"""
+Agrégats journaliers des factures (table bill_daily_stats)
+
+Chaque écriture sur une facture applique à la ligne de son jour la différence
+entre l'état avant et l'état après, avec un INSERT ... ON CONFLICT DO UPDATE
+dans la même transaction. Les statistiques mensuelles et annuelles ne somment
+ensuite que quelques centaines de lignes journalières.
+
+Les mêmes variations alimentent les soldes des clients (utils/client_balances.py).
+
+Reconstruction complète (backfill): python utils/db.py stats
+"""
+from decimal import Decimal
+from sqlalchemy import Date, case, cast, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from models.bill import Bill
+from models.bill_daily_stat import BillDailyStat
+from utils.client_balances import record_client_balances
+
+STAT_FIELDS = (
+    "total_bills",
+    "total_revenue",
+    "total_paid",
+    "total_pending",
+    "paid_bills",
+    "unpaid_bills",
+)
+
+
+def bill_stats_snapshot(bill: Bill) -> dict:
+    """Contribution d'une facture aux agrégats de son jour"""
+    return {
+        "total_bills": 1,
+        "total_revenue": bill.total_amount or Decimal('0.00'),
+        "total_paid": bill.total_paid or Decimal('0.00'),
+        "total_pending": bill.total_remaining or Decimal('0.00'),
+        "paid_bills": 1 if bill.status == "paid" else 0,
+        "unpaid_bills": 1 if bill.status == "not paid" else 0,
+    }
+
+
+def _upsert_stat_deltas(db: Session, rows: list):
+    """INSERT ... ON CONFLICT (day) DO UPDATE qui ajoute des variations journalières"""
+
+    stmt = insert(BillDailyStat).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BillDailyStat.day],
+        set_={
+            field: getattr(BillDailyStat, field) + getattr(stmt.excluded, field)
+            for field in STAT_FIELDS
+        }
+    )
+    db.execute(stmt)
+
+
+def record_bill_stats(db: Session, bill: Bill, before: dict = None, deleted: bool = False):
+    """
+    Appliquer la variation d'une facture à bill_daily_stats (sans commit)
+
+    Args:
+        db: Session de base de données
+        bill: Facture (created_at doit être renseigné, donc après flush)
+        before: Snapshot avant modification (None pour une nouvelle facture)
+        deleted: True si la facture est supprimée
+    """
+
+    after = None if deleted else bill_stats_snapshot(bill)
+    delta = {
+        field: (after[field] if after else 0) - (before[field] if before else 0)
+        for field in STAT_FIELDS
+    }
+
+    if not any(delta.values()):
+        return
+
+    day = bill.created_at.date()
+    _upsert_stat_deltas(db, [{"day": day, **delta}])
+    record_client_balances(db, [(bill.client_id, day, delta["total_bills"], delta["total_pending"])])
+
+
+def record_bills_stats(db: Session, changes: list):
+    """
+    Appliquer en une requête la variation de plusieurs factures (sans commit)
+
+    Args:
+        db: Session de base de données
+        changes: Liste de couples (before, after): états d'une facture avant et après
+                 modification (objets ou lignes avec created_at, montants et status ;
+                 client_id pour after)
+    """
+
+    per_day = {}
+    balances = []
+    for before, after in changes:
+        snapshot_before = bill_stats_snapshot(before)
+        snapshot_after = bill_stats_snapshot(after)
+        day = after.created_at.date()
+        delta = per_day.setdefault(day, dict.fromkeys(STAT_FIELDS, 0))
+        for field in STAT_FIELDS:
+            delta[field] += snapshot_after[field] - snapshot_before[field]
+        balances.append((after.client_id, day, 0,
+                         snapshot_after["total_pending"] - snapshot_before["total_pending"]))
+
+    rows = [{"day": day, **delta} for day, delta in per_day.items() if any(delta.values())]
+    if rows:
+        _upsert_stat_deltas(db, rows)
+    record_client_balances(db, balances)
+
+
+def _daily_aggregates():
+    """Colonnes d'agrégation des factures par jour (même calcul que bill_stats_snapshot)"""
+    day = cast(Bill.created_at, Date)
+    return day, (
+        day.label("day"),
+        func.count(Bill.id).label("total_bills"),
+        func.coalesce(func.sum(Bill.total_amount), 0).label("total_revenue"),
+        func.coalesce(func.sum(Bill.total_paid), 0).label("total_paid"),
+        func.coalesce(func.sum(Bill.total_remaining), 0).label("total_pending"),
+        func.count(case((Bill.status == "paid", 1))).label("paid_bills"),
+        func.count(case((Bill.status == "not paid", 1))).label("unpaid_bills"),
+    )
+
+
+def remove_client_bills_from_stats(db: Session, client_id: int):
+    """
+    Retirer des agrégats toutes les factures d'un client (avant sa suppression)
+
+    Args:
+        db: Session de base de données
+        client_id: ID du client
+    """
+
+    day, columns = _daily_aggregates()
+    per_day = select(*columns).where(
+        Bill.client_id == client_id
+    ).group_by(day).subquery()
+
+    db.execute(
+        update(BillDailyStat)
+        .where(BillDailyStat.day == per_day.c.day)
+        .values({
+            field: getattr(BillDailyStat, field) - getattr(per_day.c, field)
+            for field in STAT_FIELDS
+        })
+        .execution_options(synchronize_session=False)
+    )
+
+
+def rebuild_bill_daily_stats(db: Session) -> int:
+    """
+    Reconstruire entièrement bill_daily_stats à partir de la table bills
+
+    Args:
+        db: Session de base de données
+
+    Returns:
+        Nombre de jours recalculés
+    """
+
+    day, columns = _daily_aggregates()
+
+    db.execute(delete(BillDailyStat))
+    result = db.execute(
+        insert(BillDailyStat).from_select(
+            ["day", *STAT_FIELDS],
+            select(*columns).group_by(day)
+        )
+    )
+    db.commit()
+
+    return result.rowcount
@@ -0,0 +1,209 @@
+"""
+Pool de connexions SMTP persistantes
+
+Ouvrir une connexion coûte une connexion TCP, STARTTLS et AUTH, soit plusieurs
+centaines de millisecondes par email. Le pool garde les connexions ouvertes
+entre deux envois :
+- une connexion inactive depuis plus de SMTP_POOL_KEEPALIVE secondes est
+  vérifiée avec NOOP avant d'être réutilisée, et fermée après
+  SMTP_POOL_MAX_IDLE secondes d'inactivité
+- une connexion est fermée après SMTP_POOL_MAX_MESSAGES messages
+- une déconnexion pendant l'envoi ouvre une nouvelle connexion et réessaie une fois
+
+Usage: get_smtp_pool(host, port, username, password).send_message(message)
+"""
+import os
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from email.message import Message
+
+SMTP_POOL_SIZE = max(1, int(os.getenv("SMTP_POOL_SIZE", "4")))
+SMTP_POOL_MAX_MESSAGES = max(1, int(os.getenv("SMTP_POOL_MAX_MESSAGES", "100")))
+SMTP_POOL_KEEPALIVE = float(os.getenv("SMTP_POOL_KEEPALIVE", "30"))
+SMTP_POOL_MAX_IDLE = float(os.getenv("SMTP_POOL_MAX_IDLE", "300"))
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+
+
+def is_connection_error(error: Exception) -> bool:
+    """Vrai si l'erreur rend la connexion inutilisable (et non un refus du serveur)"""
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    # SMTPException hérite de OSError: ne garder que les erreurs réseau
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class _PooledConnection:
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.messages = 0
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.smtp.quit()
+        except Exception:
+            try:
+                self.smtp.close()
+            except Exception:
+                pass
+
+
+class SMTPConnectionPool:
+    """Connexions SMTP réutilisables pour un serveur et un compte"""
+
+    def __init__(self, host: str, port: int, username: str = None, password: str = None,
+                 starttls: bool = True, max_size: int = SMTP_POOL_SIZE,
+                 max_messages: int = SMTP_POOL_MAX_MESSAGES):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.max_messages = max_messages
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._opened = 0
+        self._reused = 0
+
+    def _connect(self) -> _PooledConnection:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.username and self.password:
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+
+        with self._lock:
+            self._opened += 1
+
+        return _PooledConnection(smtp)
+
+    def _is_alive(self, conn: _PooledConnection) -> bool:
+        idle = time.monotonic() - conn.last_used
+        if idle > SMTP_POOL_MAX_IDLE:
+            return False
+        if idle > SMTP_POOL_KEEPALIVE:
+            try:
+                return conn.smtp.noop()[0] == 250
+            except Exception:
+                return False
+        return True
+
+    def _acquire(self) -> _PooledConnection:
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self._connect()
+            if self._is_alive(conn):
+                with self._lock:
+                    self._reused += 1
+                return conn
+            conn.close()
+
+    def _release(self, conn: _PooledConnection):
+        conn.messages += 1
+        conn.last_used = time.monotonic()
+        if conn.messages >= self.max_messages:
+            conn.close()
+            return
+        with self._lock:
+            self._idle.append(conn)
+
+    @contextmanager
+    def connection(self):
+        """Emprunter une connexion (rendue au pool, ou fermée si elle a échoué)"""
+
+        self._slots.acquire()
+        try:
+            conn = self._acquire()
+            try:
+                yield conn.smtp
+            except Exception as e:
+                if is_connection_error(e):
+                    conn.close()
+                else:
+                    # Refus du serveur (destinataire...): la connexion reste utilisable
+                    self._release(conn)
+                raise
+            else:
+                self._release(conn)
+        finally:
+            self._slots.release()
+
+    def send_message(self, message: Message, from_addr: str = None, to_addrs=None):
+        """
+        Envoyer un message, avec une nouvelle tentative si la connexion était coupée
+
+        Args:
+            message: Message email (From/To utilisés par défaut)
+            from_addr: Expéditeur de l'enveloppe (optionnel)
+            to_addrs: Destinataires de l'enveloppe (optionnel)
+        """
+
+        try:
+            with self.connection() as smtp:
+                smtp.send_message(message, from_addr, to_addrs)
+        except Exception as e:
+            if not is_connection_error(e):
+                raise
+            with self.connection() as smtp:
+                smtp.send_message(message, from_addr, to_addrs)
+
+    def close_all(self):
+        """Fermer les connexions inactives"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "idle": len(self._idle),
+                "opened": self._opened,
+                "reused": self._reused,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_smtp_pool(host: str, port: int, username: str = None, password: str = None,
+                  starttls: bool = True) -> SMTPConnectionPool:
+    """
+    Obtenir le pool partagé pour un serveur et un compte SMTP
+
+    Args:
+        host: Serveur SMTP
+        port: Port SMTP
+        username: Identifiant (pas d'AUTH si vide)
+        password: Mot de passe
+        starttls: Activer STARTTLS
+
+    Returns:
+        Pool de connexions SMTP
+    """
+
+    key = (host, port, username, password, starttls)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SMTPConnectionPool(host, port, username, password, starttls)
+            _pools[key] = pool
+        return pool
+
+
+def close_smtp_pools():
+    """Fermer toutes les connexions (arrêt de l'application)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
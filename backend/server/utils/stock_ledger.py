@@ -0,0 +1,194 @@
+"""
+Journal des mouvements de stock (tables stock_movements et stock_snapshots)
+
+products.quantity_in_stock reste le solde courant (lecture O(1), verrou de
+ligne pour refuser la survente). Chaque instruction qui le modifie ajoute ses
+mouvements à stock_movements en une seule insertion, depuis le trigger
+record_stock_movements : ventes, inventaires, imports et SQL brut compris.
+Le motif et les références du mouvement sont posés pour la transaction par
+set_stock_movement_context (« adjustment » par défaut, « initial » à la
+création d'un produit).
+
+Les instantanés (stock_snapshots) compactent le journal : le stock d'un
+produit à une date T est l'instantané le plus récent avant T plus les seuls
+mouvements entre les deux, quelle que soit la taille de l'historique.
+
+Compaction périodique: python utils/db.py stock-snapshots
+"""
+import os
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+from models.product import Product
+from models.stock_movement import StockMovement
+from models.stock_snapshot import StockSnapshot
+
+# Motifs des mouvements
+STOCK_MOVEMENT_REASONS = ("initial", "sale", "restock", "adjustment", "import")
+
+# Mouvements accumulés depuis le dernier instantané avant d'en prendre un nouveau
+STOCK_SNAPSHOT_MIN_MOVEMENTS = max(1, int(os.getenv("STOCK_SNAPSHOT_MIN_MOVEMENTS", "50")))
+# Produits verrouillés (FOR SHARE) par transaction de compaction
+STOCK_SNAPSHOT_BATCH_SIZE = max(1, int(os.getenv("STOCK_SNAPSHOT_BATCH_SIZE", "1000")))
+
+
+def set_stock_movement_context(db: Session, reason: str, bill_id: int = None, admin_id: int = None):
+    """
+    Poser le motif et les références des mouvements de stock de la transaction
+
+    Les valeurs (set_config locales) sont lues par le trigger
+    record_stock_movements jusqu'à la fin de la transaction.
+
+    Args:
+        db: Session de base de données
+        reason: Motif (voir STOCK_MOVEMENT_REASONS)
+        bill_id: Facture à l'origine du mouvement (optionnel)
+        admin_id: Admin à l'origine du mouvement (optionnel)
+    """
+
+    if reason not in STOCK_MOVEMENT_REASONS:
+        raise ValueError(f"Motif de mouvement de stock invalide: {reason}")
+
+    db.execute(
+        text(
+            "SELECT set_config('stock.movement_reason', :reason, true), "
+            "set_config('stock.movement_bill_id', :bill_id, true), "
+            "set_config('stock.movement_admin_id', :admin_id, true)"
+        ),
+        {
+            "reason": reason,
+            "bill_id": str(bill_id) if bill_id is not None else "",
+            "admin_id": str(admin_id) if admin_id is not None else "",
+        }
+    )
+
+
+def stock_at(db: Session, product_id: int, at: datetime) -> Optional[dict]:
+    """
+    Stock d'un produit à une date donnée
+
+    Args:
+        db: Session de base de données
+        product_id: ID du produit
+        at: Date (avec fuseau horaire)
+
+    Returns:
+        dict avec quantity_in_stock, snapshot_at (instantané utilisé, ou None)
+        et movements (nombre de mouvements ajoutés à l'instantané), ou None si
+        la date précède le début du journal pour ce produit
+    """
+
+    snapshot = db.execute(
+        select(StockSnapshot).where(
+            StockSnapshot.product_id == product_id,
+            StockSnapshot.taken_at <= at
+        ).order_by(StockSnapshot.taken_at.desc()).limit(1)
+    ).scalar_one_or_none()
+
+    if snapshot is None:
+        # Produit antérieur au journal : son état initial est l'instantané movement_id = 0
+        started_at = db.execute(
+            select(func.min(StockSnapshot.taken_at)).where(
+                StockSnapshot.product_id == product_id,
+                StockSnapshot.movement_id == 0
+            )
+        ).scalar()
+        if started_at is not None:
+            return None
+
+    movements = select(
+        func.coalesce(func.sum(StockMovement.quantity), 0),
+        func.count()
+    ).where(
+        StockMovement.product_id == product_id,
+        StockMovement.created_at <= at
+    )
+    if snapshot is not None:
+        movements = movements.where(StockMovement.created_at > snapshot.taken_at)
+
+    delta, count = db.execute(movements).one()
+
+    return {
+        "quantity_in_stock": (snapshot.quantity if snapshot else 0) + delta,
+        "snapshot_at": snapshot.taken_at if snapshot else None,
+        "movements": count,
+    }
+
+
+def compact_stock_snapshots(
+    db: Session,
+    min_movements: int = STOCK_SNAPSHOT_MIN_MOVEMENTS,
+    batch_size: int = STOCK_SNAPSHOT_BATCH_SIZE
+) -> int:
+    """
+    Prendre un instantané des produits ayant accumulé des mouvements
+
+    Chaque lot de produits est verrouillé (FOR SHARE) le temps d'une courte
+    transaction : aucun mouvement de ces produits n'est alors en cours, et
+    leur stock courant est exactement l'instantané du journal à cet instant.
+
+    Args:
+        db: Session de base de données
+        min_movements: Mouvements depuis le dernier instantané à partir desquels
+                       un produit est compacté
+        batch_size: Produits par transaction
+
+    Returns:
+        Nombre d'instantanés créés
+    """
+
+    # Parcours des index (product_id, taken_at) et (product_id, created_at, id),
+    # borné par min_movements pour chaque produit
+    product_ids = db.execute(
+        text("""
+            SELECT p.id
+            FROM products p
+            LEFT JOIN LATERAL (
+                SELECT s.taken_at FROM stock_snapshots s
+                WHERE s.product_id = p.id
+                ORDER BY s.taken_at DESC LIMIT 1
+            ) s ON true
+            CROSS JOIN LATERAL (
+                SELECT count(*) AS n FROM (
+                    SELECT 1 FROM stock_movements m
+                    WHERE m.product_id = p.id
+                      AND m.created_at > coalesce(s.taken_at, '-infinity')
+                    LIMIT :min_movements
+                ) recent
+            ) m
+            WHERE m.n >= :min_movements
+            ORDER BY p.id
+        """),
+        {"min_movements": min_movements}
+    ).scalars().all()
+    db.commit()
+
+    created = 0
+    for start in range(0, len(product_ids), batch_size):
+        batch = product_ids[start:start + batch_size]
+
+        db.execute(
+            select(Product.id).where(Product.id.in_(batch))
+            .order_by(Product.id).with_for_update(read=True)
+        ).all()
+
+        # Instruction distincte du verrouillage : son instantané MVCC voit les
+        # mouvements validés par les transactions attendues
+        created += db.execute(
+            text("""
+                INSERT INTO stock_snapshots (product_id, taken_at, quantity, movement_id)
+                SELECT p.id, clock_timestamp(), p.quantity_in_stock, coalesce(m.id, 0)
+                FROM products p
+                LEFT JOIN LATERAL (
+                    SELECT m.id FROM stock_movements m
+                    WHERE m.product_id = p.id
+                    ORDER BY m.created_at DESC, m.id DESC LIMIT 1
+                ) m ON true
+                WHERE p.id = ANY(CAST(:ids AS integer[]))
+            """),
+            {"ids": batch}
+        ).rowcount
+        db.commit()
+
+    return created
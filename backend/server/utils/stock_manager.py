@@ -1,7 +1,28 @@
+from datetime import datetime
+from sqlalchemy import case, func, select, text, update
 from sqlalchemy.orm import Session
+from models.admin import Admin
+from models.category import Category
 from models.product import Product
 from models.stock_alert import StockAlert
-from utils.notification_manager import create_stock_alert_notification
+from models.stock_reservation import StockReservation
+from utils.cache import mark_tables_written
+from utils.notification_manager import create_stock_alert_notification, stock_alert_admin_message
+from utils.stock_ledger import set_stock_movement_context
+
+def _required_alert_type(product: Product):
+    """Type d'alerte attendu pour le niveau de stock actuel (None si le stock est suffisant)"""
+    if product.quantity_in_stock <= 0:
+        return "out_of_stock"
+    if product.quantity_in_stock <= product.minimum_stock_level:
+        return "low_stock"
+    return None
+
+def _alert_message(product: Product, alert_type: str) -> str:
+    """Message de l'alerte de stock"""
+    if alert_type == "out_of_stock":
+        return f"CRITIQUE: Le produit '{product.name}' est en rupture de stock (0 unités restantes)"
+    return f"ATTENTION: Le produit '{product.name}' a un stock faible ({product.quantity_in_stock} unités restantes, minimum recommandé: {product.minimum_stock_level})"
 
 def check_and_create_stock_alert(db: Session, product: Product) -> StockAlert:
     """
@@ -32,7 +53,7 @@ def check_and_create_stock_alert(db: Session, product: Product) -> StockAlert:
             alert = StockAlert(
                 product_id=product.id,
                 alert_type="out_of_stock",
-                message=f"CRITIQUE: Le produit '{product.name}' est en rupture de stock (0 unités restantes)"
+                message=_alert_message(product, "out_of_stock")
             )
             db.add(alert)
             db.commit()
@@ -54,7 +75,7 @@ def check_and_create_stock_alert(db: Session, product: Product) -> StockAlert:
             alert = StockAlert(
                 product_id=product.id,
                 alert_type="low_stock",
-                message=f"ATTENTION: Le produit '{product.name}' a un stock faible ({product.quantity_in_stock} unités restantes, minimum recommandé: {product.minimum_stock_level})"
+                message=_alert_message(product, "low_stock")
             )
             db.add(alert)
             db.commit()
@@ -67,13 +88,258 @@ def check_and_create_stock_alert(db: Session, product: Product) -> StockAlert:
     
     # Si le stock est suffisant, résoudre les alertes existantes
     elif existing_alert:
-        from datetime import datetime
         existing_alert.is_resolved = True
         existing_alert.resolved_at = datetime.now()
         db.commit()
     
     return None
 
+def check_and_create_stock_alerts(db: Session, products: list) -> list:
+    """
+    Version groupée de check_and_create_stock_alert pour plusieurs produits
+    
+    Charge les alertes non résolues de tous les produits en une seule requête
+    et ne valide pas la transaction : l'appelant fait un seul commit.
+    
+    Args:
+        db: Session de base de données
+        products: Produits à vérifier (stock déjà à jour)
+        
+    Returns:
+        Liste des alertes créées
+    """
+    
+    if not products:
+        return []
+    
+    existing_alerts = {
+        alert.product_id: alert
+        for alert in db.query(StockAlert).filter(
+            StockAlert.product_id.in_([p.id for p in products]),
+            StockAlert.is_resolved == False
+        ).all()
+    }
+    
+    new_alerts = []
+    for product in products:
+        alert_type = _required_alert_type(product)
+        existing_alert = existing_alerts.get(product.id)
+        
+        # Stock suffisant : résoudre l'alerte existante
+        if alert_type is None:
+            if existing_alert:
+                existing_alert.is_resolved = True
+                existing_alert.resolved_at = datetime.now()
+            continue
+        
+        if existing_alert and existing_alert.alert_type == alert_type:
+            continue
+        
+        if existing_alert:
+            existing_alert.is_resolved = True
+        
+        alert = StockAlert(
+            product_id=product.id,
+            alert_type=alert_type,
+            message=_alert_message(product, alert_type)
+        )
+        db.add(alert)
+        new_alerts.append((alert, product))
+    
+    if not new_alerts:
+        return []
+    
+    db.flush()
+    
+    # Charger les admins et les catégories une seule fois pour toutes les notifications
+    admins = db.query(Admin).all()
+    db.query(Category).filter(
+        Category.id.in_({product.category_id for _, product in new_alerts})
+    ).all()
+    
+    for alert, product in new_alerts:
+        create_stock_alert_notification(db, alert, product, admins=admins, commit=False)
+    
+    return [alert for alert, _ in new_alerts]
+
+def sync_stock_alerts(db: Session, product_ids) -> dict:
+    """
+    Version ensembliste de check_and_create_stock_alerts, pour les écritures
+    massives (import du catalogue)
+    
+    Quatre requêtes quel que soit le nombre de produits, sans objets ORM :
+    résolution des alertes obsolètes par un UPDATE, lecture des produits à
+    alerter, puis insertion des alertes et de leurs notifications. Ne valide pas la
+    transaction : l'appelant fait un seul commit.
+    
+    Args:
+        db: Session de base de données
+        product_ids: Liste d'ids ou sous-requête select() des produits à vérifier
+        
+    Returns:
+        dict avec 'created' et 'resolved' (nombre d'alertes)
+    """
+    
+    required_type = case(
+        (Product.quantity_in_stock <= 0, "out_of_stock"),
+        (Product.quantity_in_stock <= Product.minimum_stock_level, "low_stock"),
+        else_=None
+    )
+    
+    # Alertes ouvertes dont le type ne correspond plus au stock (date de résolution
+    # seulement si le stock est redevenu suffisant, comme check_and_create_stock_alert)
+    resolved = db.execute(
+        update(StockAlert)
+        .where(
+            StockAlert.product_id == Product.id,
+            Product.id.in_(product_ids),
+            StockAlert.is_resolved == False,
+            required_type.is_distinct_from(StockAlert.alert_type)
+        )
+        .values(is_resolved=True, resolved_at=case((required_type.is_(None), func.now())))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    
+    # Produits en stock faible sans alerte ouverte
+    open_alert = select(StockAlert.id).where(
+        StockAlert.product_id == Product.id,
+        StockAlert.is_resolved == False
+    ).exists()
+    rows = db.execute(
+        select(
+            Product.id,
+            Product.name,
+            Product.quantity_in_stock,
+            Product.minimum_stock_level,
+            Category.name.label("category_name"),
+            required_type.label("alert_type")
+        )
+        .join(Category, Product.category_id == Category.id)
+        .where(Product.id.in_(product_ids), required_type.is_not(None), ~open_alert)
+    ).all()
+    
+    if not rows:
+        return {"created": 0, "resolved": resolved}
+    
+    # Une instruction par table: les lignes sont passées en tableaux à unnest
+    messages = [_alert_message(row, row.alert_type) for row in rows]
+    alert_ids = dict(db.execute(text("""
+        INSERT INTO stock_alerts (product_id, alert_type, message, is_resolved)
+        SELECT product_id, alert_type, message, false
+        FROM unnest(CAST(:product_ids AS integer[]), CAST(:alert_types AS text[]),
+                    CAST(:messages AS text[])) AS alert (product_id, alert_type, message)
+        RETURNING product_id, id
+    """), {
+        "product_ids": [row.id for row in rows],
+        "alert_types": [row.alert_type for row in rows],
+        "messages": messages
+    }).all())
+    
+    # Notifications des admins, comme create_stock_alert_notification
+    admins = db.query(Admin).all()
+    notifications = {"admin_ids": [], "alert_ids": [], "channels": [], "messages": []}
+    for row, message in zip(rows, messages):
+        admin_message = stock_alert_admin_message(row.alert_type, message, row, row.category_name)
+        for admin in admins:
+            channels = []
+            if admin.email:
+                channels.append("email")
+            if admin.phone_number and row.alert_type == "out_of_stock":
+                channels.append("whatsapp")
+            for channel in channels:
+                notifications["admin_ids"].append(admin.id)
+                notifications["alert_ids"].append(alert_ids[row.id])
+                notifications["channels"].append(channel)
+                notifications["messages"].append(admin_message)
+    
+    db.execute(text("""
+        INSERT INTO notifications (admin_id, stock_alert_id, notification_type, channel, message, is_sent)
+        SELECT admin_id, stock_alert_id, 'stock_alert', channel, message, false
+        FROM unnest(CAST(:admin_ids AS integer[]), CAST(:alert_ids AS integer[]),
+                    CAST(:channels AS text[]), CAST(:messages AS text[]))
+            AS notification (admin_id, stock_alert_id, channel, message)
+    """), notifications)
+    mark_tables_written(db, {"stock_alerts", "notifications"})
+    
+    return {"created": len(alert_ids), "resolved": resolved}
+
+def apply_stock_adjustments(db: Session, adjustments: list, admin_id: int = None) -> dict:
+    """
+    Appliquer un inventaire (quantités comptées ou variations) en une transaction
+    
+    Les produits sont verrouillés dans l'ordre des ids (pas d'interblocage entre
+    deux inventaires simultanés), mis à jour par un seul UPDATE ... FROM unnest,
+    puis leurs alertes de stock synchronisées (sync_stock_alerts) avant un
+    unique commit. Une ligne refusée (produit inconnu, stock négatif) n'empêche
+    pas l'application des autres.
+    
+    Args:
+        db: Session de base de données
+        adjustments: Lignes avec product_id et quantity (absolue) ou delta
+        admin_id: Admin à l'origine de l'inventaire (journal des mouvements)
+        
+    Returns:
+        dict avec les compteurs (updated, unchanged, rejected, alerts_created,
+        alerts_resolved) et results: le résultat de chaque ligne, dans l'ordre reçu
+    """
+    
+    current = dict(db.execute(
+        select(Product.id, Product.quantity_in_stock)
+        .where(Product.id.in_([item.product_id for item in adjustments]))
+        .order_by(Product.id)
+        .with_for_update()
+    ).all())
+    
+    results, changes = [], {}
+    for item in adjustments:
+        previous = current.get(item.product_id)
+        if previous is None:
+            results.append({"product_id": item.product_id, "status": "not_found"})
+            continue
+        
+        quantity = item.quantity if item.quantity is not None else previous + item.delta
+        if quantity < 0:
+            status = "negative_stock"
+            quantity = previous
+        elif quantity == previous:
+            status = "unchanged"
+        else:
+            status = "updated"
+            changes[item.product_id] = quantity
+        
+        results.append({
+            "product_id": item.product_id,
+            "status": status,
+            "previous_quantity": previous,
+            "quantity_in_stock": quantity
+        })
+    
+    alerts = {"created": 0, "resolved": 0}
+    if changes:
+        set_stock_movement_context(db, "adjustment", admin_id=admin_id)
+        db.execute(text("""
+            UPDATE products p SET quantity_in_stock = c.quantity, updated_at = now()
+            FROM unnest(CAST(:ids AS integer[]), CAST(:quantities AS integer[])) AS c (id, quantity)
+            WHERE p.id = c.id
+        """), {"ids": list(changes), "quantities": list(changes.values())})
+        mark_tables_written(db, {"products"})
+        alerts = sync_stock_alerts(db, list(changes))
+    
+    db.commit()
+    
+    counts = {"updated": 0, "unchanged": 0}
+    for result in results:
+        if result["status"] in counts:
+            counts[result["status"]] += 1
+    
+    return {
+        **counts,
+        "rejected": len(results) - counts["updated"] - counts["unchanged"],
+        "alerts_created": alerts["created"],
+        "alerts_resolved": alerts["resolved"],
+        "results": results
+    }
+
 def check_product_availability(db: Session, product_id: int, quantity: int) -> dict:
     """
     Vérifier si un produit est disponible en quantité suffisante
@@ -101,10 +367,19 @@ def check_product_availability(db: Session, product_id: int, quantity: int) -> d
             "message": f"Le produit '{product.name}' n'est pas disponible"
         }
     
-    if product.quantity_in_stock < quantity:
+    # Stock réservé par les paniers (products.quantity_reserved) non disponible,
+    # hors réservations expirées que le balayeur n'a pas encore libérées
+    expired = db.execute(
+        select(func.coalesce(func.sum(StockReservation.quantity), 0)).where(
+            StockReservation.product_id == product_id,
+            StockReservation.expires_at <= func.now()
+        )
+    ).scalar_one()
+    available = product.quantity_in_stock - product.quantity_reserved + expired
+    if available < quantity:
         return {
             "available": False,
-            "message": f"Stock insuffisant pour '{product.name}'. Stock disponible: {product.quantity_in_stock}, demandé: {quantity}"
+            "message": f"Stock insuffisant pour '{product.name}'. Stock disponible: {max(available, 0)}, demandé: {quantity}"
         }
     
     return {
@@ -133,10 +408,12 @@ def update_product_stock(db: Session, product_id: int, quantity_change: int, ope
         raise ValueError(f"Produit avec ID {product_id} non trouvé")
     
     if operation == "increase":
+        set_stock_movement_context(db, "restock")
         product.quantity_in_stock += quantity_change
     elif operation == "decrease":
         if product.quantity_in_stock < quantity_change:
             raise ValueError(f"Stock insuffisant pour '{product.name}'. Stock actuel: {product.quantity_in_stock}")
+        set_stock_movement_context(db, "adjustment")
         product.quantity_in_stock -= quantity_change
     else:
         raise ValueError(f"Opération invalide: {operation}. Utilisez 'increase' ou 'decrease'")
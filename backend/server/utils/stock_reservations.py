@@ -0,0 +1,348 @@
+"""
+Réservations de stock du panier (table stock_reservations)
+
+Ajouter un produit au panier pose une réservation de courte durée sur son
+stock : disponible = quantity_in_stock - quantity_reserved, où
+products.quantity_reserved est la somme des réservations du produit, tenue à
+jour par le trigger maintain_quantity_reserved (lecture O(1), sans agréger
+les réservations). Chaque écriture du panier prolonge toutes les réservations
+du client de CART_RESERVATION_TTL_MINUTES.
+
+La facture (utils/bill_manager.py) convertit les réservations du client en
+vente : une ligne couverte par sa réservation n'est pas revérifiée, et les
+réservations des produits facturés sont libérées dans la même transaction.
+Le balayeur libère par lots les réservations expirées ; entre deux passages,
+chaque contrôle de stock (panier, facture) libère lui-même les réservations
+expirées des produits qu'il verrouille, pour ne jamais les compter.
+
+Ordre des verrous : toujours la ligne products (FOR UPDATE) avant les
+réservations du produit, comme la facture, pour qu'aucune écriture ne puisse
+s'interbloquer avec une commande.
+
+Exécution du balayeur:
+- dans l'API: CART_RESERVATION_SWEEPER_ENABLED=true (thread démarré par lifespan)
+- processus séparé: python -m utils.stock_reservations
+"""
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException, status
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from models.product import Product
+from models.stock_reservation import StockReservation
+from utils.db import SessionLocal
+
+CART_RESERVATION_TTL_MINUTES = float(os.getenv("CART_RESERVATION_TTL_MINUTES", "15"))
+CART_RESERVATION_SWEEPER_ENABLED = os.getenv(
+    "CART_RESERVATION_SWEEPER_ENABLED", "true").lower() == "true"
+CART_RESERVATION_SWEEP_INTERVAL = float(os.getenv("CART_RESERVATION_SWEEP_INTERVAL", "30"))
+CART_RESERVATION_SWEEP_BATCH_SIZE = int(os.getenv("CART_RESERVATION_SWEEP_BATCH_SIZE", "500"))
+
+
+def _lock_products(db: Session, product_ids) -> dict:
+    """Verrouiller des produits dans l'ordre des IDs (dict product_id -> ligne)"""
+
+    rows = db.execute(
+        select(
+            Product.id, Product.name, Product.price, Product.is_active,
+            Product.quantity_in_stock, Product.quantity_reserved
+        ).where(Product.id.in_(product_ids)).order_by(Product.id).with_for_update()
+    ).all()
+
+    return {row.id: row for row in rows}
+
+
+def release_expired_holds(db: Session, product_ids) -> dict:
+    """
+    Libérer les réservations expirées de produits déjà verrouillés (sans commit)
+
+    Args:
+        db: Session de base de données
+        product_ids: IDs des produits (verrouillés par l'appelant)
+
+    Returns:
+        dict product_id -> quantité libérée (à rajouter au quantity_reserved lu au verrouillage)
+    """
+
+    rows = db.execute(
+        delete(StockReservation).where(
+            StockReservation.product_id.in_(product_ids),
+            StockReservation.expires_at <= text("now()")
+        ).returning(StockReservation.product_id, StockReservation.quantity)
+    ).all()
+
+    released = {}
+    for product_id, quantity in rows:
+        released[product_id] = released.get(product_id, 0) + quantity
+    return released
+
+
+def client_reservations(db: Session, client_id: int, product_ids=None) -> dict:
+    """
+    Quantités réservées par un client
+
+    Args:
+        db: Session de base de données
+        client_id: ID du client
+        product_ids: Limiter à ces produits (optionnel)
+
+    Returns:
+        dict product_id -> quantité réservée
+    """
+
+    query = select(StockReservation.product_id, StockReservation.quantity).where(
+        StockReservation.client_id == client_id)
+    if product_ids is not None:
+        query = query.where(StockReservation.product_id.in_(product_ids))
+
+    return dict(db.execute(query).all())
+
+
+def reserve_cart_item(db: Session, client_id: int, product_id: int, quantity: int):
+    """
+    Fixer la quantité réservée d'un produit dans le panier d'un client (sans commit)
+
+    La demande est refusée si elle dépasse le stock disponible, réservation
+    actuelle du client comprise. Toutes les réservations du client sont
+    prolongées.
+
+    Args:
+        db: Session de base de données
+        client_id: ID du client
+        product_id: ID du produit
+        quantity: Quantité à réserver (0 retire le produit du panier)
+    """
+
+    # Tous les verrous d'abord, dans l'ordre des IDs: ce produit et ceux du
+    # panier, dont les réservations sont prolongées plus bas
+    locked = _lock_products(db, [product_id, *client_reservations(db, client_id)])
+
+    if quantity == 0:
+        release_cart_items(db, client_id, [product_id])
+        extend_reservations(db, client_id)
+        return
+
+    product = locked.get(product_id)
+    if not product:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Produit avec ID {product_id} non trouvé"
+        )
+
+    if not product.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Le produit '{product.name}' n'est pas disponible"
+        )
+
+    # Réservations expirées non encore balayées: libérées ici, jamais comptées
+    expired = release_expired_holds(db, [product_id]).get(product_id, 0)
+    held = client_reservations(db, client_id, [product_id]).get(product_id, 0)
+    available = product.quantity_in_stock - (product.quantity_reserved - expired) + held
+    if quantity > available:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Stock insuffisant pour le produit '{product.name}'. Stock disponible: {max(available, 0)}"
+        )
+
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=CART_RESERVATION_TTL_MINUTES)
+    stmt = insert(StockReservation).values(
+        client_id=client_id, product_id=product_id, quantity=quantity, expires_at=expires_at)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[StockReservation.client_id, StockReservation.product_id],
+        set_={"quantity": stmt.excluded.quantity, "expires_at": stmt.excluded.expires_at}
+    ))
+    extend_reservations(db, client_id, expires_at)
+
+
+def extend_reservations(db: Session, client_id: int, expires_at: datetime = None):
+    """
+    Prolonger toutes les réservations d'un client (sans commit)
+
+    Args:
+        db: Session de base de données
+        client_id: ID du client
+        expires_at: Nouvelle échéance (par défaut maintenant + TTL)
+    """
+
+    if expires_at is None:
+        expires_at = datetime.now(timezone.utc) + timedelta(minutes=CART_RESERVATION_TTL_MINUTES)
+
+    # Verrou produit d'abord: les produits réservés par le client, dans l'ordre des IDs
+    _lock_products(db, select(StockReservation.product_id).where(
+        StockReservation.client_id == client_id))
+
+    db.execute(
+        StockReservation.__table__.update()
+        .where(StockReservation.client_id == client_id, StockReservation.expires_at < expires_at)
+        .values(expires_at=expires_at)
+    )
+
+
+def release_cart_items(db: Session, client_id: int, product_ids=None) -> int:
+    """
+    Libérer des réservations d'un client (sans commit)
+
+    Args:
+        db: Session de base de données
+        client_id: ID du client
+        product_ids: Produits à libérer (par défaut tout le panier)
+
+    Returns:
+        Nombre de réservations libérées
+    """
+
+    if product_ids is None:
+        product_ids = list(client_reservations(db, client_id))
+    if not product_ids:
+        return 0
+
+    # Verrou produit d'abord (le trigger met à jour products.quantity_reserved)
+    _lock_products(db, product_ids)
+
+    return db.execute(
+        delete(StockReservation).where(
+            StockReservation.client_id == client_id,
+            StockReservation.product_id.in_(product_ids)
+        )
+    ).rowcount
+
+
+def get_cart(db: Session, client_id: int) -> dict:
+    """
+    Contenu du panier d'un client, avec le stock disponible de chaque produit
+
+    Args:
+        db: Session de base de données
+        client_id: ID du client
+
+    Returns:
+        dict avec items, total_amount et expires_at (None si le panier est vide)
+    """
+
+    rows = db.execute(
+        select(
+            StockReservation.product_id,
+            Product.name.label("product_name"),
+            Product.price.label("unit_price"),
+            StockReservation.quantity,
+            # Disponible pour ce client: sa propre réservation comprise
+            (Product.quantity_in_stock - Product.quantity_reserved
+             + StockReservation.quantity).label("quantity_available"),
+            StockReservation.expires_at
+        ).join(Product, Product.id == StockReservation.product_id)
+        .where(StockReservation.client_id == client_id)
+        .order_by(StockReservation.created_at, StockReservation.id)
+    ).all()
+
+    items = [row._asdict() for row in rows]
+
+    return {
+        "items": items,
+        "total_amount": sum((item["unit_price"] * item["quantity"] for item in items), 0),
+        "expires_at": min((item["expires_at"] for item in items), default=None),
+    }
+
+
+def release_expired_reservations(
+    db: Session,
+    batch_size: int = CART_RESERVATION_SWEEP_BATCH_SIZE
+) -> int:
+    """
+    Libérer par lots les réservations expirées
+
+    Les produits sont parcourus par ID croissant ; chaque lot les verrouille
+    avec SKIP LOCKED : un produit en cours de commande est repris au passage
+    suivant au lieu de bloquer le balayeur, et plusieurs balayeurs (workers)
+    se partagent le travail.
+
+    Args:
+        db: Session de base de données
+        batch_size: Produits par transaction
+
+    Returns:
+        Nombre de réservations libérées
+    """
+
+    released = 0
+    after_id = 0
+
+    while True:
+        product_ids = db.execute(
+            text("""
+                SELECT DISTINCT product_id FROM stock_reservations
+                WHERE expires_at <= now() AND product_id > :after_id
+                ORDER BY product_id
+                LIMIT :limit
+            """),
+            {"after_id": after_id, "limit": batch_size}
+        ).scalars().all()
+        if not product_ids:
+            db.commit()
+            return released
+        after_id = product_ids[-1]
+
+        locked = db.execute(
+            select(Product.id).where(Product.id.in_(product_ids))
+            .order_by(Product.id).with_for_update(skip_locked=True)
+        ).scalars().all()
+
+        if locked:
+            released += db.execute(
+                delete(StockReservation).where(
+                    StockReservation.product_id.in_(locked),
+                    StockReservation.expires_at <= text("now()")
+                )
+            ).rowcount
+        db.commit()
+
+        if len(product_ids) < batch_size:
+            return released
+
+
+def run_sweeper(stop_event: threading.Event, interval: float = CART_RESERVATION_SWEEP_INTERVAL):
+    """
+    Boucle du balayeur: libère les réservations expirées puis attend interval
+
+    Args:
+        stop_event: Événement qui arrête la boucle
+        interval: Attente (secondes) entre deux passages
+    """
+
+    while not stop_event.is_set():
+        try:
+            with SessionLocal() as db:
+                released = release_expired_reservations(db)
+            if released:
+                print(f"🛒 Réservations expirées libérées: {released}")
+        except Exception as e:
+            print(f"❌ Erreur du balayeur de réservations: {str(e)}")
+
+        stop_event.wait(interval)
+
+
+def start_sweeper_thread() -> tuple:
+    """Démarrer le balayeur dans un thread (retourne le thread et son stop_event)"""
+
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=run_sweeper,
+        args=(stop_event,),
+        name="cart-reservation-sweeper",
+        daemon=True
+    )
+    thread.start()
+
+    return thread, stop_event
+
+
+if __name__ == "__main__":
+    print("🛒 Balayeur de réservations démarré (Ctrl+C pour arrêter)")
+    stop = threading.Event()
+    try:
+        run_sweeper(stop)
+    except KeyboardInterrupt:
+        stop.set()
+        print("👋 Balayeur arrêté")
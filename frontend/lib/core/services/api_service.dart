@@ -182,6 +182,23 @@ class ApiService {
   Future<Response> deleteCategory(int id) => 
     delete('/category/$id');
 
+  // ============================================
+  // Cart endpoints (server-side stock holds)
+  // ============================================
+  
+  Future<Response> getCart() => 
+    get('/cart/');
+  
+  /// Hold [quantity] units of a product in the cart (0 removes it)
+  Future<Response> setCartItem(int productId, int quantity) => 
+    put('/cart/items/$productId', data: {'quantity': quantity});
+  
+  Future<Response> removeCartItem(int productId) => 
+    delete('/cart/items/$productId');
+  
+  Future<Response> clearCart() => 
+    delete('/cart/');
+
   // ============================================
   // Bill endpoints
   // ============================================
@@ -1,8 +1,12 @@
 import 'dart:convert';
 import 'package:shared_preferences/shared_preferences.dart';
+import 'api_service.dart';
 
+// The server holds the stock of each cart line (PUT /cart/items/{id});
+// the local copy keeps the product details shown by the cart screen.
 class CartService {
   static const String _cartKey = 'shopping_cart';
+  final ApiService _api = ApiService();
 
   // Get all cart items
   Future<List<Map<String, dynamic>>> getCartItems() async {
@@ -21,6 +25,10 @@ class CartService {
     
     // Check if product already exists in cart
     final existingIndex = cart.indexWhere((item) => item['id'] == product['id']);
+    final currentQuantity = existingIndex >= 0 ? cart[existingIndex]['quantity'] as int : 0;
+    
+    // Reserve the new total on the server first (throws if the stock is insufficient)
+    await _api.setCartItem(product['id'] as int, currentQuantity + quantity);
     
     if (existingIndex >= 0) {
       // Update quantity if product exists
@@ -45,6 +53,9 @@ class CartService {
   Future<void> updateQuantity(int productId, int newQuantity) async {
     final cart = await getCartItems();
     
+    // A quantity of 0 releases the reservation on the server
+    await _api.setCartItem(productId, newQuantity < 0 ? 0 : newQuantity);
+    
     if (newQuantity <= 0) {
       // Remove item if quantity is 0 or less
       cart.removeWhere((item) => item['id'] == productId);
@@ -61,6 +72,7 @@ class CartService {
 
   // Remove item from cart
   Future<void> removeFromCart(int productId) async {
+    await _api.removeCartItem(productId);
     final cart = await getCartItems();
     cart.removeWhere((item) => item['id'] == productId);
     await _saveCart(cart);
@@ -68,6 +80,7 @@ class CartService {
 
   // Clear entire cart
   Future<void> clearCart() async {
+    await _api.clearCart();
     final prefs = await SharedPreferences.getInstance();
     await prefs.remove(_cartKey);
   }